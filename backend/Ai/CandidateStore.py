@@ -0,0 +1,103 @@
+# -----------------------------------------------------------------------------------
+# 파일 이름   : CandidateStore.py
+# 설명        : 세션별 식당 추천 후보 저장소 - "다른거 추천" 요청을 네트워크 호출 없이 처리
+# 주요 기능   :
+#   1) offer          : 새 검색 후보 목록을 받아 이미 보여준 곳을 빼고 1위를 반환, 나머지는 보관
+#   2) next_candidate : 보관된 다음 후보 반환 (없으면 None → 호출 측에서 새로 검색)
+#   3) seen 목록으로 세션 안에서 같은 식당(place_id)을 두 번 보여주지 않음
+#   4) recent_foods   : 세션에서 최근 추천한 음식 목록 (새 음식 고를 때 제외용)
+#   5) 워커가 여럿이면 SQLite 에 두어 프로세스끼리 공유 (CANDIDATE_SHARED)
+# 요구 모듈   : threading, os, cache
+# -----------------------------------------------------------------------------------
+
+import os
+import threading
+
+from cache import TTLCache, SQLiteCache
+
+# ────────────────────────────────────────────────────────────────────────────────────
+# 1) 설정
+#    - CANDIDATE_SESSIONS : 후보를 들고 있을 최대 세션 수 (LRU)
+#    - CANDIDATE_TTL      : 마지막 추천 후 후보를 보관하는 시간(초)
+#    - CANDIDATE_RECENT_FOODS : 기억할 최근 음식 개수
+#    - CANDIDATE_SHARED   : 1 이면 후보를 SQLite(cache.CACHE_DB_PATH)에 두어 워커 프로세스끼리 공유
+#                           (기본: WEB_CONCURRENCY 가 2 이상이면 1 - 같은 세션의 "다른거 추천" 이
+#                            다른 워커로 가도 이어서 추천)
+# ────────────────────────────────────────────────────────────────────────────────────
+CANDIDATE_SESSIONS = int(os.getenv("CANDIDATE_SESSIONS", "10000"))
+CANDIDATE_TTL = float(os.getenv("CANDIDATE_TTL", str(60 * 60)))
+CANDIDATE_RECENT_FOODS = int(os.getenv("CANDIDATE_RECENT_FOODS", "5"))
+CANDIDATE_SHARED = os.getenv(
+    "CANDIDATE_SHARED", "1" if int(os.getenv("WEB_CONCURRENCY", "1")) > 1 else "0"
+) == "1"
+
+if CANDIDATE_SHARED:
+    _sessions = SQLiteCache("candidates", ttl=CANDIDATE_TTL, max_rows=CANDIDATE_SESSIONS)
+else:
+    _sessions = TTLCache("candidates", maxsize=CANDIDATE_SESSIONS, ttl=CANDIDATE_TTL)
+_lock = threading.Lock()
+
+
+def _update(session_id, fn):
+    """fn(상태 또는 None) → (새 상태, 반환값) 을 원자적으로 적용 (공유 모드는 프로세스 사이에서도)"""
+    if CANDIDATE_SHARED:
+        return _sessions.update(session_id, fn)
+    with _lock:
+        state, result = fn(_sessions.get(session_id))
+        if state is None:
+            _sessions.pop(session_id)
+        else:
+            _sessions.set(session_id, state)
+        return result
+
+
+def _new_state():
+    # JSON 으로 저장할 수 있도록 seen 은 리스트, 큐 원소는 [food, place]
+    return {"queue": [], "seen": [], "foods": []}
+
+
+def _place_key(place):
+    return place.get("place_id") or place.get("name")
+
+
+# ────────────────────────────────────────────────────────────────────────────────────
+# 2) 공개 함수
+#    - 후보 큐 원소는 (food, place) 쌍 - 재추천 시 어떤 음식의 식당인지 함께 안내
+# ────────────────────────────────────────────────────────────────────────────────────
+def offer(session_id, food, candidates):
+    """순위순 후보 중 처음 보는 1위를 반환하고 나머지로 후보 큐를 교체 (모두 본 곳이면 None)"""
+    def apply(state):
+        state = state or _new_state()
+        fresh = [p for p in candidates if _place_key(p) not in state["seen"]]
+        state["foods"] = ([food] + [f for f in state["foods"] if f != food])[:CANDIDATE_RECENT_FOODS]
+        if not fresh:
+            state["queue"] = []
+            return state, None
+        best, rest = fresh[0], fresh[1:]
+        state["seen"].append(_place_key(best))
+        state["queue"] = [[food, p] for p in rest]
+        return state, best
+    return _update(session_id, apply)
+
+
+def next_candidate(session_id):
+    """보관된 다음 후보 (food, place), 남은 후보가 없으면 None"""
+    def apply(state):
+        if state is None:
+            return None, None
+        while state["queue"]:
+            food, place = state["queue"].pop(0)
+            if _place_key(place) not in state["seen"]:
+                state["seen"].append(_place_key(place))
+                return state, (food, place)
+        return state, None
+    return _update(session_id, apply)
+
+
+def recent_foods(session_id):
+    state = _sessions.get(session_id)
+    return list(state["foods"]) if state else []
+
+
+def forget(session_id):
+    _update(session_id, lambda state: (None, None))
@@ -2,31 +2,34 @@
 # 파일 이름   : chatbot_main.py
 # 설명        : Groq API 기반의 한국어 대화형 AI 챗봇 메인 스크립트
 # 주요 기능   :
-#   1) .env 파일에서 사용자 및 AI 정보(Username, Assistantname, API 키) 로드
-#   2) 기존 채팅 로그를 JSON 파일(Data/ChatLog.json)에서 읽고 관리
+#   1) 공용 settings 에서 사용자 및 AI 정보(Username, Assistantname) 사용, Groq 클라이언트는 첫 호출 시 생성
+#   2) 세션별 대화 기록(History)에서 최근 메시지를 읽고, 응답 후 한 번에 추가 기록
 #   3) 현재 시각 및 요일 등 실시간 정보를 한글 포맷으로 제공
-#   4) 사용자 질문을 Groq LLM에 전달해 스트리밍 응답 수신
+#   4) 사용자 질문을 Groq LLM에 전달해 스트리밍 응답 수신 (ChatbotStream 은 조각을 바로 전달)
 #   5) AI 응답 후 불필요 문자를 정제하고 채팅 로그에 저장
-#   6) 예외 발생 시 로그 초기화 후 재시도
-# 요구 모듈   : groq, python-dotenv, datetime, json, re
+#   6) 프롬프트는 Context.build_messages 로 토큰 예산 안에서 조립, 실패 시 기록 없이 한 번만 재시도
+# 요구 모듈   : providers(groq), settings, datetime, re, logging, History, Context, metrics
 # -----------------------------------------------------------------------------------
 
-from groq import Groq
-from json import load, dump
 import datetime
 import re
-from dotenv import dotenv_values
+import logging
+
+import providers
+from settings import settings
+from Ai import History
+from Ai.Context import build_messages
+from metrics import span, inc
+
+logger = logging.getLogger(__name__)
 
 # ────────────────────────────────────────────────────────────────────────────────────
-# 1) 환경 변수 로드
-#    - .env 파일에서 Username, Assistantname, GroqAPIKey 읽어오기
-#    - Groq 클라이언트 초기화
+# 1) 환경 변수
+#    - .env 는 settings 가 한 번만 로드, 여기서는 Username, Assistantname 만 사용
+#    - Groq 클라이언트는 providers.get("groq") 로 첫 호출 때 생성
 # ────────────────────────────────────────────────────────────────────────────────────
-env_vars = dotenv_values(".env")
-Username = env_vars.get("Username")
-Assistantname = env_vars.get("Assistantname")
-GroqAPIKey = env_vars.get("GroqAPIKey")
-client = Groq(api_key=GroqAPIKey)
+Username = settings.username
+Assistantname = settings.assistantname
 
 # ────────────────────────────────────────────────────────────────────────────────────
 # 2) 시스템 메시지 초기화
@@ -43,17 +46,10 @@ SystemChatBot = [
 ]
 
 # ────────────────────────────────────────────────────────────────────────────────────
-# 3) 채팅 로그 파일 초기화
-#    - Data/ChatLog.json 파일이 없으면 새로 생성, 있으면 기존 내용을 로드
+# 3) 채팅 기록
+#    - 예전에는 모든 사용자가 Data/ChatLog.json 하나를 공유하며 호출마다 전체를 다시 썼음
+#    - 이제 세션별 History 파일에 추가만 하고, 프롬프트에는 최근 HISTORY_WINDOW 개만 사용
 # ────────────────────────────────────────────────────────────────────────────────────
-messages = []
-
-try:
-    with open("Data/ChatLog.json", "r", encoding="utf-8") as f:
-        messages = load(f)
-except FileNotFoundError:
-    with open("Data/ChatLog.json", "w", encoding="utf-8") as f:
-        dump([], f)
 
 # ────────────────────────────────────────────────────────────────────────────────────
 # 4) RealtimeInformation 함수
@@ -85,38 +81,53 @@ def AnswerModifier(Answer):
 
 # ────────────────────────────────────────────────────────────────────────────────────
 # 6) Chatbot 함수
-#    - 사용자 질문을 받아 Groq LLM에 전송하고 스트리밍으로 응답 수신
-#    - 메시지를 채팅 로그에 저장하고 후처리 후 반환
-#    - 예외 발생 시 로그 초기화 후 재귀 호출로 재시도
+#    - ChatbotStream : Groq 스트림의 조각을 받는 즉시 yield, 끝까지 받으면 질문·응답을 기록에 추가
+#                      (중간에 멈추면 기록하지 않음)
+#    - Chatbot       : 스트림을 모두 모아 후처리 후 반환 (session_id 없으면 공용 기록)
+#    - 기록은 토큰 예산(CHATBOT_MAX_TOKENS 를 뺀 나머지) 안의 최신 대화만 프롬프트에 포함
+#    - 예외 발생 시 기록을 지우지 않고, 이전 대화 없이 한 번만 재시도
 # ────────────────────────────────────────────────────────────────────────────────────
-def Chatbot(Query):
+CHATBOT_MAX_TOKENS = 1024
+
+def ChatbotStream(Query, session_id=None, use_history=True):
+    question = {"role": "user", "content": Query}
+    history = History.recent(session_id, History.HISTORY_KEEP) if use_history else []
+    prompt = build_messages(
+        SystemChatBot + [{"role": "system", "content": RealtimeInformation()}],
+        history + [question],
+        max_output_tokens=CHATBOT_MAX_TOKENS,
+        session_id=session_id,
+    )
+    completion = providers.get("groq").chat.completions.create(
+        model="llama3-70b-8192",
+        messages=prompt,
+        max_tokens=CHATBOT_MAX_TOKENS,
+        temperature=0.7,
+        top_p=1,
+        stream=True,
+        stop=None
+    )
+    parts = []
+    for chunk in completion:
+        delta = chunk.choices[0].delta.content
+        if delta:
+            delta = delta.replace("</s>", "")
+            parts.append(delta)
+            yield delta
+    Answer = "".join(parts).replace("</s>", "")
+    History.append(session_id, question, {"role": "assistant", "content": Answer})
+
+def Chatbot(Query, session_id=None, _retry=True):
     try:
-        with open("Data/ChatLog.json", "r", encoding="utf-8") as f:
-            messages = load(f)
-        messages.append({"role": "user", "content": Query})
-        completion = client.chat.completions.create(
-            model="llama3-70b-8192",
-            messages=SystemChatBot + [{"role": "system", "content": RealtimeInformation()}] + messages,
-            max_tokens=1024,
-            temperature=0.7,
-            top_p=1,
-            stream=True,
-            stop=None
-        )
-        Answer = ""
-        for chunk in completion:
-            if chunk.choices[0].delta.content:
-                Answer += chunk.choices[0].delta.content
-        Answer = Answer.replace("</s>", "")
-        messages.append({"role": "assistant", "content": Answer})
-        with open("Data/ChatLog.json", "w", encoding="utf-8") as f:
-            dump(messages, f, indent=4)
+        with span("chatbot"):   # 재시도는 별도 구간으로 기록
+            Answer = "".join(ChatbotStream(Query, session_id, use_history=_retry))
         return AnswerModifier(Answer=Answer)
     except Exception as e:
-        print(f"에러 발생: {e}")
-        with open("Data/ChatLog.json", "w", encoding="utf-8") as f:
-            dump([], f, indent=4)
-        return Chatbot(Query)
+        logger.warning("Chatbot 응답 실패%s: %s", " (기록 없이 재시도)" if _retry else "", e)
+        inc("upstream_errors_total", service="groq")
+        if _retry:
+            return Chatbot(Query, session_id, _retry=False)
+        return "죄송합니다. 지금은 답변을 드릴 수 없어요. 잠시 후 다시 시도해 주세요."
 
 # ────────────────────────────────────────────────────────────────────────────────────
 # 7) 스크립트 직접 실행 시 반복 입력 루프
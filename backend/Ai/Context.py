@@ -0,0 +1,195 @@
+# -----------------------------------------------------------------------------------
+# 파일 이름   : Context.py
+# 설명        : 토큰 예산 기반 프롬프트 조립 모듈 - Chatbot / RealtimeSearchEngine 공용
+# 주요 기능   :
+#   1) count_tokens   : 로컬 토크나이저(tokenizers)로 토큰 수 계산, 없으면 바이트 길이 기반 추정
+#      load_tokenizer : 앱 시작 시 미리 로드 - 추정치로 동작하게 되면 경고 한 번 기록
+#   2) build_messages : 시스템 메시지 + (요약) + 예산 안에 들어가는 최신 대화만 골라 프롬프트 구성
+#   3) 선택적 요약    : 예산 밖으로 밀려난 대화를 세션별로 점진 요약 (새로 밀려난 것만 추가)
+#   4) 통계           : 호출별 프롬프트 토큰 수 (cache_stats 의 "context" 항목)
+# 요구 모듈   : tokenizers(선택), threading, hashlib, collections, os, logging, cache
+# -----------------------------------------------------------------------------------
+
+import os
+import hashlib
+import logging
+import threading
+from collections import deque
+from functools import lru_cache
+
+from cache import TTLCache, register_stats
+
+logger = logging.getLogger(__name__)
+
+# ────────────────────────────────────────────────────────────────────────────────────
+# 1) 설정
+#    - CONTEXT_WINDOW_TOKENS : 모델 컨텍스트 크기 (llama3-70b-8192 기준)
+#    - CONTEXT_MARGIN_TOKENS : 토큰 수 추정 오차를 위한 여유분
+#    - CONTEXT_TOKENIZER     : tokenizer.json 경로 또는 허브 이름 (기본: Data/tokenizer.json)
+#    - CONTEXT_SUMMARY       : 1 이면 예산 밖 대화를 요약해 시스템 메시지로 추가
+#    - CONTEXT_SUMMARY_TOKENS: 요약문 최대 토큰 수 (넘으면 오래된 요약부터 잘라냄)
+# ────────────────────────────────────────────────────────────────────────────────────
+CONTEXT_WINDOW_TOKENS = int(os.getenv("CONTEXT_WINDOW_TOKENS", "8192"))
+CONTEXT_MARGIN_TOKENS = int(os.getenv("CONTEXT_MARGIN_TOKENS", "256"))
+CONTEXT_TOKENIZER = os.getenv("CONTEXT_TOKENIZER") or os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Data", "tokenizer.json"
+)
+CONTEXT_SUMMARY = os.getenv("CONTEXT_SUMMARY", "0") == "1"
+CONTEXT_SUMMARY_TOKENS = int(os.getenv("CONTEXT_SUMMARY_TOKENS", "300"))
+
+MESSAGE_OVERHEAD_TOKENS = 4   # 메시지마다 붙는 role/구분 토큰 몫
+SUMMARY_LINE_CHARS = 80       # 요약에 남기는 발화당 최대 글자 수
+
+# ────────────────────────────────────────────────────────────────────────────────────
+# 2) 토큰 수 계산
+#    - 토크나이저는 앱 시작(lifespan) 또는 첫 사용 시 한 번만 로드, 실패하면 추정치 사용
+#      (추정치로 바뀔 때 경고 한 번, stats 의 tokenizer 로도 확인 가능)
+#    - tokenizer.json 은 저장소에 포함하지 않음 - 받는 방법은 README 의 "토크나이저" 참고
+#    - 같은 메시지는 호출마다 다시 들어오므로 내용별 토큰 수를 LRU 로 기억
+# ────────────────────────────────────────────────────────────────────────────────────
+_tokenizer = None
+_tokenizer_name = None
+_tokenizer_lock = threading.Lock()
+
+
+def load_tokenizer():
+    global _tokenizer, _tokenizer_name
+    with _tokenizer_lock:
+        if _tokenizer_name is not None:
+            return _tokenizer
+        try:
+            from tokenizers import Tokenizer
+            if os.path.exists(CONTEXT_TOKENIZER):
+                _tokenizer = Tokenizer.from_file(CONTEXT_TOKENIZER)
+            elif os.getenv("CONTEXT_TOKENIZER"):
+                # 경로가 아니면 허브 이름으로 보고 내려받음 (명시적으로 지정한 경우만)
+                _tokenizer = Tokenizer.from_pretrained(CONTEXT_TOKENIZER)
+            else:
+                logger.warning(
+                    "토크나이저 파일이 없어 추정치(바이트 길이 ÷ 3)로 토큰 수 계산: %s "
+                    "(CONTEXT_TOKENIZER 로 경로 지정)", CONTEXT_TOKENIZER,
+                )
+                _tokenizer_name = "estimate"
+                return None
+            _tokenizer_name = CONTEXT_TOKENIZER
+        except Exception as e:
+            logger.warning("토크나이저 로드 실패, 추정치 사용: %s", e)
+            _tokenizer = None
+            _tokenizer_name = "estimate"
+        return _tokenizer
+
+
+@lru_cache(maxsize=8192)
+def count_tokens(text):
+    tokenizer = load_tokenizer()
+    if tokenizer is not None:
+        return len(tokenizer.encode(text, add_special_tokens=False).ids)
+    # 한글 한 글자(3바이트) ≈ 1토큰, 영문 3~4글자 ≈ 1토큰
+    return (len(text.encode("utf-8")) + 2) // 3
+
+
+def message_tokens(message):
+    return count_tokens(message["content"]) + MESSAGE_OVERHEAD_TOKENS
+
+
+# ────────────────────────────────────────────────────────────────────────────────────
+# 3) 점진 요약
+#    - 세션별 상태: {"text": 요약문, "last": 마지막으로 요약에 넣은 메시지의 해시}
+#    - 밀려난 메시지 중 "last" 이후 것만 한 줄씩 요약에 덧붙임 (LLM 호출 없는 발췌 요약)
+# ────────────────────────────────────────────────────────────────────────────────────
+_summaries = TTLCache("context_summary", maxsize=4096, ttl=24 * 60 * 60)
+
+
+def _message_hash(message):
+    return hashlib.sha1(f"{message['role']}\0{message['content']}".encode("utf-8")).hexdigest()
+
+
+def _summary_line(message):
+    text = " ".join(message["content"].split())
+    if len(text) > SUMMARY_LINE_CHARS:
+        text = text[:SUMMARY_LINE_CHARS] + "…"
+    who = "사용자" if message["role"] == "user" else "AI"
+    return f"- {who}: {text}"
+
+
+def _update_summary(session_id, dropped):
+    key = session_id or "_global"
+    state = _summaries.get(key) or {"text": "", "last": None}
+    hashes = [_message_hash(m) for m in dropped]
+    start = hashes.index(state["last"]) + 1 if state["last"] in hashes else 0
+    new_lines = [_summary_line(m) for m in dropped[start:]]
+    if not new_lines:
+        return state["text"]
+
+    lines = (state["text"].split("\n") if state["text"] else []) + new_lines
+    while len(lines) > 1 and count_tokens("\n".join(lines)) > CONTEXT_SUMMARY_TOKENS:
+        lines.pop(0)
+    state = {"text": "\n".join(lines), "last": hashes[-1]}
+    _summaries.set(key, state)
+    return state["text"]
+
+
+# ────────────────────────────────────────────────────────────────────────────────────
+# 4) 프롬프트 조립
+# ────────────────────────────────────────────────────────────────────────────────────
+_stats_lock = threading.Lock()
+_prompt_tokens = deque(maxlen=1024)
+_counters = {"calls": 0, "dropped_messages": 0, "summarized_calls": 0}
+
+
+def build_messages(system_messages, history, max_output_tokens, session_id=None, summarize=None):
+    """system_messages 는 항상 포함, history(오래된 것부터)는 최신부터 예산이 허락하는 만큼 포함
+
+    - 예산 = CONTEXT_WINDOW_TOKENS - max_output_tokens - CONTEXT_MARGIN_TOKENS
+      (요약을 쓰면 CONTEXT_SUMMARY_TOKENS 만큼 미리 비워 둠)
+    - history 의 마지막(현재 질문)은 예산을 넘어도 항상 포함
+    - 원본 리스트는 바꾸지 않고 새 리스트 반환
+    """
+    summarize = CONTEXT_SUMMARY if summarize is None else summarize
+    budget = CONTEXT_WINDOW_TOKENS - max_output_tokens - CONTEXT_MARGIN_TOKENS
+    if summarize:
+        budget -= CONTEXT_SUMMARY_TOKENS
+    used = sum(message_tokens(m) for m in system_messages)
+
+    kept = []
+    for i in range(len(history) - 1, -1, -1):
+        cost = message_tokens(history[i])
+        if kept and used + cost > budget:
+            break
+        kept.append(history[i])
+        used += cost
+    kept.reverse()
+    dropped = history[:len(history) - len(kept)]
+
+    prefix = list(system_messages)
+    if summarize and dropped:
+        summary = _update_summary(session_id, dropped)
+        if summary:
+            summary_message = {"role": "system", "content": f"이전 대화 요약:\n{summary}"}
+            prefix.append(summary_message)
+            used += message_tokens(summary_message)
+
+    with _stats_lock:
+        _counters["calls"] += 1
+        _counters["dropped_messages"] += len(dropped)
+        _counters["summarized_calls"] += 1 if summarize and dropped else 0
+        _prompt_tokens.append(used)
+    return prefix + kept
+
+
+def context_stats():
+    with _stats_lock:
+        last = _prompt_tokens[-1] if _prompt_tokens else 0
+        samples = sorted(_prompt_tokens)
+        counters = dict(_counters)
+    return {
+        **counters,
+        "tokenizer": _tokenizer_name,
+        "prompt_tokens_last": last,
+        "prompt_tokens_avg": round(sum(samples) / len(samples), 1) if samples else 0.0,
+        "prompt_tokens_p95": samples[min(len(samples) - 1, int(len(samples) * 0.95))] if samples else 0,
+        "prompt_tokens_max": samples[-1] if samples else 0,
+    }
+
+
+register_stats("context", context_stats)
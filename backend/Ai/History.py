@@ -0,0 +1,170 @@
+# -----------------------------------------------------------------------------------
+# 파일 이름   : History.py
+# 설명        : 세션별 대화 기록 저장소 - Data/ChatLog.json 전체 재작성 대신 세션마다 JSONL 추가 기록
+# 주요 기능   :
+#   1) append  : 메시지 한 줄을 세션 파일 끝에 추가 (O(1), 파일 전체를 읽거나 다시 쓰지 않음)
+#   2) recent  : 파일 끝에서부터 필요한 만큼만 읽어 최근 N개 메시지 반환 (프롬프트 구성용)
+#   3) clear   : 세션 기록 삭제
+#   4) 동시성  : 프로세스 안에서는 세션별 Lock, 프로세스 사이에서는 flock + O_APPEND 단일 write
+#   5) 압축    : 파일이 HISTORY_MAX_BYTES 를 넘으면 최근 HISTORY_KEEP 개만 남기고 교체
+# 요구 모듈   : os, re, json, threading, fcntl(선택)
+# -----------------------------------------------------------------------------------
+
+import os
+import re
+import json
+import threading
+
+try:
+    import fcntl
+except ImportError:   # Windows - 프로세스 간 잠금 없이 프로세스 내부 Lock 만 사용
+    fcntl = None
+
+# ────────────────────────────────────────────────────────────────────────────────────
+# 1) 설정
+#    - HISTORY_DIR       : 세션별 <session_id>.jsonl 파일을 두는 폴더
+#    - HISTORY_WINDOW    : recent() 기본 개수 (프롬프트에 넣는 최근 메시지 수)
+#    - HISTORY_MAX_BYTES : 세션 파일이 이 크기를 넘으면 압축
+#    - HISTORY_KEEP      : 압축 후 남기는 최근 메시지 수
+#    - session_id 가 없으면(콘솔 실행 등) GLOBAL_SESSION 파일 하나를 사용
+# ────────────────────────────────────────────────────────────────────────────────────
+HISTORY_DIR = os.getenv("HISTORY_DIR") or os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Data", "history"
+)
+HISTORY_WINDOW = int(os.getenv("HISTORY_WINDOW", "20"))
+HISTORY_MAX_BYTES = int(os.getenv("HISTORY_MAX_BYTES", str(1024 * 1024)))
+HISTORY_KEEP = int(os.getenv("HISTORY_KEEP", "200"))
+
+GLOBAL_SESSION = "_global"
+_SESSION_ID = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+_READ_BLOCK = 8192
+
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+def _lock_for(session_id):
+    with _locks_guard:
+        lock = _locks.get(session_id)
+        if lock is None:
+            lock = _locks[session_id] = threading.Lock()
+        return lock
+
+
+def _path(session_id):
+    session_id = session_id or GLOBAL_SESSION
+    if not _SESSION_ID.match(session_id):
+        raise ValueError(f"invalid session id: {session_id!r}")
+    return os.path.join(HISTORY_DIR, f"{session_id}.jsonl")
+
+
+def _flock(fd, exclusive=True):
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+
+
+def _funlock(fd):
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+
+
+def _open_locked(path, flags, exclusive=True):
+    """flock 을 잡은 fd 반환 - 잠금을 기다리는 동안 압축으로 파일이 교체됐으면 다시 연다"""
+    while True:
+        fd = os.open(path, flags, 0o644)
+        _flock(fd, exclusive)
+        try:
+            if os.fstat(fd).st_ino == os.stat(path).st_ino:
+                return fd
+        except FileNotFoundError:
+            if not flags & os.O_CREAT:
+                _funlock(fd)
+                os.close(fd)
+                raise
+        _funlock(fd)
+        os.close(fd)
+
+
+# ────────────────────────────────────────────────────────────────────────────────────
+# 2) 읽기
+#    - 끝에서부터 블록 단위로 거꾸로 읽어 줄 수가 limit 을 넘으면 멈춤
+#      → 기록이 얼마나 길든 읽는 양은 최근 메시지 크기에 비례
+# ────────────────────────────────────────────────────────────────────────────────────
+def _tail_lines(fd, limit):
+    end = os.fstat(fd).st_size
+    buf = b""
+    pos = end
+    while pos > 0 and buf.count(b"\n") <= limit:
+        size = min(_READ_BLOCK, pos)
+        pos -= size
+        buf = os.pread(fd, size, pos) + buf
+    lines = buf.split(b"\n")
+    if pos > 0:
+        lines = lines[1:]   # 블록 경계에서 잘린 첫 줄은 버림
+    return [line for line in lines if line.strip()][-limit:]
+
+
+def recent(session_id=None, limit=HISTORY_WINDOW):
+    """최근 limit 개 메시지 [{"role", "content"}, ...] (오래된 것부터)"""
+    if limit <= 0:
+        return []
+    try:
+        fd = _open_locked(_path(session_id), os.O_RDONLY, exclusive=False)
+    except FileNotFoundError:
+        return []
+    try:
+        lines = _tail_lines(fd, limit)
+    finally:
+        _funlock(fd)
+        os.close(fd)
+
+    messages = []
+    for line in lines:
+        try:
+            messages.append(json.loads(line))
+        except ValueError:
+            continue   # 비정상 종료로 잘린 줄은 건너뜀
+    return messages
+
+
+# ────────────────────────────────────────────────────────────────────────────────────
+# 3) 쓰기
+#    - 여러 메시지를 한 번의 write 로 기록 (user + assistant 쌍이 섞이지 않도록)
+# ────────────────────────────────────────────────────────────────────────────────────
+def append(session_id, *messages):
+    """append(session_id, {"role": "user", "content": ...}, ...)"""
+    if not messages:
+        return
+    path = _path(session_id)
+    payload = "".join(
+        json.dumps({"role": m["role"], "content": m["content"]}, ensure_ascii=False) + "\n"
+        for m in messages
+    ).encode("utf-8")
+
+    with _lock_for(session_id or GLOBAL_SESSION):
+        os.makedirs(HISTORY_DIR, exist_ok=True)
+        fd = _open_locked(path, os.O_RDWR | os.O_APPEND | os.O_CREAT)
+        try:
+            os.write(fd, payload)
+            if os.fstat(fd).st_size > HISTORY_MAX_BYTES:
+                _compact(fd, path)
+        finally:
+            _funlock(fd)
+            os.close(fd)
+
+
+def _compact(fd, path):
+    """최근 HISTORY_KEEP 개만 임시 파일에 쓰고 원자적으로 교체 (flock 보유 상태에서 호출)"""
+    lines = _tail_lines(fd, HISTORY_KEEP)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(b"".join(line + b"\n" for line in lines))
+    os.replace(tmp, path)
+
+
+def clear(session_id=None):
+    with _lock_for(session_id or GLOBAL_SESSION):
+        try:
+            os.remove(_path(session_id))
+        except FileNotFoundError:
+            pass
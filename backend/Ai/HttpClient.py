@@ -0,0 +1,207 @@
+# -----------------------------------------------------------------------------------
+# 파일 이름   : HttpClient.py
+# 설명        : Ai 모듈 공용 비동기 HTTP 클라이언트 - 커넥션 재사용, 타임아웃, 재시도, 서킷 브레이커
+# 주요 기능   :
+#   1) get_client     : 이벤트 루프마다 하나의 httpx.AsyncClient 공유 (keep-alive, HTTP/2 가능 시 사용)
+#   2) request_json   : 연결/읽기 타임아웃 + 지터 포함 지수 백오프 재시도 후 JSON 반환
+#   3) CircuitBreaker : 연속 실패 시 일정 시간 즉시 실패(CircuitOpenError)로 상류 서비스 보호
+#   4) aclose         : 앱 종료 시 클라이언트 정리
+#   5) 서비스별 재시도·실패 카운터 (/metrics 의 upstream_retries_total, upstream_errors_total)
+# 요구 모듈   : httpx, asyncio, random, time, os, importlib, metrics
+# -----------------------------------------------------------------------------------
+
+import os
+import time
+import random
+import asyncio
+import importlib.util
+
+import httpx
+
+from metrics import inc
+
+# ────────────────────────────────────────────────────────────────────────────────────
+# 1) 설정
+#    - HTTP_MAX_CONNECTIONS / HTTP_MAX_KEEPALIVE : 커넥션 풀 크기
+#    - HTTP_CONNECT_TIMEOUT / HTTP_READ_TIMEOUT  : 호출마다 적용되는 기본 타임아웃(초)
+#    - HTTP_RETRIES      : 실패 시 재시도 횟수 (총 시도 = 1 + HTTP_RETRIES)
+#    - HTTP_BACKOFF_BASE / HTTP_BACKOFF_MAX      : 재시도 대기 = U(0, min(MAX, BASE·2^n))
+#    - BREAKER_FAILURES  : 이 횟수만큼 연속 실패하면 서킷 열림
+#    - BREAKER_RESET     : 열린 뒤 이 시간(초)이 지나면 한 번 시험 호출 허용
+# ────────────────────────────────────────────────────────────────────────────────────
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "50"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "3"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "10"))
+HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", "2"))
+HTTP_BACKOFF_BASE = float(os.getenv("HTTP_BACKOFF_BASE", "0.2"))
+HTTP_BACKOFF_MAX = float(os.getenv("HTTP_BACKOFF_MAX", "2"))
+BREAKER_FAILURES = int(os.getenv("BREAKER_FAILURES", "5"))
+BREAKER_RESET = float(os.getenv("BREAKER_RESET", "30"))
+
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class UpstreamError(Exception):
+    """재시도 후에도 상류 서비스 호출이 실패함"""
+
+
+class CircuitOpenError(UpstreamError):
+    """서킷이 열려 있어 호출하지 않고 즉시 실패함"""
+
+
+# ────────────────────────────────────────────────────────────────────────────────────
+# 2) CircuitBreaker
+#    - closed    : 정상 호출, 연속 실패 수를 셈
+#    - open      : reset_timeout 동안 모든 호출을 즉시 거절
+#    - half-open : reset_timeout 이후 한 번만 시험 호출 → 성공하면 closed, 실패하면 다시 open
+# ────────────────────────────────────────────────────────────────────────────────────
+class CircuitBreaker:
+    def __init__(self, name, failure_threshold=BREAKER_FAILURES, reset_timeout=BREAKER_RESET):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self):
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half-open" and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+
+    def release_trial(self):
+        # 시험 호출이 상류 상태를 알려주지 못하고 끝남 (4xx 등) - 실패 수는 그대로, 다음 호출이 다시 시험
+        self._trial_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._trial_in_flight = False
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+
+_breakers = {}
+
+
+def breaker_for(name):
+    if name not in _breakers:
+        _breakers[name] = CircuitBreaker(name)
+    return _breakers[name]
+
+
+# ────────────────────────────────────────────────────────────────────────────────────
+# 3) 클라이언트
+#    - AsyncClient 는 만들어진 이벤트 루프에 묶이므로 루프별로 하나씩 유지
+# ────────────────────────────────────────────────────────────────────────────────────
+_clients = {}
+
+
+def get_client():
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            http2=HTTP2_AVAILABLE,
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+            ),
+            timeout=httpx.Timeout(HTTP_READ_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+        )
+        _clients[loop] = client
+    return client
+
+
+async def aclose():
+    loop = asyncio.get_running_loop()
+    client = _clients.pop(loop, None)
+    if client is not None:
+        await client.aclose()
+
+
+def _backoff(attempt):
+    return random.uniform(0, min(HTTP_BACKOFF_MAX, HTTP_BACKOFF_BASE * (2 ** attempt)))
+
+
+async def request_json(service, method, url, *, params=None, json=None, headers=None,
+                       connect_timeout=None, read_timeout=None, retries=None):
+    """service 이름별 서킷 브레이커를 거쳐 요청하고 JSON 응답을 반환
+
+    - 연결 오류·타임아웃·429/5xx·JSON 이 아닌 본문은 재시도, 그 외 4xx 는 즉시 UpstreamError
+    - 재시도까지 모두 실패하면 서킷 실패로 기록하고 UpstreamError
+    - half-open 시험 호출이 결과 없이 끝나면(취소 등) 실패로 기록 - 시험 슬롯이 잠긴 채 남지 않도록
+    """
+    breaker = breaker_for(service)
+    trial = breaker.state == "half-open"
+    if not breaker.allow():
+        inc("upstream_errors_total", service=service, reason="circuit_open")
+        raise CircuitOpenError(f"{service} circuit is open")
+
+    timeout = httpx.Timeout(
+        read_timeout or HTTP_READ_TIMEOUT,
+        connect=connect_timeout or HTTP_CONNECT_TIMEOUT,
+    )
+    retries = HTTP_RETRIES if retries is None else retries
+    client = get_client()
+    last_error = None
+    settled = False
+
+    try:
+        for attempt in range(retries + 1):
+            try:
+                resp = await client.request(
+                    method, url, params=params, json=json, headers=headers, timeout=timeout
+                )
+            except httpx.TransportError as e:
+                last_error = e
+            else:
+                if resp.status_code in RETRY_STATUS:
+                    last_error = UpstreamError(f"{service} returned {resp.status_code}")
+                elif resp.status_code >= 400:
+                    # 요청 자체의 문제 - 상류 장애가 아니므로 서킷에는 기록하지 않음
+                    # (성공으로 세면 5xx 와 4xx 가 번갈아 올 때 서킷이 열리지 않음)
+                    breaker.release_trial()
+                    settled = True
+                    inc("upstream_errors_total", service=service, reason="client_error")
+                    raise UpstreamError(f"{service} returned {resp.status_code}")
+                else:
+                    try:
+                        data = resp.json()
+                    except ValueError:
+                        # 프록시 오류 페이지(HTML) 등 - 상류 장애로 보고 재시도
+                        last_error = UpstreamError(f"{service} returned a non-JSON body")
+                    else:
+                        breaker.record_success()
+                        settled = True
+                        return data
+
+            if attempt < retries:
+                inc("upstream_retries_total", service=service)
+                await asyncio.sleep(_backoff(attempt))
+
+        breaker.record_failure()
+        settled = True
+        inc("upstream_errors_total", service=service, reason="failed")
+        raise UpstreamError(f"{service} request failed after {retries + 1} attempts: {last_error}")
+    finally:
+        if trial and not settled:
+            breaker.record_failure()
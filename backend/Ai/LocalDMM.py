@@ -0,0 +1,154 @@
+# -----------------------------------------------------------------------------------
+# 파일 이름   : LocalDMM.py
+# 설명        : 로컬 1단계 DMM 분류기 - 흔한 질의는 Cohere 호출 없이 규칙(+선택적 경량 모델)으로 바로 분류
+# 주요 기능   :
+#   1) classify  : 질의 → Decision(tasks, confidence, source), 판단이 어려우면 tasks=None
+#   2) 규칙      : 앱 열기/닫기 명령 정규식, 실시간·잡담·설명 요청 키워드 (공용 KeywordMatcher 한 번 스캔)
+#   3) 경량 모델 : DMM_LOCAL_MODEL 에 fastText 모델(.bin)이 있으면 규칙이 못 정한 단일 질의에 사용
+#   4) 복합 질의(쉼표, "그리고", "~하고" 등)는 태스크 분해가 필요하므로 항상 Cohere 로 넘김
+# 요구 모듈   : fasttext(선택), re, os, logging, threading, collections, Matcher
+# -----------------------------------------------------------------------------------
+
+import os
+import re
+import logging
+import threading
+from collections import namedtuple
+
+from Ai.Matcher import KeywordMatcher
+
+try:
+    import fasttext
+except ImportError:   # 경량 모델 없이 규칙만 사용
+    fasttext = None
+
+logger = logging.getLogger(__name__)
+
+# ────────────────────────────────────────────────────────────────────────────────────
+# 1) 설정
+#    - DMM_LOCAL_MODEL : fastText 지도학습 모델 경로 (라벨: __label__general, __label__realtime)
+#    - 결과 형식은 Cohere DMM 과 같은 "키워드 질의" 문자열 목록
+# ────────────────────────────────────────────────────────────────────────────────────
+DMM_LOCAL_MODEL = os.getenv("DMM_LOCAL_MODEL") or os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Data", "dmm_fasttext.bin"
+)
+
+MAX_APPS = 5          # 한 명령에서 여는/닫는 앱 최대 개수
+MAX_APP_WORDS = 3     # 앱 이름 최대 단어 수 (넘으면 문장으로 보고 규칙 적용 안 함)
+
+# source : "rule:<규칙 이름>" / "model" / None
+Decision = namedtuple("Decision", ["tasks", "confidence", "source"])
+UNDECIDED = Decision(None, 0.0, None)
+
+# ────────────────────────────────────────────────────────────────────────────────────
+# 2) 규칙
+#    - 앱 명령  : "크롬 열어줘", "크롬과 파이어폭스 열어줘", "메모장 꺼줘" → open/close 태스크
+#    - 실시간   : 날씨·시세·최신 소식처럼 검색이 필요한 질의 → realtime
+#    - 잡담     : 인사·감사·날짜/시간·대화 요청 → general
+#    - 설명     : "~에 대해 알려줘", "~뜻이 뭐야" → general (실시간 단서가 함께 있으면 판단 보류)
+# ────────────────────────────────────────────────────────────────────────────────────
+_OPEN = re.compile(r"^(?P<apps>.+?)\s*(?:을|를)?\s*(?:열어|실행해|실행시켜|띄워)\s*(?:줘|주세요|줄래|봐)?\s*[.!?~]*$")
+_CLOSE = re.compile(r"^(?P<apps>.+?)\s*(?:을|를)?\s*(?:닫아|꺼|종료해|종료시켜)\s*(?:줘|주세요|줄래|봐)?\s*[.!?~]*$")
+_APP_SPLIT = re.compile(r"\s*(?:,|\s그리고\s)\s*|(?:과|와|이랑|랑|하고)\s+")
+_CONNECTIVE = re.compile(r"[가-힣]고\s")   # "설명해주고 ", "열고 " 처럼 동작을 잇는 어미
+_COMPOUND = re.compile(r",|\s그리고\s|\sand\s|한 다음|한 뒤|[가-힣]고\s")
+
+REALTIME_CUES = [
+    "날씨", "기온", "미세먼지", "주가", "주식", "환율", "시세", "비트코인",
+    "실시간", "최신", "최근", "속보", "뉴스", "경기 결과", "스코어", "순위",
+    "현재", "요즘", "트렌드", "박스오피스", "weather", "news", "stock", "latest",
+]
+SMALLTALK_CUES = [
+    "안녕", "반가", "고마", "감사", "심심", "대화", "농담", "이름이 뭐", "너는 누구", "넌 누구",
+    "좋아하", "기분", "사랑해", "잘 자", "오늘 날짜", "몇 시", "무슨 요일", "며칠",
+]
+EXPLAIN_CUES = ["에 대해 알려", "에 대해 설명", "뜻이 뭐", "뜻 알려", "의미가 뭐", "이란 뭐", "란 뭐야"]
+
+_cue_matcher = KeywordMatcher({
+    "realtime": REALTIME_CUES,
+    "smalltalk": SMALLTALK_CUES,
+    "explain": EXPLAIN_CUES,
+})
+
+# 규칙별 신뢰도 - DMM_LOCAL_MIN_CONFIDENCE(Model.py) 이상인 것만 빠른 경로로 처리
+RULE_CONFIDENCE = {"app": 0.95, "realtime": 0.9, "smalltalk": 0.9, "explain": 0.85}
+
+
+def _app_tasks(pattern, keyword, text):
+    m = pattern.match(text)
+    if not m or _CONNECTIVE.search(m.group("apps")):
+        return None
+    apps = [a.strip() for a in _APP_SPLIT.split(m.group("apps")) if a.strip()]
+    if not apps or len(apps) > MAX_APPS or any(len(a.split()) > MAX_APP_WORDS for a in apps):
+        return None
+    return [f"{keyword} {a}" for a in apps]
+
+
+# ────────────────────────────────────────────────────────────────────────────────────
+# 3) 경량 모델 (선택)
+#    - 첫 사용 시 한 번만 로드, 패키지나 파일이 없으면 규칙만 사용 (model_status 로 확인)
+# ────────────────────────────────────────────────────────────────────────────────────
+_model = None
+_model_status = None
+_model_lock = threading.Lock()
+
+
+def _load_model():
+    global _model, _model_status
+    with _model_lock:
+        if _model_status is not None:
+            return _model
+        if fasttext is None or not os.path.exists(DMM_LOCAL_MODEL):
+            _model_status = "disabled"
+            return None
+        try:
+            _model = fasttext.load_model(DMM_LOCAL_MODEL)
+            _model_status = DMM_LOCAL_MODEL
+        except Exception as e:
+            logger.warning("DMM 로컬 모델 로드 실패, 규칙만 사용: %s", e)
+            _model = None
+            _model_status = "disabled"
+        return _model
+
+
+def model_status():
+    return _model_status or "not loaded"
+
+
+def _model_decision(text):
+    model = _load_model()
+    if model is None:
+        return UNDECIDED
+    labels, probs = model.predict(text)
+    label = labels[0].replace("__label__", "") if labels else ""
+    if label not in ("general", "realtime"):
+        return UNDECIDED
+    return Decision([f"{label} {text}"], float(probs[0]), "model")
+
+
+# ────────────────────────────────────────────────────────────────────────────────────
+# 4) classify
+# ────────────────────────────────────────────────────────────────────────────────────
+def classify(prompt):
+    text = " ".join((prompt or "").split())
+    if not text:
+        return UNDECIDED
+
+    for pattern, keyword in ((_OPEN, "open"), (_CLOSE, "close")):
+        tasks = _app_tasks(pattern, keyword, text)
+        if tasks:
+            return Decision(tasks, RULE_CONFIDENCE["app"], "rule:app")
+
+    if _COMPOUND.search(text):
+        return UNDECIDED
+
+    found = _cue_matcher.categories(text)
+    if "realtime" in found:
+        if found & {"smalltalk", "explain"}:
+            return UNDECIDED   # 단서가 엇갈리면 Cohere 판단에 맡김
+        return Decision([f"realtime {text}"], RULE_CONFIDENCE["realtime"], "rule:realtime")
+    for name in ("smalltalk", "explain"):
+        if name in found:
+            return Decision([f"general {text}"], RULE_CONFIDENCE[name], f"rule:{name}")
+
+    return _model_decision(text)
@@ -2,33 +2,44 @@
 # 파일 이름   : Logic.py
 # 설명        : 통합 AI 서비스 모듈 - 일반 챗, 실시간 검색, 앱 제어, 감정 기반 추천, 키워드 감지 기능 제공
 # 주요 기능   :
-#   1) 쿼리 분류(일반, 실시간, 앱 열기/닫기) 후 각 처리기 호출  
-#   2) GPT 기반 감정 분석 및 한국 음식 추천  
-#   3) 감정 관련 메시지 판별  
-#   4) 인사/작별 메시지 판별  
-# 요구 모듈   : Model, Chatbot, RealtimeSearchEngine, AppControl, openai, dotenv, datetime, os
+#   1) 쿼리 분류(일반, 실시간, 앱 열기/닫기) 후 각 처리기 호출 (IntegratedAIStream 은 응답 조각 스트리밍)
+#      복합 질의의 태스크는 TaskRunner 로 동시 실행 후 원래 순서로 조립
+#   2) GPT 기반 감정 분석 및 한국 음식 추천 (classify_emotion_and_reply_stream 은 추천 이유를 조각으로 스트리밍)
+#   3) 감정/인사/작별/감사/재추천 키워드를 한 번에 감지하는 공용 매처 (detect_intents)
+#   4) 감정 관련 메시지 판별, 인사/작별 메시지 판별  
+#   5) 감정 추천 응답 캐시 (정규화 메시지 + 시간대 키, 키마다 여러 답변을 모아 무작위 제공)
+# 요구 모듈   : Model, Chatbot, RealtimeSearchEngine, AppControl, TaskRunner, providers(openai), datetime, os, cache, Matcher, metrics
 # -----------------------------------------------------------------------------------
 
 from Ai.Model import FirstLayerDMM
-from Ai.Chatbot import Chatbot
-from Ai.RealtimeSearchEngine import RealtimeSearchEngine
+from Ai.Chatbot import Chatbot, ChatbotStream
+from Ai.RealtimeSearchEngine import RealtimeSearchEngine, RealtimeSearchEngineStream
 from Ai.AppControl import open_app, close_app
-from openai import OpenAI
+from Ai.TaskRunner import run_ordered
 import os
-from dotenv import load_dotenv
+import re
+import random
+import threading
 from datetime import datetime
 
-# 환경변수 로드 및 GPT 클라이언트 초기화
-load_dotenv()
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+import providers
+from cache import TTLCache, SQLiteCache, TieredCache, register_stats
+from metrics import span
+from Ai.Matcher import KeywordMatcher
+
+# GPT 클라이언트는 providers.get("openai") 로 첫 호출 때 생성 (.env 는 settings 가 로드)
 
 # ────────────────────────────────────────────────────────────────────────────────────
 # 1) 일반 태스크 기반 처리 함수
-#    - 함수명: IntegratedAI
+#    - 함수명: IntegratedAI / IntegratedAIStream
 #    - 역할: DMM으로 분류된 태스크를 순회하며 일반 대화, 실시간 검색, 앱 제어 등을 실행
+#    - session_id 를 넘기면 일반 대화·실시간 검색의 대화 기록을 세션별로 사용
+#    - 분기 로직은 _integrated 하나이고, 일반 대화·실시간 검색 호출 방식만 다름
+#      · IntegratedAI       : 완성된 응답 문자열 (기존 동작)
+#      · IntegratedAIStream : LLM 응답 조각을 받는 즉시 yield (스트리밍 엔드포인트용)
 # ────────────────────────────────────────────────────────────────────────────────────
 
-def IntegratedAI(query):
+def _integrated(query, session_id, chat, realtime):
 
     greeting_responses = ["안녕하세요", "안녕", "하이", "안녕!"]
     farewell_responses = ["안녕히 가세요", "잘가", "바이"]
@@ -37,68 +48,185 @@ def IntegratedAI(query):
 
     # 인사 직접 처리
     if query_cleaned in greeting_responses:
-        return "안녕하세요! 무엇을 도와드릴까요?"
+        yield "안녕하세요! 무엇을 도와드릴까요?"
+        return
 
     if query_cleaned in farewell_responses:
-        return "안녕히 가세요! 좋은 하루 보내세요."
+        yield "안녕히 가세요! 좋은 하루 보내세요."
+        return
 
     # 실시간 뉴스/음악 검색 우선 처리
     if any(keyword in query for keyword in ["뉴스", "주요 소식"]):
-        return RealtimeSearchEngine("오늘 뉴스")
+        yield from realtime("오늘 뉴스", session_id)
+        return
 
     if any(keyword in query for keyword in ["노래", "음악", "곡", "뮤직", "추천해줘"]):
-        return RealtimeSearchEngine(query + " site:youtube.com")
+        yield from realtime(query + " site:youtube.com", session_id)
+        return
 
     # 나머지 일반 태스크 분기
+    #   - 태스크마다 출력 조각을 내는 함수를 만들고 TaskRunner 로 동시에 실행
+    #   - 응답 길이는 가장 느린 태스크에 맞춰지고, 출력 순서는 DMM 이 준 순서 그대로
     tasks = FirstLayerDMM(query)
-    response = ""
+    yield from run_ordered([_task_factory(task.strip(), session_id, chat, realtime) for task in tasks])
 
-    for task in tasks:
-        task = task.strip()
 
-        if task.startswith("general"):
-            general_query = task.replace("general", "").strip()
-            response += Chatbot(general_query) + "\n"
+def _task_factory(task, session_id, chat, realtime):
+    if task.startswith("general"):
+        general_query = task.replace("general", "").strip()
+        return lambda: _then_newline(chat(general_query, session_id))
 
-        elif task.startswith("realtime"):
-            realtime_query = task.replace("realtime", "").strip()
-            response += RealtimeSearchEngine(realtime_query) + "\n"
+    if task.startswith("realtime"):
+        realtime_query = task.replace("realtime", "").strip()
+        return lambda: _then_newline(realtime(realtime_query, session_id))
 
-        elif task.startswith("open"):
-            app_name = task.replace("open", "").strip()
+    if task.startswith("open"):
+        app_name = task.replace("open", "").strip()
+        def run_open():
             open_app(app_name)
-            response += f"{app_name}을(를) 열었습니다.\n"
+            return [f"{app_name}을(를) 열었습니다.\n"]
+        return run_open
 
-        elif task.startswith("close"):
-            app_name = task.replace("close", "").strip()
+    if task.startswith("close"):
+        app_name = task.replace("close", "").strip()
+        def run_close():
             close_app(app_name)
-            response += f"{app_name}을(를) 닫았습니다.\n"
+            return [f"{app_name}을(를) 닫았습니다.\n"]
+        return run_close
+
+    return lambda: ["해당 명령을 이해하지 못했습니다.\n"]
+
 
-        else:
-            response += "해당 명령을 이해하지 못했습니다.\n"
+def _then_newline(chunks):
+    yield from chunks
+    yield "\n"
+
+
+def IntegratedAI(query, session_id=None):
+    parts = _integrated(
+        query, session_id,
+        chat=lambda q, sid: [Chatbot(q, sid)],
+        realtime=lambda q, sid: [RealtimeSearchEngine(q, sid)],
+    )
+    return "".join(parts).strip()
 
-    return response.strip()
+
+def IntegratedAIStream(query, session_id=None):
+    return _integrated(query, session_id, chat=ChatbotStream, realtime=RealtimeSearchEngineStream)
 
 # ────────────────────────────────────────────────────────────────────────────────────
 # 2) 감정 기반 추천 함수
-#    - 함수명: classify_emotion_and_reply_with_gpt
+#    - 함수명: classify_emotion_and_reply_with_gpt / classify_emotion_and_reply_stream
 #    - 역할: 텍스트 감정 분석 후 적절한 한국 음식 추천 프롬프트 생성 및 결과 파싱
+#      · classify_emotion_and_reply_stream   : "추천 이유:" 뒤의 글자를 GPT 스트림에서 받는 즉시 yield,
+#                                              끝나면 넘겨받은 result 에 emotion/food/reason 기록
+#      · classify_emotion_and_reply_with_gpt : 스트림을 끝까지 소비해 (감정, 음식, 이유) 반환 (기존 동작)
+# ────────────────────────────────────────────────────────────────────────────────────
+
 # ────────────────────────────────────────────────────────────────────────────────────
+# 2-1) 감정 추천 응답 캐시
+#    - 키: 정규화한 메시지 + 시간대(아침/점심/저녁) → "우울해", "우울해 ㅠㅠ" 는 같은 키
+#    - 값: 서로 다른 GPT 답변 목록(최대 EMOTION_CACHE_VARIANTS 개)
+#          목록이 다 차기 전까지는 GPT 를 호출해 답변을 모으고,
+#          다 찬 뒤에는 그중 하나를 무작위로 골라 추천이 매번 같지 않게 함
+#    - 메모리 LRU(EMOTION_CACHE_SIZE) + TTL(EMOTION_CACHE_TTL 초),
+#      EMOTION_CACHE_PERSIST=1 이면 SQLite 영속 계층(cache.CACHE_DB_PATH)도 사용
+# ────────────────────────────────────────────────────────────────────────────────────
+EMOTION_CACHE_SIZE = int(os.getenv("EMOTION_CACHE_SIZE", "2048"))
+EMOTION_CACHE_TTL = float(os.getenv("EMOTION_CACHE_TTL", str(6 * 60 * 60)))
+EMOTION_CACHE_VARIANTS = int(os.getenv("EMOTION_CACHE_VARIANTS", "3"))
+EMOTION_CACHE_PERSIST = os.getenv("EMOTION_CACHE_PERSIST", "0") == "1"
+
+emotion_cache = TieredCache(
+    TTLCache("emotion_reply_memory", maxsize=EMOTION_CACHE_SIZE, ttl=EMOTION_CACHE_TTL),
+    SQLiteCache("emotion_reply", ttl=EMOTION_CACHE_TTL, max_rows=EMOTION_CACHE_SIZE * 10)
+    if EMOTION_CACHE_PERSIST else None,
+)
+
+_emotion_counter_lock = threading.Lock()
+emotion_counters = {"cache_served": 0, "gpt_calls": 0, "tokens_saved": 0}
+
+def _count(name, amount=1):
+    with _emotion_counter_lock:
+        emotion_counters[name] += amount
+
+def emotion_cache_report():
+    served, calls = emotion_counters["cache_served"], emotion_counters["gpt_calls"]
+    total = served + calls
+    return {
+        **emotion_counters,
+        "persistent_hits": emotion_cache.persistent_hits,
+        "hit_rate": round(served / total, 4) if total else 0.0,
+    }
+
+register_stats("emotion_reply", emotion_cache_report)
+
+# 한글·영문·숫자·공백만 남기고(ㅠㅠ, ㅋㅋ, 이모지, 문장부호 제거) 공백 정리
+_NORMALIZE_DROP = re.compile(r"[^0-9a-z\uac00-\ud7a3\s]")
+
+def normalize_message(text):
+    text = _NORMALIZE_DROP.sub("", text.lower())
+    return " ".join(text.split())
+
+def current_time_slot(hour=None):
+    hour = datetime.now().hour if hour is None else hour
+    if hour < 11:
+        return "아침"
+    elif hour < 17:
+        return "점심"
+    return "저녁"
 
+@span("emotion_reply")
 def classify_emotion_and_reply_with_gpt(text, recent_foods=None):
+    result = {}
+    for _ in classify_emotion_and_reply_stream(text, recent_foods, result):
+        pass
+    return result["emotion"], result["food"], result["reason"]
+
+def classify_emotion_and_reply_stream(text, recent_foods=None, result=None):
     if recent_foods is None:
         recent_foods = []
-
-    hour = datetime.now().hour
+    if result is None:
+        result = {}
+
+    time_slot = current_time_slot()
+    cache_key = f"{time_slot}|{normalize_message(text)}"
+    variants = emotion_cache.get(cache_key) or []
+
+    candidates = [v for v in variants if v["food"] not in recent_foods]
+    if len(variants) >= EMOTION_CACHE_VARIANTS and candidates:
+        chosen = random.choice(candidates)
+        _count("cache_served")
+        _count("tokens_saved", chosen.get("tokens", 0))
+        result.update(emotion=chosen["emotion"], food=chosen["food"], reason=chosen["reason"])
+        if chosen["reason"]:
+            yield chosen["reason"]
+        return
+
+    answer = {}
+    yield from _ask_gpt_for_food_stream(text, time_slot, recent_foods, answer)
+    emotion, food, reason, tokens = answer["emotion"], answer["food"], answer["reason"], answer["tokens"]
+    result.update(emotion=emotion, food=food, reason=reason)
+    _count("gpt_calls")
+
+    # 음식 이름을 제대로 받은 답변만, 같은 음식이 아닐 때 목록에 추가
+    if food and all(v["food"] != food for v in variants):
+        variants = variants + [{"emotion": emotion, "food": food, "reason": reason, "tokens": tokens}]
+        emotion_cache.set(cache_key, variants[-EMOTION_CACHE_VARIANTS:])
+
+@span("openai.emotion_reply")
+def _ask_gpt_for_food(text, time_slot, recent_foods):
+    answer = {}
+    for _ in _ask_gpt_for_food_stream(text, time_slot, recent_foods, answer):
+        pass
+    return answer["emotion"], answer["food"], answer["reason"], answer["tokens"]
+
+# 응답 형식의 마지막 줄이 추천 이유이므로 이 표시 뒤로 오는 글자는 모두 이유 → 그대로 흘려보냄
+REASON_MARK = "추천 이유:"
+
+def _ask_gpt_for_food_stream(text, time_slot, recent_foods, answer):
     today_str = datetime.now().strftime("%Y년 %m월 %d일")
 
-    if hour < 11:
-        time_slot = "아침"
-    elif hour < 17:
-        time_slot = "점심"
-    else:
-        time_slot = "저녁"
-
     recent_foods_str = ", ".join(recent_foods)
 
     prompt = f"""
@@ -117,93 +245,138 @@ def classify_emotion_and_reply_with_gpt(text, recent_foods=None):
 추천 이유: (이유)
 """
 
-    response = client.chat.completions.create(
+    completion = providers.get("openai").chat.completions.create(
         model="gpt-4o",
         messages=[{"role": "user", "content": prompt}],
         max_tokens=300,
-        temperature=0.7
+        temperature=0.7,
+        stream=True,
+        stream_options={"include_usage": True},   # 마지막 조각에 토큰 사용량
     )
 
-    content = response.choices[0].message.content.strip()
-
-    emotion, food, reason = None, None, None
-    for line in content.splitlines():
+    content = ""
+    reason_start = None   # content 안에서 이유가 시작하는 위치
+    sent = 0              # 이미 yield 한 위치
+    streamed = False
+    tokens = 0
+    for chunk in completion:
+        usage = getattr(chunk, "usage", None)
+        if usage is not None:
+            tokens = getattr(usage, "total_tokens", 0) or 0
+        if not chunk.choices or not chunk.choices[0].delta.content:
+            continue
+        content += chunk.choices[0].delta.content
+        if reason_start is None:
+            mark = content.find(REASON_MARK)
+            if mark < 0:
+                continue
+            reason_start = sent = mark + len(REASON_MARK)
+        piece = content[sent:]
+        sent = len(content)
+        if not streamed:
+            piece = piece.lstrip()   # 표시 뒤 공백이 첫 조각이 되지 않게
+        if piece:
+            streamed = True
+            yield piece
+
+    emotion, food = None, None
+    for line in content[:reason_start].splitlines():
         if line.startswith("기분 요약:"):
             emotion = line.replace("기분 요약:", "").strip()
         elif line.startswith("추천 음식:"):
             food = line.replace("추천 음식:", "").strip()
-        elif line.startswith("추천 이유:"):
-            reason = line.replace("추천 이유:", "").strip()
+    reason = content[reason_start:].strip() if reason_start is not None else None
+
+    answer.update(emotion=emotion, food=food, reason=reason, tokens=tokens)
+
+# ────────────────────────────────────────────────────────────────────────────────────
+# 3) 의도 키워드 사전 + 공용 매처
+#    - 감정/인사/작별/감사/재추천 키워드를 모듈 로드 시 한 번만 KeywordMatcher 로 컴파일
+#    - detect_intents(text) 한 번으로 메시지에 나타난 모든 카테고리를 얻음
+#      (app.py 의 get_response 도 이 결과 하나로 분기)
+# ────────────────────────────────────────────────────────────────────────────────────
 
-    return emotion, food, reason
+EMOTION_KEYWORDS = [
+    "갈등", "갈등 있어", "감사하", "감사하다", "감사한", "감사함", "고맙", "고마워", "고맙다", "고마운", "고마움",
+    "고민되", "고민돼", "고민되다", "고민된", "고민됨", "공허하", "공허하다", "공허한", "공허함",
+    "귀찮", "귀찮다", "귀찮아", "귀찮은", "귀찮음", "기대되", "기대돼", "기대되다", "기대한", "기대됨",
+    "기뻐", "기쁘", "기쁘다", "기쁜", "기쁨", "기분 좋아", "기분이 좋아", "나른하", "나른하다", "나른한", "나른함",
+    "당당하", "당당하다", "당당해", "당당한", "당당함", "당황하", "당황하다", "당황했어", "당황한", "당황함",
+    "다정하", "다정하다", "다정해", "다정한", "다정함", "든든하", "든든하다", "든든해", "든든한", "든든함",
+    "무덤덤하", "무덤덤하다", "무덤덤해", "무덤덤한", "무덤덤함", "무기력하", "무기력하다", "무기력해", "무기력한", "무기력함",
+    "무섭", "무섭다", "무서워", "무서운", "무서움", "미안하", "미안하다", "미안해", "미안한", "미안함",
+    "분하", "분하다", "분해", "분한", "분함", "부끄럽", "부끄럽다", "부끄러워", "부끄러운", "부끄러움",
+    "불안하", "불안하다", "불안해", "불안한", "불안함", "뿌듯하", "뿌듯하다", "뿌듯해", "뿌듯한", "뿌듯함",
+    "비참하", "비참하다", "비참한", "비참함", "사랑하", "사랑하다", "사랑해", "사랑한", "사랑함",
+    "상실되", "상실되다", "상실감", "상실된", "상실됨", "설레", "설레다", "설레여", "설렌다",
+    "슬프", "슬프다", "슬퍼", "슬펐어", "슬픈", "슬픔", "스트레스", "스트레스 받아", "스트레스 받다", "스트레스를 받은",
+    "스트레스 받음", "싫", "싫다", "싫어", "싫은", "싫음", "심란하", "심란하다", "심란해", "심란한", "심란함",
+    "신나", "신난다", "신났어", "신나는", "신남", "아무 느낌 없어", "애틋하", "애틋하다", "애틋해", "애틋한", "애틋함",
+    "얼떨떨하", "얼떨떨하다", "얼떨떨해", "얼떨떨한", "얼떨떨함", "억울하", "억울하다", "억울해", "억울한", "억울함",
+    "여유롭", "여유롭다", "여유로워", "여유로운", "여유로움", "연민", "우울하", "우울하다", "우울해", "우울한", "우울함",
+    "웃기", "웃긴", "웃김", "위로 받고 싶다", "위로 받고 싶어", "위로가 필요해", "유쾌하", "유쾌하다", "유쾌해", "유쾌한", "유쾌함",
+    "의기소침하", "의기소침하다", "의기소침한", "의기소침함", "이해받고 싶어", "자랑스럽", "자랑스럽다", "자랑스러워", "자랑스러운", "자랑스러움",
+    "자신 있", "자신 있다", "자신있어", "자신감", "재미없", "재미없다", "재미없어", "재미없는", "재미없음",
+    "적적하", "적적하다", "적적한", "적적함", "조마조마하", "조마조마하다", "조마조마해", "조마조마한", "조마조마함",
+    "죄책감", "죄책감 들어", "즐겁", "즐겁다", "즐거워", "즐거운", "즐거웠", "즐거움", "지루하", "지루하다", "지루해", "지루한", "지루함",
+    "지치", "지쳤", "지치다", "지쳤어", "지친", "지침", "진절머리", "차분하", "차분하다", "차분해", "차분한", "차분함",
+    "창피하", "창피하다", "창피해", "창피한", "창피함", "초조하", "초조하다", "초조해", "초조한", "초조함",
+    "칭찬받고 싶어", "편안하", "편안하다", "편안해", "편안한", "편안함", "평온하", "평온하다", "평온해", "평온한", "평온함",
+    "피곤하", "피곤하다", "피곤해", "피곤한", "피곤함", "혼란스럽", "혼란스럽다", "혼란스러워", "혼란스러운", "혼란스러움",
+    "화나", "화나다", "화났어", "화난", "화남", "흥미롭", "흥미롭다", "흥미로워", "흥미로운", "흥미로움", "기분이 나빠",
+    "나빠", "나쁘다", "나쁜", "나쁨", "기분이 이상해", "이상해", "이상하다", "이상한", "이상함", "기분이 구려", "구려", "구리다", "구린", "구림",
+    "기분이 안 좋아", "기분 별로야", "찝찝해", "속상해", "짜증나 죽겠어", "현타 와", "멘붕이야",
+    "기운이 없어", "불편해", "허탈해", "피곤해서 아무것도 하기 싫어", "우울한 하루", "답답해",
+    "억울해 죽겠어", "열받아", "터질 거 같아", "현실도피하고 싶어", "도망가고 싶어",
+    "기분 좋다", "날아갈 것 같아", "행복해 죽겠어", "상쾌해", "기대돼서 잠이 안 와", "기분 최고",
+    "뭔가 설레", "괜히 웃음 나와", "힐링되는 기분", "뭔가 잘 풀리는 느낌이야",
+    "마음이 복잡해", "감정이 뒤죽박죽이야", "묘한 감정이야", "기분이 뭔가 이상해",
+    "불안한데 기대돼", "슬픈데 편안해", "좋은데 무서워",
+    "기분좋아", "기분이좋아", "기분좋다", "기분최고", "기분이최고", "기분나빠", "기분이나빠",
+    "기분별로야", "기분이별로야", "기분이이상해", "기분이구려", "기분이뭔가이상해",
+    "행복해죽겠어", "짜증나죽겠어", "억울해죽겠어", "현실도피하고싶어", "도망가고싶어",
+    "피곤해서아무것도하기싫어"
+]
+
+GREETING_KEYWORDS = ["안녕", "안녕하세요", "하이", "반가워", "hello", "hi"]
+FAREWELL_KEYWORDS = ["잘 가", "다음에", "또 봐", "그럼 안녕", "나 갈게", "끝"]
+THANK_KEYWORDS = ["고맙", "감사"]
+RECOMMEND_KEYWORDS = ["다른거 추천", "다른 추천", "다시 추천", "재추천"]
+
+intent_matcher = KeywordMatcher({
+    "emotion": EMOTION_KEYWORDS,
+    "greeting": GREETING_KEYWORDS,
+    "farewell": FAREWELL_KEYWORDS,
+    "thanks": THANK_KEYWORDS,
+    "recommend": RECOMMEND_KEYWORDS,
+})
+
+
+def detect_intents(text):
+    """메시지에 나타난 의도 카테고리 집합 (예: {"greeting", "emotion"})"""
+    return intent_matcher.categories(text)
 
 # ────────────────────────────────────────────────────────────────────────────────────
-# 3) 감정 관련 키워드 감지 함수
+# 4) 감정 관련 키워드 감지 함수
 #    - 함수명: is_emotion_related
 #    - 역할: 텍스트에 감정 관련 키워드가 포함되었는지 여부 판별
 # ────────────────────────────────────────────────────────────────────────────────────
 
 def is_emotion_related(text):
-    lowered = text.lower()
-
-    emotion_keywords = [
-        "갈등", "갈등 있어", "감사하", "감사하다", "감사한", "감사함", "고맙", "고마워", "고맙다", "고마운", "고마움",
-        "고민되", "고민돼", "고민되다", "고민된", "고민됨", "공허하", "공허하다", "공허한", "공허함",
-        "귀찮", "귀찮다", "귀찮아", "귀찮은", "귀찮음", "기대되", "기대돼", "기대되다", "기대한", "기대됨",
-        "기뻐", "기쁘", "기쁘다", "기쁜", "기쁨", "기분 좋아", "기분이 좋아", "나른하", "나른하다", "나른한", "나른함",
-        "당당하", "당당하다", "당당해", "당당한", "당당함", "당황하", "당황하다", "당황했어", "당황한", "당황함",
-        "다정하", "다정하다", "다정해", "다정한", "다정함", "든든하", "든든하다", "든든해", "든든한", "든든함",
-        "무덤덤하", "무덤덤하다", "무덤덤해", "무덤덤한", "무덤덤함", "무기력하", "무기력하다", "무기력해", "무기력한", "무기력함",
-        "무섭", "무섭다", "무서워", "무서운", "무서움", "미안하", "미안하다", "미안해", "미안한", "미안함",
-        "분하", "분하다", "분해", "분한", "분함", "부끄럽", "부끄럽다", "부끄러워", "부끄러운", "부끄러움",
-        "불안하", "불안하다", "불안해", "불안한", "불안함", "뿌듯하", "뿌듯하다", "뿌듯해", "뿌듯한", "뿌듯함",
-        "비참하", "비참하다", "비참한", "비참함", "사랑하", "사랑하다", "사랑해", "사랑한", "사랑함",
-        "상실되", "상실되다", "상실감", "상실된", "상실됨", "설레", "설레다", "설레여", "설렌다",
-        "슬프", "슬프다", "슬퍼", "슬펐어", "슬픈", "슬픔", "스트레스", "스트레스 받아", "스트레스 받다", "스트레스를 받은",
-        "스트레스 받음", "싫", "싫다", "싫어", "싫은", "싫음", "심란하", "심란하다", "심란해", "심란한", "심란함",
-        "신나", "신난다", "신났어", "신나는", "신남", "아무 느낌 없어", "애틋하", "애틋하다", "애틋해", "애틋한", "애틋함",
-        "얼떨떨하", "얼떨떨하다", "얼떨떨해", "얼떨떨한", "얼떨떨함", "억울하", "억울하다", "억울해", "억울한", "억울함",
-        "여유롭", "여유롭다", "여유로워", "여유로운", "여유로움", "연민", "우울하", "우울하다", "우울해", "우울한", "우울함",
-        "웃기", "웃긴", "웃김", "위로 받고 싶다", "위로 받고 싶어", "위로가 필요해", "유쾌하", "유쾌하다", "유쾌해", "유쾌한", "유쾌함",
-        "의기소침하", "의기소침하다", "의기소침한", "의기소침함", "이해받고 싶어", "자랑스럽", "자랑스럽다", "자랑스러워", "자랑스러운", "자랑스러움",
-        "자신 있", "자신 있다", "자신있어", "자신감", "재미없", "재미없다", "재미없어", "재미없는", "재미없음",
-        "적적하", "적적하다", "적적한", "적적함", "조마조마하", "조마조마하다", "조마조마해", "조마조마한", "조마조마함",
-        "죄책감", "죄책감 들어", "즐겁", "즐겁다", "즐거워", "즐거운", "즐거웠", "즐거움", "지루하", "지루하다", "지루해", "지루한", "지루함",
-        "지치", "지쳤", "지치다", "지쳤어", "지친", "지침", "진절머리", "차분하", "차분하다", "차분해", "차분한", "차분함",
-        "창피하", "창피하다", "창피해", "창피한", "창피함", "초조하", "초조하다", "초조해", "초조한", "초조함",
-        "칭찬받고 싶어", "편안하", "편안하다", "편안해", "편안한", "편안함", "평온하", "평온하다", "평온해", "평온한", "평온함",
-        "피곤하", "피곤하다", "피곤해", "피곤한", "피곤함", "혼란스럽", "혼란스럽다", "혼란스러워", "혼란스러운", "혼란스러움",
-        "화나", "화나다", "화났어", "화난", "화남", "흥미롭", "흥미롭다", "흥미로워", "흥미로운", "흥미로움", "기분이 나빠", 
-        "나빠", "나쁘다", "나쁜", "나쁨", "기분이 이상해", "이상해", "이상하다", "이상한", "이상함", "기분이 구려", "구려", "구리다", "구린", "구림",
-        "기분이 안 좋아", "기분 별로야", "찝찝해", "속상해", "짜증나 죽겠어", "현타 와", "멘붕이야",
-        "기운이 없어", "불편해", "허탈해", "피곤해서 아무것도 하기 싫어", "우울한 하루", "답답해",
-        "억울해 죽겠어", "열받아", "터질 거 같아", "현실도피하고 싶어", "도망가고 싶어",
-        "기분 좋다", "날아갈 것 같아", "행복해 죽겠어", "상쾌해", "기대돼서 잠이 안 와", "기분 최고",
-        "뭔가 설레", "괜히 웃음 나와", "힐링되는 기분", "뭔가 잘 풀리는 느낌이야",
-        "마음이 복잡해", "감정이 뒤죽박죽이야", "묘한 감정이야", "기분이 뭔가 이상해",
-        "불안한데 기대돼", "슬픈데 편안해", "좋은데 무서워",
-        "기분좋아", "기분이좋아", "기분좋다", "기분최고", "기분이최고", "기분나빠", "기분이나빠",
-        "기분별로야", "기분이별로야", "기분이이상해", "기분이구려", "기분이뭔가이상해",
-        "행복해죽겠어", "짜증나죽겠어", "억울해죽겠어", "현실도피하고싶어", "도망가고싶어",
-        "피곤해서아무것도하기싫어"
-    ]
-
-    return any(kw in lowered for kw in emotion_keywords)
+    return "emotion" in detect_intents(text)
 
 
 
 # ────────────────────────────────────────────────────────────────────────────────────
-# 4) 인사/작별 감지 함수
+# 5) 인사/작별 감지 함수
 #    - 함수명: is_greeting
 #    - 역할: 텍스트에 인사 또는 작별 키워드 포함 여부 판별 후 타입 반환
 # ────────────────────────────────────────────────────────────────────────────────────
 
 def is_greeting(text):
-    farewell_keywords = ["잘 가", "다음에", "또 봐", "그럼 안녕", "나 갈게", "끝"]
-    greeting_keywords = ["안녕", "하이", "안녕하세요", "반가워"]
-    text = text.lower()
-    if any(kw in text for kw in farewell_keywords):
+    found = detect_intents(text)
+    if "farewell" in found:
         return "farewell"
-    elif any(kw in text for kw in greeting_keywords):
+    elif "greeting" in found:
         return "greeting"
     return None
@@ -0,0 +1,95 @@
+# -----------------------------------------------------------------------------------
+# 파일 이름   : Matcher.py
+# 설명        : 다중 키워드 매처 - 감정/인사/감사/재추천/작별 감지를 한 번의 선형 스캔으로 처리
+# 주요 기능   :
+#   1) KeywordMatcher : {카테고리: 키워드 목록} 으로 Aho-Corasick 오토마톤을 한 번만 구성
+#   2) find_all       : 메시지를 한 번 훑어 (카테고리, 키워드, 시작, 끝) 매치 목록 반환
+#   3) categories     : 매치된 카테고리 집합 (첫 매치 위치도 함께 제공하는 first 포함)
+#   4) 부분 문자열 포함 판정은 기존 any(kw in text ...) 와 동일 (대소문자 무시)
+# 요구 모듈   : collections
+# -----------------------------------------------------------------------------------
+
+from collections import deque, namedtuple
+
+Match = namedtuple("Match", ["category", "keyword", "start", "end"])
+
+
+# ────────────────────────────────────────────────────────────────────────────────────
+# 1) KeywordMatcher
+#    - 노드 = 전이(dict) + 실패 링크 + 출력 목록 (이 노드에서 끝나는 (키워드, 카테고리))
+#    - 실패 링크를 따라온 노드의 출력도 미리 합쳐 두어 스캔 중에는 링크를 한 번만 탐
+#    - 시간 복잡도: 구성 O(키워드 총 길이), 스캔 O(메시지 길이 + 매치 수)
+# ────────────────────────────────────────────────────────────────────────────────────
+class KeywordMatcher:
+    def __init__(self, keywords_by_category):
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+        for category, keywords in keywords_by_category.items():
+            for keyword in keywords:
+                self._add(keyword.lower(), category)
+        self._build()
+
+    def _add(self, keyword, category):
+        if not keyword:
+            return
+        node = 0
+        for ch in keyword:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+                self._goto[node][ch] = nxt
+            node = nxt
+        if (keyword, category) not in self._out[node]:
+            self._out[node].append((keyword, category))
+
+    def _build(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self._goto[node].items():
+                queue.append(nxt)
+                f = self._fail[node]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                target = self._goto[f].get(ch, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+        # categories() 전용: 노드별 카테고리 집합 (매치 객체를 만들지 않는 빠른 경로)
+        self._cats = [frozenset(c for _, c in out) for out in self._out]
+
+    def find_all(self, text):
+        """모든 매치 (겹치는 것 포함) 를 끝 위치 순서로 반환"""
+        goto, fail, out = self._goto, self._fail, self._out
+        node = 0
+        found = []
+        for i, ch in enumerate((text or "").lower()):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for keyword, category in out[node]:
+                found.append(Match(category, keyword, i + 1 - len(keyword), i + 1))
+        return found
+
+    def first(self, text):
+        """카테고리 → 가장 먼저 시작하는 매치"""
+        result = {}
+        for m in self.find_all(text):
+            if m.category not in result or m.start < result[m.category].start:
+                result[m.category] = m
+        return result
+
+    def categories(self, text):
+        goto, fail, cats = self._goto, self._fail, self._cats
+        node = 0
+        found = set()
+        for ch in (text or "").lower():
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if cats[node]:
+                found |= cats[node]
+        return found
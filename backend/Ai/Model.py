@@ -2,25 +2,29 @@
 # 파일 이름   : Model.py
 # 설명        : Cohere 기반 DMM(Dispatch Mapping Model) 모듈 – 입력 쿼리를 태스크별 명령어로 분류
 # 주요 기능   :
-#   1) .env 파일에서 Cohere API 키 로드 및 클라이언트 초기화
+#   1) Cohere 클라이언트는 providers 레지스트리에서 첫 사용 시 생성 (키는 settings)
 #   2) 태스크 키워드 목록 정의 및 대화 이력(preamble, ChatHistory) 설정
 #   3) FirstLayerDMM 함수로 입력 쿼리 분류 및 태스크 리스트 반환
+#      로컬 분류기(LocalDMM)가 확신하는 질의는 Cohere 호출 없이 처리, 나머지만 Cohere 로 전송
+#      Cohere 결과는 질의별로 캐시, 잘못된 응답 재시도 횟수 제한
 #   4) 스크립트 직접 실행 시 반복 입력으로 분류 결과 테스트
-# 요구 모듈   : cohere, rich, python-dotenv, os, datetime
+# 요구 모듈   : providers(cohere), rich(직접 실행 시), os, logging, threading, LocalDMM, cache, metrics
 # -----------------------------------------------------------------------------------
 
-import cohere 
-from rich import print 
-from dotenv import dotenv_values 
+import os
+import logging
+import threading
 
-env_vars = dotenv_values(".env")
-CohereAPIKey = env_vars.get("CohereAPIKey")
-co = cohere.Client(api_key=CohereAPIKey)
+import providers
+from Ai import LocalDMM
+from cache import TTLCache, register_stats
+from metrics import span, inc
+
+logger = logging.getLogger(__name__)
 
 # ────────────────────────────────────────────────────────────────────────────────────
 # 1) 태스크 키워드 및 대화 이력 설정
 #    - funcs: 지원하는 태스크 키워드 목록
-#    - messages: 사용자 입력 이력 저장용 리스트
 #    - preamble: DMM 분류용 시스템 프롬프트
 #    - ChatHistory: 샘플 대화 히스토리
 # ────────────────────────────────────────────────────────────────────────────────────
@@ -30,8 +34,6 @@ funcs = [
   "youtube search", "reminder"
 ]
 
-messages = []
-
 preamble = """
 당신은 매우 정확한 결정 모델입니다. 주어진 쿼리가 어떤 종류의 작업인지 판단해주세요.
 예를 들어,
@@ -57,17 +59,62 @@ ChatHistory = [
 ]
 
 # ────────────────────────────────────────────────────────────────────────────────────
-# 2) FirstLayerDMM 함수 정의
+# 2) 빠른 경로·캐시·재시도 설정
+#    - DMM_LOCAL              : 0 이면 로컬 분류기를 쓰지 않고 모든 질의를 Cohere 로 보냄
+#    - DMM_LOCAL_MIN_CONFIDENCE: 로컬 분류 결과를 그대로 쓰는 최소 신뢰도
+#    - DMM_CACHE_SIZE / TTL   : Cohere 분류 결과 캐시 (정규화한 질의 → 태스크 목록)
+#    - DMM_MAX_ATTEMPTS       : 응답이 비었거나 "(query)" 자리표시자를 그대로 돌려줄 때 최대 시도 횟수
+#                               (다 실패하면 general 태스크로 처리)
+# ────────────────────────────────────────────────────────────────────────────────────
+DMM_LOCAL = os.getenv("DMM_LOCAL", "1") == "1"
+DMM_LOCAL_MIN_CONFIDENCE = float(os.getenv("DMM_LOCAL_MIN_CONFIDENCE", "0.8"))
+DMM_CACHE_SIZE = int(os.getenv("DMM_CACHE_SIZE", "4096"))
+DMM_CACHE_TTL = float(os.getenv("DMM_CACHE_TTL", str(60 * 60)))
+DMM_MAX_ATTEMPTS = int(os.getenv("DMM_MAX_ATTEMPTS", "2"))
+
+_PLACEHOLDERS = ("(query)", "(쿼리)")
+
+dmm_cache = TTLCache("dmm_cache", maxsize=DMM_CACHE_SIZE, ttl=DMM_CACHE_TTL)
+
+_counter_lock = threading.Lock()
+dmm_counters = {"calls": 0, "local": 0, "cached": 0, "cohere_calls": 0, "retries": 0, "fallbacks": 0}
+_local_sources = {}   # "rule:app" / "model" 등 → 처리 건수
+
+
+def _count(name, amount=1):
+    with _counter_lock:
+        dmm_counters[name] += amount
+
+
+def dmm_stats():
+    with _counter_lock:
+        counters = dict(dmm_counters)
+        sources = dict(_local_sources)
+    calls = counters["calls"]
+    return {
+        **counters,
+        "local_sources": sources,
+        "local_model": LocalDMM.model_status(),
+        # 빠른 경로(로컬 분류)가 흡수한 비율, 캐시까지 포함해 Cohere 를 부르지 않은 비율
+        "fast_path_rate": round(counters["local"] / calls, 4) if calls else 0.0,
+        "absorbed_rate": round((counters["local"] + counters["cached"]) / calls, 4) if calls else 0.0,
+    }
+
+
+register_stats("dmm", dmm_stats)
+
+# ────────────────────────────────────────────────────────────────────────────────────
+# 3) FirstLayerDMM 함수 정의
 #    - 함수명: FirstLayerDMM
-#    - 역할   : Cohere DMM 모델에 프롬프트 전송 후 태스크별로 분류된 리스트 반환
+#    - 역할   : 로컬 분류 → 캐시 → Cohere DMM 순서로 태스크별로 분류된 리스트 반환
 #    - Args   :
 #        prompt (str): 분류할 사용자 입력 문자열
 #    - Returns:
 #        List[str]: '키워드 (파라미터)' 형식으로 분류된 태스크 문자열 리스트
 # ────────────────────────────────────────────────────────────────────────────────────
-def FirstLayerDMM(prompt: str = "test"):
-    messages.append({"role": "user", "content": prompt})
-    stream = co.chat_stream (
+@span("cohere.dmm")
+def _ask_cohere(prompt):
+    stream = providers.get("cohere").chat_stream (
         model='command-r-plus', 
         message=prompt,
         temperature=0.7,
@@ -88,17 +135,50 @@ def FirstLayerDMM(prompt: str = "test"):
         for func in funcs:
             if task.startswith(func):
                 temp.append(task)
-    response = temp
-    if "(query)" in response:
-        newresponse = FirstLayerDMM(prompt=prompt)
-        return newresponse
-    else:
-        return response
+    return temp
+
+
+@span("dmm")
+def FirstLayerDMM(prompt: str = "test"):
+    _count("calls")
+
+    if DMM_LOCAL:
+        decision = LocalDMM.classify(prompt)
+        if decision.tasks and decision.confidence >= DMM_LOCAL_MIN_CONFIDENCE:
+            _count("local")
+            with _counter_lock:
+                _local_sources[decision.source] = _local_sources.get(decision.source, 0) + 1
+            return list(decision.tasks)
+
+    key = " ".join(prompt.split()).lower()
+    cached = dmm_cache.get(key)
+    if cached is not None:
+        _count("cached")
+        return list(cached)
+
+    for attempt in range(max(1, DMM_MAX_ATTEMPTS)):
+        if attempt:
+            _count("retries")
+        _count("cohere_calls")
+        try:
+            response = _ask_cohere(prompt)
+        except Exception as e:
+            logger.warning("DMM 호출 실패: %s", e)
+            inc("upstream_errors_total", service="cohere")
+            break
+        if response and not any(p in task for task in response for p in _PLACEHOLDERS):
+            dmm_cache.set(key, response)
+            return list(response)
+
+    # 분류 실패 - 일반 대화로 처리 (캐시하지 않고 다음 요청에서 다시 시도)
+    _count("fallbacks")
+    return [f"general {prompt}"]
   
 # ────────────────────────────────────────────────────────────────────────────────────
-# 3) 스크립트 직접 실행용 엔트리포인트
+# 4) 스크립트 직접 실행용 엔트리포인트
 #    - 사용자 입력을 받아 FirstLayerDMM 결과를 반복 출력
 # ────────────────────────────────────────────────────────────────────────────────────
 if __name__ == "__main__":
+    from rich import print
     while True:
         print(FirstLayerDMM(input(">>> ")))
\ No newline at end of file
@@ -2,29 +2,26 @@
 # 파일 이름   : realtime_search_service.py
 # 설명        : Groq LLM과 구글 검색 연동을 통해 최신 정보를 실시간으로 제공하는 모듈
 # 주요 기능   :
-#   1) .env 파일에서 환경 변수(Username, Assistantname, GroqAPIKey) 로드
+#   1) 공용 settings 에서 Username, Assistantname 사용, Groq 클라이언트·googlesearch 는 첫 호출 시 로드
 #   2) 구글 검색(GoogleSearch) 함수로 상위 5개 결과 수집
 #   3) LLM 응답 후후 처리를 위한 AnswerModifier 함수
 #   4) 실시간 정보(날짜·시간·요일) 제공 함수 Information
 #   5) RealtimeSearchEngine 엔드포인트 로직 구현
 #   6) __main__ 블록에서 반복 입력 테스트 지원
-# 요구 모듈   : googlesearch, groq, json, datetime, python-dotenv, os
+# 요구 모듈   : googlesearch, providers(groq), settings, datetime, History, Context, metrics
 # -----------------------------------------------------------------------------------
 
-from googlesearch import search
-from groq import Groq
-from json import load, dump
 import datetime
-from dotenv import dotenv_values
 
-# .env 파일에서 환경변수 로드
-env_vars = dotenv_values(".env")
-Username = env_vars.get("Username")
-Assistantname = env_vars.get("Assistantname")
-GroqAPIKey = env_vars.get("GroqAPIKey")
+import providers
+from settings import settings
+from Ai import History
+from Ai.Context import build_messages
+from metrics import span
 
-# Groq 클라이언트 초기화
-client = Groq(api_key=GroqAPIKey)
+# .env 는 settings 가 한 번만 로드, Groq 클라이언트는 providers.get("groq") 로 첫 호출 때 생성
+Username = settings.username
+Assistantname = settings.assistantname
 
 # 시스템 메시지를 한국어로 작성
 System = f"""안녕하세요, 저는 {Username}입니다. 당신은 {Assistantname}이라는 이름의 고급 AI 챗봇이며, 최신 정보를 실시간으로 제공합니다.
@@ -32,14 +29,6 @@ System = f"""안녕하세요, 저는 {Username}입니다. 당신은 {Assistantna
 *** 제공된 데이터를 바탕으로 질문에 정확하게 답변해주세요. ***
 """
 
-# ChatLog 파일 읽기/쓰기 (Data/ChatLog.json)
-try:
-    with open("Data/ChatLog.json", "r", encoding="utf-8") as f:
-        messages = load(f)
-except:
-    with open("Data/ChatLog.json", "w", encoding="utf-8") as f:
-        dump([], f)
-
 # ────────────────────────────────────────────────────────────────────────────────────
 # 1) GoogleSearch 함수
 #    - 역할: 주어진 쿼리에 대해 구글 검색 결과 상위 5건을 제목·설명과 함께 반환
@@ -48,7 +37,9 @@ except:
 #    - Returns:
 #        str: 포맷팅된 검색 결과 문자열
 # ────────────────────────────────────────────────────────────────────────────────────
+@span("google_search")
 def GoogleSearch(query):
+    from googlesearch import search   # 실시간 검색을 처음 쓸 때만 import
     results = list(search(query, advanced=True, num_results=5))
     Answer = f"'{query}'에 대한 구글 검색 결과:\n[start]\n"
     for i in results:
@@ -95,41 +86,54 @@ def Information():
 
 # ────────────────────────────────────────────────────────────────────────────────────
 # 4) RealtimeSearchEngine 함수
-#    - 역할: 채팅 로그 로드, 사용자 메시지 추가, 구글 검색 결과 삽입 후
-#            Groq LLM에 스트리밍 요청하고 응답 저장/반환
+#    - 역할: 세션 기록의 최근 메시지 로드, 사용자 메시지 추가, 구글 검색 결과 삽입 후
+#            토큰 예산 안으로 조립한 프롬프트로 Groq LLM에 스트리밍 요청하고
+#            응답을 세션 기록에 추가/반환
+#    - RealtimeSearchEngineStream 은 응답 조각을 받는 즉시 yield
 #    - Args:
 #        prompt (str): 사용자 입력 프롬프트
+#        session_id (str): 기록을 나눌 채팅 세션 ID (없으면 공용 기록)
 #    - Returns:
 #        str: 정제된 LLM 응답 문자열
 # ────────────────────────────────────────────────────────────────────────────────────
-def RealtimeSearchEngine(prompt):
-    global SystemChatBot, messages
-    with open("Data/ChatLog.json", "r", encoding="utf-8") as f:
-        messages = load(f)
-    messages.append({"role": "user", "content": prompt})
-    
-    # 구글 검색 결과 추가
-    SystemChatBot.append({"role": "assistant", "content": GoogleSearch(prompt)})
-    
-    completion = client.chat.completions.create(
+REALTIME_MAX_TOKENS = 2048
+
+def RealtimeSearchEngineStream(prompt, session_id=None):
+    question = {"role": "user", "content": prompt}
+    history = History.recent(session_id, History.HISTORY_KEEP)
+
+    # 구글 검색 결과는 이번 호출의 프롬프트에만 추가 (공용 SystemChatBot 은 건드리지 않음)
+    search_result = {"role": "assistant", "content": GoogleSearch(prompt)}
+    messages = build_messages(
+        SystemChatBot + [search_result, {"role": "system", "content": Information()}],
+        history + [question],
+        max_output_tokens=REALTIME_MAX_TOKENS,
+        session_id=session_id,
+    )
+
+    completion = providers.get("groq").chat.completions.create(
         model="llama3-70b-8192",
-        messages=SystemChatBot + [{"role": "system", "content": Information()}] + messages,
+        messages=messages,
         temperature=0.7,
-        max_tokens=2048,
+        max_tokens=REALTIME_MAX_TOKENS,
         top_p=1,
         stream=True,
         stop=None
     )
-    Answer = ""
+    parts = []
     for chunk in completion:
-        if chunk.choices[0].delta.content:
-            Answer += chunk.choices[0].delta.content
-    Answer = Answer.strip().replace("</s>", "")
-    messages.append({"role": "assistant", "content": Answer})
-    with open("Data/ChatLog.json", "w", encoding="utf-8") as f:
-        dump(messages, f, indent=4)
-    SystemChatBot.pop()  # 추가된 시스템 메시지 제거
-    return AnswerModifier(Answer=Answer)
+        delta = chunk.choices[0].delta.content
+        if delta:
+            delta = delta.replace("</s>", "")
+            parts.append(delta)
+            yield delta
+    Answer = "".join(parts).strip().replace("</s>", "")
+    History.append(session_id, question, {"role": "assistant", "content": Answer})
+
+@span("realtime_search")
+def RealtimeSearchEngine(prompt, session_id=None):
+    Answer = "".join(RealtimeSearchEngineStream(prompt, session_id))
+    return AnswerModifier(Answer=Answer.strip())
 
 # ────────────────────────────────────────────────────────────────────────────────────
 # 5) 스크립트 직접 실행용 엔트리포인트
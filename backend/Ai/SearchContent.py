@@ -2,44 +2,215 @@
 # 파일 이름   : SearchContent.py
 # 설명        : Google Maps Places API를 사용하여 지정된 음식과 위치 기준으로 근처 음식점을 검색하는 유틸 모듈
 # 주요 기능   :
-#   1) .env 파일에서 GOOGLE_MAPS_API_KEY 로드
-#   2) find_restaurant_nearby 함수로 음식 및 위치 기준 첫 번째 검색 결과 반환
-# 요구 모듈   : requests, python-dotenv, os
+#   1) 공용 settings 에서 GOOGLE_MAPS_API_KEY, PLACES_BASE_URL 사용
+#   2) search_restaurants 함수로 음식 및 위치 기준 검색 결과 전체 목록 반환 (캐시 사용)
+#   3) rank_places / find_restaurant_candidates 로 평점·리뷰 수·거리 기준 상위 K개 후보 반환
+#      find_restaurant_nearby 는 그중 1위 반환
+#   4) 검색 결과 캐시 - (음식, 위치) 또는 좌표의 geohash 칸 단위, 메모리 LRU + SQLite
+#      (SQLite 계층은 aget/aset 으로 스레드에서 조회·저장 - 이벤트 루프를 막지 않음)
+#   5) Places 호출은 공용 비동기 HTTP 클라이언트(HttpClient) 사용 - 타임아웃·재시도·서킷 브레이커
+# 요구 모듈   : settings, os, re, math, logging, cache, HttpClient, metrics
 # -----------------------------------------------------------------------------------
-import requests
 import os
-from dotenv import load_dotenv
+import re
+import math
+import logging
 
-load_dotenv()
-GOOGLE_MAPS_API_KEY = os.getenv("GOOGLE_MAPS_API_KEY")
+from settings import settings
+from cache import TTLCache, SQLiteCache, TieredCache
+from Ai.HttpClient import request_json, UpstreamError
+from metrics import span
 
-def find_restaurant_nearby(food, location="서울, 경기"):
-    endpoint = "https://maps.googleapis.com/maps/api/place/textsearch/json"
-    params = {
-        "query": f"{location} {food}",
-        "key": GOOGLE_MAPS_API_KEY,
-        "language": "ko"
+logger = logging.getLogger(__name__)
+
+GOOGLE_MAPS_API_KEY = settings.google_maps_api_key
+# 로컬 스텁 서버로 바꿔 끼울 수 있도록 기본 URL 을 환경 변수로 둠
+PLACES_BASE_URL = settings.places_base_url
+
+# ────────────────────────────────────────────────────────────────────────────────────
+# 1) 검색 결과 캐시
+#    - PLACES_CACHE_TTL      : 결과가 있는 검색의 보관 시간(초)
+#    - PLACES_NEGATIVE_TTL   : ZERO_RESULTS(결과 없음) 보관 시간(초) - 같은 헛검색 반복 방지
+#    - PLACES_CACHE_SIZE     : 메모리 LRU 항목 수 (SQLite 계층은 그 10배까지)
+#    - PLACES_GEOHASH_PRECISION / PLACES_RADIUS_M : 좌표 검색 시 캐시 칸 크기·검색 반경
+#    - OVER_QUERY_LIMIT 등 일시적 오류는 캐시하지 않음
+# ────────────────────────────────────────────────────────────────────────────────────
+PLACES_CACHE_TTL = float(os.getenv("PLACES_CACHE_TTL", str(24 * 60 * 60)))
+PLACES_NEGATIVE_TTL = float(os.getenv("PLACES_NEGATIVE_TTL", str(60 * 60)))
+PLACES_CACHE_SIZE = int(os.getenv("PLACES_CACHE_SIZE", "4096"))
+PLACES_GEOHASH_PRECISION = int(os.getenv("PLACES_GEOHASH_PRECISION", "6"))   # 약 1.2km × 0.6km
+PLACES_RADIUS_M = int(os.getenv("PLACES_RADIUS_M", "2000"))
+
+places_cache = TieredCache(
+    TTLCache("places_memory", maxsize=PLACES_CACHE_SIZE, ttl=PLACES_CACHE_TTL),
+    SQLiteCache("places", ttl=PLACES_CACHE_TTL, max_rows=PLACES_CACHE_SIZE * 10),
+)
+
+_COORDS = re.compile(r"^\s*(-?\d{1,2}(?:\.\d+)?)\s*,\s*(-?\d{1,3}(?:\.\d+)?)\s*$")
+_GEOHASH_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def geohash(lat, lng, precision=PLACES_GEOHASH_PRECISION):
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    bits, bit_count, even, out = 0, 0, True, []
+    while len(out) < precision:
+        rng, value = (lng_range, lng) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        bits <<= 1
+        if value >= mid:
+            bits |= 1
+            rng[0] = mid
+        else:
+            rng[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            out.append(_GEOHASH_BASE32[bits])
+            bits, bit_count = 0, 0
+    return "".join(out)
+
+
+def parse_coordinates(location):
+    """'37.5665,126.9780' 형식이면 (lat, lng), 아니면 None"""
+    match = _COORDS.match(location or "")
+    if not match:
+        return None
+    lat, lng = float(match.group(1)), float(match.group(2))
+    if -90 <= lat <= 90 and -180 <= lng <= 180:
+        return lat, lng
+    return None
+
+
+def _normalize(text):
+    return " ".join((text or "").lower().split())
+
+
+def places_cache_key(food, location):
+    coords = parse_coordinates(location)
+    area = f"gh:{geohash(*coords)}" if coords else f"loc:{_normalize(location)}"
+    return f"{area}|{_normalize(food)}"
+
+
+def _to_place(place):
+    return {
+        "name": place.get("name"),
+        "address": place.get("formatted_address"),
+        "latitude": place["geometry"]["location"]["lat"],
+        "longitude": place["geometry"]["location"]["lng"],
+        "rating": place.get("rating"),
+        "reviews": place.get("user_ratings_total"),
+        "place_id":place.get("place_id")
     }
-    
-    print("🔍 검색 쿼리:", params["query"])
-
-    res = requests.get(endpoint, params=params)
-    results = res.json()
-
-    if results.get("status") == "OK" and results["results"]:
-        place = results["results"][0]
-        
-        print("📍 검색된 장소:", place.get("name"))
-        print("🗺️  좌표:", place["geometry"]["location"]["lat"], place["geometry"]["location"]["lng"])
-        
-        return {
-            "name": place.get("name"),
-            "address": place.get("formatted_address"),
-            "latitude": place["geometry"]["location"]["lat"],
-            "longitude": place["geometry"]["location"]["lng"],
-            "rating": place.get("rating"),
-            "reviews": place.get("user_ratings_total"),
-            "place_id":place.get("place_id")
+
+
+# ────────────────────────────────────────────────────────────────────────────────────
+# 2) 후보 순위
+#    - 평점은 리뷰 수로 보정한 베이지안 평균: (v·R + m·C) / (v + m)
+#      → 리뷰 3개짜리 5.0점이 리뷰 500개짜리 4.6점보다 앞서지 않도록
+#    - 검색 위치가 좌표면 1km 당 RANK_DISTANCE_WEIGHT 점 감점, distance_m 필드 추가
+#    - PLACES_TOP_K        : 쿼리당 남기는 후보 수
+#    - RANK_PRIOR_REVIEWS  : m (보정에 쓰는 가상 리뷰 수)
+#    - RANK_PRIOR_RATING   : C (리뷰가 적을 때 끌려가는 기준 평점)
+# ────────────────────────────────────────────────────────────────────────────────────
+PLACES_TOP_K = int(os.getenv("PLACES_TOP_K", "5"))
+RANK_PRIOR_REVIEWS = float(os.getenv("RANK_PRIOR_REVIEWS", "50"))
+RANK_PRIOR_RATING = float(os.getenv("RANK_PRIOR_RATING", "3.5"))
+RANK_DISTANCE_WEIGHT = float(os.getenv("RANK_DISTANCE_WEIGHT", "0.1"))
+
+
+def haversine_m(lat1, lng1, lat2, lng2):
+    r = 6_371_000
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp, dl = p2 - p1, math.radians(lng2 - lng1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * r * math.asin(math.sqrt(a))
+
+
+def place_score(place, origin=None):
+    rating = place.get("rating") or 0.0
+    reviews = place.get("reviews") or 0
+    score = (reviews * rating + RANK_PRIOR_REVIEWS * RANK_PRIOR_RATING) / (reviews + RANK_PRIOR_REVIEWS)
+    if origin is not None:
+        score -= RANK_DISTANCE_WEIGHT * place["distance_m"] / 1000
+    return score
+
+
+def rank_places(places, location=None, top_k=PLACES_TOP_K):
+    """검색 결과를 점수 순으로 정렬해 place_id 기준 중복 없이 상위 top_k 개 반환"""
+    origin = parse_coordinates(location)
+    ranked, seen = [], set()
+    for place in places:
+        pid = place.get("place_id") or place.get("name")
+        if pid in seen:
+            continue
+        seen.add(pid)
+        place = dict(place)   # 캐시에 들어 있는 원본은 건드리지 않음
+        if origin is not None:
+            place["distance_m"] = round(haversine_m(*origin, place["latitude"], place["longitude"]))
+        ranked.append(place)
+    ranked.sort(key=lambda p: place_score(p, origin), reverse=True)
+    return ranked[:top_k]
+
+
+# ────────────────────────────────────────────────────────────────────────────────────
+# 3) 검색 함수
+# ────────────────────────────────────────────────────────────────────────────────────
+async def search_restaurants(food, location="서울, 경기"):
+    """Places Text Search 결과 전체 목록 (캐시 우선, 결과 없거나 상류 장애면 빈 리스트)"""
+    key = places_cache_key(food, location)
+    cached = await places_cache.aget(key)
+    if cached is not None:
+        return cached
+
+    endpoint = f"{PLACES_BASE_URL}/maps/api/place/textsearch/json"
+    coords = parse_coordinates(location)
+    if coords:
+        params = {
+            "query": food,
+            "location": f"{coords[0]},{coords[1]}",
+            "radius": PLACES_RADIUS_M,
+            "key": GOOGLE_MAPS_API_KEY,
+            "language": "ko"
+        }
+    else:
+        params = {
+            "query": f"{location} {food}",
+            "key": GOOGLE_MAPS_API_KEY,
+            "language": "ko"
         }
 
-    return None
\ No newline at end of file
+    logger.debug("Places 검색 쿼리: %s", params["query"])
+
+    try:
+        with span("places.request"):
+            results = await request_json("places", "GET", endpoint, params=params)
+    except UpstreamError as e:
+        # 장애는 캐시하지 않고 '결과 없음'으로 처리 (서킷이 열려 있으면 즉시 여기로 옴)
+        logger.warning("Places 호출 실패: %s", e)
+        return []
+    status = results.get("status")
+
+    if status == "OK" and results["results"]:
+        places = [_to_place(p) for p in results["results"]]
+        await places_cache.aset(key, places)
+        return places
+
+    if status == "ZERO_RESULTS":
+        await places_cache.aset(key, [], ttl=PLACES_NEGATIVE_TTL)
+    return []
+
+
+@span("find_restaurant_candidates")   # find_restaurant_nearby 도 이 함수를 거침
+async def find_restaurant_candidates(food, location="서울, 경기", top_k=PLACES_TOP_K):
+    """순위를 매긴 상위 top_k 개 후보 (없으면 빈 리스트)"""
+    return rank_places(await search_restaurants(food, location), location, top_k)
+
+
+async def find_restaurant_nearby(food, location="서울, 경기"):
+    places = await find_restaurant_candidates(food, location, top_k=1)
+    if not places:
+        return None
+
+    place = places[0]
+    logger.debug("검색된 장소: %s (%s, %s)", place.get("name"), place["latitude"], place["longitude"])
+    return place
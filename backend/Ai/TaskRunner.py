@@ -0,0 +1,132 @@
+# -----------------------------------------------------------------------------------
+# 파일 이름   : TaskRunner.py
+# 설명        : DMM 태스크 동시 실행기 - 복합 질의의 여러 태스크를 병렬로 돌리고 원래 순서로 결과 조립
+# 주요 기능   :
+#   1) run_ordered : 태스크(조각을 내는 함수) 목록을 공용 풀에서 동시에 실행, 출력은 원래 순서대로 yield
+#                    → 앞 태스크는 실시간으로 흘려보내고, 뒤 태스크는 끝나 있으면 바로 이어서 출력
+#   2) 질의당 동시 실행 수 제한 (DMM_TASK_PARALLEL) + 전체 스레드 수 제한 (DMM_TASK_WORKERS)
+#   3) 태스크별 제한 시간 (DMM_TASK_TIMEOUT) - 넘거나 실패한 태스크는 안내 문구로 대체하고 나머지는 계속
+# 요구 모듈   : concurrent.futures, threading, queue, time, os, logging, contextvars
+# -----------------------------------------------------------------------------------
+
+import os
+import time
+import queue
+import logging
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# ────────────────────────────────────────────────────────────────────────────────────
+# 1) 설정
+#    - DMM_TASK_WORKERS  : 모든 요청이 공유하는 태스크 실행 스레드 수
+#    - DMM_TASK_PARALLEL : 한 질의에서 동시에 실행하는 태스크 수
+#    - DMM_TASK_TIMEOUT  : 태스크 하나가 시작된 뒤 끝날 때까지 기다리는 최대 시간(초)
+# ────────────────────────────────────────────────────────────────────────────────────
+DMM_TASK_WORKERS = int(os.getenv("DMM_TASK_WORKERS", "16"))
+DMM_TASK_PARALLEL = int(os.getenv("DMM_TASK_PARALLEL", "4"))
+DMM_TASK_TIMEOUT = float(os.getenv("DMM_TASK_TIMEOUT", "30"))
+
+TIMEOUT_MESSAGE = "요청 처리 시간이 초과되어 이 부분은 답변하지 못했습니다.\n"
+FAILURE_MESSAGE = "이 부분은 처리하는 중 오류가 발생했습니다.\n"
+
+task_pool = ThreadPoolExecutor(max_workers=DMM_TASK_WORKERS, thread_name_prefix="dmm-task")
+
+_STARTED = object()
+_DONE = object()
+
+
+class _Failed:
+    def __init__(self, error):
+        self.error = error
+
+
+# ────────────────────────────────────────────────────────────────────────────────────
+# 2) 태스크 하나의 실행 상태
+#    - 실행 스레드는 조각을 queue 에 넣고, 소비 측은 마감 시각까지 queue 에서 꺼냄
+#    - 소비 측이 포기하면(시간 초과·연결 끊김) cancelled 를 세워 다음 조각에서 멈추게 함
+# ────────────────────────────────────────────────────────────────────────────────────
+class _Task:
+    def __init__(self, factory):
+        self.factory = factory
+        self.queue = queue.Queue()
+        self.cancelled = threading.Event()
+        self.started_at = None
+
+    def run(self):
+        if self.cancelled.is_set():
+            return
+        self.started_at = time.monotonic()
+        self.queue.put(_STARTED)
+        try:
+            for chunk in self.factory():
+                if self.cancelled.is_set():
+                    return
+                self.queue.put(chunk)
+        except Exception as e:
+            self.queue.put(_Failed(e))
+        else:
+            self.queue.put(_DONE)
+
+    def chunks(self, timeout):
+        """조각을 yield, 실패·시간 초과면 안내 문구 하나를 yield 하고 끝냄"""
+        deadline = time.monotonic() + timeout   # 시작 전(대기열)에도 같은 시간만 기다림
+        while True:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self.queue.get(timeout=max(0.0, remaining))
+            except queue.Empty:
+                self.cancelled.set()
+                logger.warning("DMM 태스크 시간 초과 (%.0f초)", timeout)
+                yield TIMEOUT_MESSAGE
+                return
+            if item is _STARTED:
+                deadline = self.started_at + timeout
+            elif item is _DONE:
+                return
+            elif isinstance(item, _Failed):
+                logger.warning("DMM 태스크 실패: %s", item.error)
+                yield FAILURE_MESSAGE
+                return
+            else:
+                yield item
+
+
+# ────────────────────────────────────────────────────────────────────────────────────
+# 3) run_ordered
+#    - factories[i]() 는 i 번째 태스크의 출력 조각을 내는 iterable 을 반환
+#    - 태스크가 하나뿐이면 스레드를 거치지 않고 현재 스레드에서 바로 실행
+#    - 질의당 동시 실행 수를 넘는 태스크는 앞 태스크가 끝날 때 이어서 제출
+# ────────────────────────────────────────────────────────────────────────────────────
+def run_ordered(factories, max_parallel=DMM_TASK_PARALLEL, timeout=DMM_TASK_TIMEOUT):
+    if len(factories) == 1:
+        try:
+            yield from factories[0]()
+        except Exception as e:
+            logger.warning("DMM 태스크 실패: %s", e)
+            yield FAILURE_MESSAGE
+        return
+
+    tasks = [_Task(f) for f in factories]
+    pending = iter(tasks)
+    lock = threading.Lock()
+    context = contextvars.copy_context()   # 로그의 요청 ID 를 태스크 스레드에도 전달
+
+    def submit_next(_future=None):
+        with lock:
+            task = next(pending, None)
+        if task is not None:
+            task_pool.submit(context.copy().run, task.run).add_done_callback(submit_next)
+
+    for _ in range(min(max(1, max_parallel), len(tasks))):
+        submit_next()
+
+    try:
+        for task in tasks:
+            yield from task.chunks(timeout)
+    finally:
+        # 소비 측이 중간에 끝나면 아직 도는 태스크도 멈추게 함
+        for task in tasks:
+            task.cancelled.set()
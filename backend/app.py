@@ -2,19 +2,23 @@
 # 파일 이름   : app.py
 # 설명        : FastAPI 기반 AI 챗봇 및 음식 추천 API 서버
 # 주요 기능   :
-#   1) .env 파일에서 환경 변수(SECRET_KEY, Maps_API_KEY) 로드
+#   1) 공용 settings 에서 환경 변수(SECRET_KEY, Maps_API_KEY) 사용 (.env 는 settings 가 한 번만 로드)
+#      로깅은 logconfig 의 큐 기반 JSON 로거 (요청 ID·라우트 포함, 비밀값 가림)
+#      /metrics : 라우트별 요청 지연·구간(GPT/Places/DMM/DB/bcrypt) 지연·상류 오류 (Prometheus 형식)
 #   2) SQLite DB 초기화 및 사용자·채팅·사진 메타 관리 유틸 함수 import
-#   3) FastAPI 앱 생성 및 CORS 설정
+#   3) FastAPI 앱 생성 및 CORS 설정, lifespan 에서 LLM 클라이언트 병렬 준비·종료 정리
+#      /healthz 준비 상태 확인 (DB 연결 + 클라이언트 준비)
 #   4) 이메일 유효성 검사·비밀번호 해싱 등 헬퍼 함수 정의
 #   5) 홈·회원가입·로그인 페이지 라우팅 엔드포인트
 #   6) 인증 API(signup, login, status, logout) 엔드포인트 구현
-#   7) AI 챗 & 음식 추천 엔드포인트(get_response) 구현
+#   7) AI 챗 & 음식 추천 엔드포인트(get_response) 구현 - 의도 라우터(chat_router)로 처리기 선택
+#      SSE 스트리밍 모드와 IntegratedAI 기반 스트리밍 챗(/api/chat/stream)
 #   8) 채팅 로그 조회·추가 API(read_chat_logs, add_chat_log) 구현
 #   9) 사진 업로드 API (주석 처리된 상태) 플랜 제공
-#   10) uvicorn을 통한 서버 실행 로직
-# 요구 모듈   : os, uuid, logging, datetime, re, fastapi, python-dotenv,
+#   10) uvicorn을 통한 서버 실행 로직 (개발용 단일 프로세스, 운영은 server.py 로 여러 워커 실행)
+# 요구 모듈   : os, uuid, logging, datetime, re, fastapi, settings, providers, logconfig,
 #               jwt, sqlite3, bcrypt, typing, random, pydantic,
-#               Logic, SearchContent
+#               Logic, SearchContent, Context, intent_router, streaming, metrics
 # -----------------------------------------------------------------------------------
 
 import os
@@ -22,38 +26,61 @@ import uuid
 import logging
 import datetime
 import re
+import hashlib
+import asyncio
+import functools
+import contextvars
+import time
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
 
 from fastapi import (
     FastAPI, Request, Response, Depends, Cookie, Form, HTTPException,
-    UploadFile, File, APIRouter
+    UploadFile, File, APIRouter, Query
 )
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse
 from fastapi.templating import Jinja2Templates
 from fastapi.middleware.cors import CORSMiddleware
-from dotenv import load_dotenv
 import jwt
 import sqlite3
-import bcrypt
 from typing import Optional
 import random
 from pydantic import BaseModel, Field, ConfigDict
 
+from settings import settings
+from logconfig import configure_logging, RequestContextMiddleware
+import metrics
+import providers
 from Ai.Logic import (
-    IntegratedAI, classify_emotion_and_reply_with_gpt, is_emotion_related
+    IntegratedAI, IntegratedAIStream, classify_emotion_and_reply_with_gpt,
+    classify_emotion_and_reply_stream, intent_matcher
 )
-from Ai.SearchContent import find_restaurant_nearby
+from Ai.SearchContent import find_restaurant_candidates
+from Ai import CandidateStore
+from Ai import History
+from Ai import HttpClient
+from Ai import Context
 
 from urllib.parse import unquote
 
+from cache import TTLCache, SQLiteCache, cache_stats
+import passwords
+from passwords import hash_password, check_password, needs_rehash, PasswordHasherBusy
+from intent_router import IntentRouter
+from streaming import StreamTimer, iterate_blocking, sse, sse_response
+
 # ────────────────────────────────────────────────
 # 1) 환경 변수 & 상수
 # ────────────────────────────────────────────────
-load_dotenv()
-ENV = os.getenv("APP_ENV", "development")
-SECRET_KEY = os.getenv("SECRET_KEY", "capstone-secret")
-Maps_API_KEY = os.getenv("Maps_API_KEY")
+configure_logging()
+logger = logging.getLogger("app")
+
+ENV = settings.app_env
+SECRET_KEY = settings.secret_key
+Maps_API_KEY = settings.maps_api_key
 DATABASE = "AICHAT_database.db"
-print(f"🔑 Loaded SECRET_KEY = {SECRET_KEY}", flush=True)
+if ENV == "production" and SECRET_KEY == "capstone-secret":
+    logger.warning("SECRET_KEY 가 기본값입니다 - 운영 환경에서는 .env 에 설정하세요")
 
 # 업로드 설정 (사용 예정)
 UPLOAD_DIR = os.path.join(os.path.dirname(__file__), "uploads")
@@ -64,41 +91,121 @@ ALLOWED_EXTENSIONS = {"png", "jpg", "jpeg", "gif"}
 # ────────────────────────────────────────────────
 from users import (
     init_db,
-    get_db, # sqlite 연결 + PRAGMA + row_factory
+    get_db, # 커넥션 풀에서 빌린 sqlite 연결 (with 문, PRAGMA + row_factory 설정 완료)
     save_chat,
     create_session, 
     read_sessions, 
     read_session_logs, 
+    read_sessions_page,
+    read_session_logs_page,
     add_log,
     add_bookmark,
     read_bookmarks,
     delete_bookmark,
     update_bookmark,
-    delete_session
+    delete_session,
+    read_user,
+    read_credentials,
+    create_user,
+    read_users,
+    session_owned_by,
+    update_password_hash,
+    pool as db_pool
 )
 
 # 앱 시작 시 한 번만 DB 스키마 생성
 init_db()
 
-# ─── 모든 세션 API에서 공용으로 쓰는 helper ─────────────
-def current_user_id_or_401(token: Optional[str]) -> int:
-    print(f"🛠 current_user_id_or_401() token: {token}", flush=True)
-    email = verify_token(token)
-    print(f"🛠 verify_token returned email: {email}", flush=True)
-    if not email:
+# ─── 모든 보호된 API에서 공용으로 쓰는 로그인 사용자 의존성 ─────────────
+#   - 토큰 → {"id", "name", "email"} 결과를 토큰 단위로 캐시해서
+#     같은 토큰의 후속 요청은 JWT 디코드·users 조회 없이 바로 통과
+#   - 캐시 수명은 AUTH_CACHE_TTL 과 JWT 남은 유효 시간 중 짧은 쪽
+#   - 로그아웃(api_logout) 하면 토큰을 폐기 목록에 넣어 JWT 가 만료될 때까지 거절
+#     · 폐기 목록은 캐시 적중 때도 확인 → 다른 워커에 캐시된 토큰도 로그아웃 즉시 거절
+#       (공유 모드는 SQLite 포인트 조회라 run_blocking 으로, 메모리 모드는 바로 확인)
+#     · AUTH_SHARED : 1 이면 폐기 목록을 SQLite 에 두어 워커끼리 공유 (기본: WEB_CONCURRENCY 가 2 이상이면 1)
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "4096"))
+AUTH_CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL", "300"))
+AUTH_SHARED = os.getenv(
+    "AUTH_SHARED", "1" if int(os.getenv("WEB_CONCURRENCY") or 1) > 1 else "0"
+) == "1"
+TOKEN_LIFETIME = datetime.timedelta(hours=3)
+auth_cache = TTLCache("auth", maxsize=AUTH_CACHE_SIZE, ttl=AUTH_CACHE_TTL)
+if AUTH_SHARED:
+    revoked_tokens = SQLiteCache("revoked_tokens", ttl=TOKEN_LIFETIME.total_seconds())
+else:
+    revoked_tokens = TTLCache("revoked_tokens", maxsize=AUTH_CACHE_SIZE * 4, ttl=TOKEN_LIFETIME.total_seconds())
+
+def token_key(token: str) -> str:
+    # 토큰 원문 대신 해시로 저장
+    return hashlib.sha256(token.encode()).hexdigest()
+
+def token_revoked(token: str) -> bool:
+    return revoked_tokens.get(token_key(token)) is not None
+
+def load_user(token: str, email: str) -> Optional[dict]:
+    """폐기되지 않은 토큰이면 사용자 조회 (둘 다 SQLite 일 수 있어 run_blocking 으로 호출)"""
+    if token_revoked(token):
+        raise HTTPException(401, "로그아웃된 토큰입니다. 다시 로그인해주세요.")
+    return read_user(email)
+
+def revoke_token(token: str, payload: dict) -> None:
+    auth_cache.pop(token)
+    ttl = payload.get("exp", 0) - time.time()
+    if ttl > 0:
+        revoked_tokens.set(token_key(token), True, ttl=ttl)
+
+async def current_user(token: Optional[str] = Cookie(None)) -> dict:
+    user = auth_cache.get(token) if token else None
+    if user is not None:
+        revoked = await run_blocking(token_revoked, token) if AUTH_SHARED else token_revoked(token)
+        if not revoked:
+            return user
+        auth_cache.pop(token)
+        raise HTTPException(401, "로그아웃된 토큰입니다. 다시 로그인해주세요.")
+    payload = decode_token(token)
+    if not payload or not payload.get("email"):
         raise HTTPException(401, "로그인이 필요합니다.")
-    conn = get_db(); cur = conn.cursor()
-    cur.execute("SELECT id FROM users WHERE email = ?", (email,))
-    row = cur.fetchone(); conn.close()
-    if not row:
+    user = await run_blocking(load_user, token, payload["email"])
+    if not user:
         raise HTTPException(401, "등록된 사용자가 아닙니다.")
-    return row["id"]
+    auth_cache.set(token, user, ttl=payload.get("exp", 0) - time.time())
+    return user
 
 # ────────────────────────────────────────────────
 # 3) FastAPI 앱 생성 & CORS
 # ────────────────────────────────────────────────
-app = FastAPI()
-print("🚀 FastAPI running with CORS on http://localhost:5000")
+#   - 시작: LLM 클라이언트(settings.provider_warmup)를 백그라운드에서 동시에 생성
+#           → 요청은 바로 받고, 준비 전에 온 요청은 그 클라이언트 생성이 끝날 때까지만 기다림
+#           Context 토크나이저 로드 (파일이 없으면 추정치 사용 경고)
+#   - 종료: 진행 중인 GPT/Places/DB 작업이 끝날 때까지 기다린 뒤 풀 정리
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.warmup = asyncio.create_task(providers.warm_up(settings.provider_warmup))
+    flusher = asyncio.create_task(metrics.run_flusher()) if metrics.METRICS_SHARED else None
+    # 토크나이저를 미리 로드 (없으면 여기서 추정치 사용 경고가 한 번 남음)
+    await run_blocking(Context.load_tokenizer)
+    yield
+    await app.state.warmup
+    if flusher is not None:
+        flusher.cancel()
+        await asyncio.to_thread(metrics.flush)
+    await HttpClient.aclose()
+    blocking_pool.shutdown(wait=True)
+    passwords.shutdown()
+    db_pool.close_all()
+
+app = FastAPI(lifespan=lifespan)
+logger.info("FastAPI app created (env=%s)", ENV)
+
+# bcrypt 해싱 대기열이 가득 찬 경우 (로그인 폭주) → 이벤트 루프를 막지 않고 즉시 503
+@app.exception_handler(PasswordHasherBusy)
+async def password_hasher_busy_handler(request: Request, exc: PasswordHasherBusy):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "요청이 많아 잠시 후 다시 시도해주세요."},
+        headers={"Retry-After": "1"},
+    )
 
 templates = Jinja2Templates(directory="templates")
 
@@ -108,7 +215,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Cursor-Before", "X-Cursor-After", "X-Session-Id", "X-Request-Id"],
 )
+# 라우트별 요청 지연 (METRICS=0 이면 그대로 통과)
+app.add_middleware(metrics.MetricsMiddleware)
+# 요청 ID 부여 (가장 바깥 - CORS 응답에도 X-Request-Id 포함)
+app.add_middleware(RequestContextMiddleware)
 
 # ────────────────────────────────────────────────
 # 4) 헬퍼 함수
@@ -116,56 +228,47 @@ app.add_middleware(
 def is_valid_email(email: str) -> bool:
     return bool(re.match(r"[^@]+@[^@]+\.[^@]+", email))
 
-def hash_password(pw: str) -> str:
-    return bcrypt.hashpw(pw.encode(), bcrypt.gensalt()).decode()
-
-def check_password(pw: str, hashed: str) -> bool:
-    return bcrypt.checkpw(pw.encode(), hashed.encode())
-
 def generate_token(email: str) -> str:
     payload = {
         "email": email,
-        "exp": datetime.datetime.utcnow() + datetime.timedelta(hours=3)
+        "exp": datetime.datetime.utcnow() + TOKEN_LIFETIME,
+        "jti": uuid.uuid4().hex,   # 같은 초에 다시 로그인해도 폐기된 토큰과 겹치지 않도록
     }
     return jwt.encode(payload, SECRET_KEY, algorithm="HS256")
 
-def verify_token(token: Optional[str]) -> Optional[str]:
-    print(f"🐛 verify_token() got token: {token}", flush=True)
+def decode_token(token: Optional[str]) -> Optional[dict]:
     if not token:
-        print("🐛 → no token, returning None", flush=True)
+        logger.debug("decode_token: no token")
         return None
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
-        print(f"🐛 → decoded payload: {payload}", flush=True)
-        return payload.get("email")
+        return jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
     except jwt.ExpiredSignatureError:
-        print("🐛 → token expired", flush=True)
+        logger.debug("decode_token: token expired")
         return None
     except jwt.InvalidTokenError as e:
-        print(f"🐛 → invalid token: {e}", flush=True)
+        logger.debug("decode_token: invalid token (%s)", e)
         return None
     
 def allowed_file(filename: str) -> bool:
     return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_EXTENSIONS
 
 # ────────────────────────────────────────────────
-# 4-1) 인사 처리 함수 
+# 4-0) 블로킹 작업 오프로딩
+#    - GPT(OpenAI), SQLite 호출은 동기 함수라
+#      async 라우트에서 직접 부르면 이벤트 루프 전체가 멈춘다.
+#    - 크기가 제한된 전용 스레드 풀에서 실행하고 결과만 await 한다.
 # ────────────────────────────────────────────────
-GREETING_KEYWORDS = ["안녕", "안녕하세요", "하이", "hello", "hi"]
-THANK_KEYWORDS   = ["고맙", "감사"]  
-RECOMMEND_KEYWORDS = ["다른거 추천", "다른 추천", "다시 추천", "재추천"]
-
-def is_greeting(text: str) -> bool:
-    t = text.strip().lower()
-    return any(keyword in t for keyword in GREETING_KEYWORDS)
-
-def is_thanks(text: str) -> bool:
-    t = text.strip().lower()
-    return any(keyword in t for keyword in THANK_KEYWORDS)
+BLOCKING_WORKERS = int(os.getenv("BLOCKING_WORKERS", "16"))
+blocking_pool = ThreadPoolExecutor(
+    max_workers=BLOCKING_WORKERS, thread_name_prefix="blocking"
+)
 
-def is_recommend(text: str) -> bool:
-    t = text.strip().lower()
-    return any(k in t for k in RECOMMEND_KEYWORDS)
+async def run_blocking(func, *args, **kwargs):
+    """동기 함수를 blocking_pool 에서 실행하고 결과를 돌려준다. (로그 요청 ID 유지)"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        blocking_pool, contextvars.copy_context().run, functools.partial(func, *args, **kwargs)
+    )
 
 # ────────────────────────────────────────────────
 # 5) 페이지 라우팅
@@ -198,25 +301,16 @@ async def api_signup(data: dict):
     if not is_valid_email(email):
         raise HTTPException(400, "이메일 형식이 올바르지 않습니다.")
 
-    conn = get_db(); cur = conn.cursor()
-
-    if cur.execute("SELECT 1 FROM users WHERE email = ?", (email,)).fetchone():
-        conn.close()
+    if await run_blocking(read_user, email):
         raise HTTPException(409, "이미 가입된 이메일입니다.")
 
-    hashed = hash_password(pw)
+    # bcrypt 는 전용 풀에서 실행 (커넥션을 잡은 채로 기다리지 않음)
+    hashed = await hash_password(pw)
+
     try:
-        cur.execute(
-            "INSERT INTO users (name, email, hashed_password) VALUES (?, ?, ?)",
-            (name, email, hashed)
-        )
-        user_id = cur.lastrowid # ★ 새 id 확보
-        conn.commit()
+        user_id = await run_blocking(create_user, name, email, hashed) # ★ 새 id 확보
     except sqlite3.Error as e:
-        conn.rollback()
         raise HTTPException(500, f"회원가입 오류: {e}")
-    finally:
-        conn.close()
 
     # JWT 발급 & 쿠키에 심기
     token = generate_token(email)
@@ -233,35 +327,29 @@ async def api_signup(data: dict):
 
 @app.post("/api/login")
 async def api_login(response: Response, data: dict):
-    print("data")
-    print(data)
     email = data.get("email")
     pw = data.get("password")
 
     if not (email and pw):
         raise HTTPException(400, "이메일과 비밀번호를 모두 입력해주세요.")
     
-    conn = get_db()
-    cur = conn.cursor()
-    cur.execute("SELECT id, name, hashed_password FROM users WHERE email = ?", (email,))
-    row = cur.fetchone()
-    conn.close()
-
-    print("rowId")
-    print(row["id"])
-    if not row or not check_password(pw, row["hashed_password"]):
+    row = await run_blocking(read_credentials, email)
+
+    if not row or not await check_password(pw, row["hashed_password"]):
         raise HTTPException(401, "이메일 또는 비밀번호가 틀렸습니다.")
+
+    # BCRYPT_ROUNDS 가 바뀌었으면 평문을 알고 있는 지금 새 cost 로 재해시
+    if needs_rehash(row["hashed_password"]):
+        await run_blocking(update_password_hash, row["id"], await hash_password(pw))
     
     token = generate_token(email)
-    print("token")
-    print(token)
+    logger.debug("login ok user_id=%s", row["id"])
     json_response = JSONResponse(content={
         "success": True, 
         "message": "로그인 성공", 
         "data": {"id": row["id"], "name": row["name"], "email": email}
     })
 
-    print("json_response")
     # print(json_response)
     # # json_response.set_cookie(
     # #     key="token",
@@ -302,23 +390,16 @@ async def api_login(response: Response, data: dict):
     return json_response
 
 @app.get("/api/status")
-async def api_status(token: Optional[str] = Cookie(None)):
-    email = verify_token(token)
-    if not email:
-        raise HTTPException(401, "로그인 필요")
-    
-    # 로그인된 이메일의 user_id 조회
-    conn = get_db()
-    cur = conn.cursor()
-    cur.execute("SELECT id, name FROM users WHERE email = ?", (email,))
-    row = cur.fetchone()
-    conn.close()
-    if not row:
-        raise HTTPException(401, "등록된 사용자가 아닙니다.")
-    return {"logged_in": True, "email": email, "id": row["id"], "name": row["name"]}
+async def api_status(user: dict = Depends(current_user)):
+    return {"logged_in": True, "email": user["email"], "id": user["id"], "name": user["name"]}
 
 @app.post("/api/logout")
-async def api_logout(response: Response):
+async def api_logout(response: Response, token: Optional[str] = Cookie(None)):
+    payload = decode_token(token)
+    if payload:
+        await run_blocking(revoke_token, token, payload)
+    elif token:
+        auth_cache.pop(token)
     if ENV == "production":
         response.delete_cookie(
             key="token",
@@ -334,135 +415,262 @@ async def api_logout(response: Response):
 # ────────────────────────────────────────────────
 # 7) AI 챗 & 음식 추천
 # ────────────────────────────────────────────────
+# 7-1) 의도별 처리기
+#    - chat_router 가 메시지를 한 번 스캔해 의도를 정하고 아래 처리기 중 하나를 실행
+#    - 처리기는 응답 dict(message, 식당이면 restaurant/name/url)만 만들고
+#      저장·createdAt 은 엔드포인트(get_response, api_add_message)가 공통으로 처리
+#    - 의도별 지연 시간은 /api/cache_stats 의 "intent_router" 항목
+chat_router = IntentRouter(intent_matcher)
+DEFAULT_FOODS = ["김밥", "떡볶이", "비빔밥", "갈비탕", "파스타", "치킨"]
+
+def restaurant_reply(intro: str, restaurant: dict) -> dict:
+    map_url = f"https://www.google.com/maps/place/?q=place_id:{restaurant['place_id']}"
+    name = restaurant["name"]
+    formatted = (
+        f"{intro}<br><br>"
+        f"추천 식당: <strong>{name}</strong><br>"
+        f"주소: {restaurant['address']}<br>"
+        f"평점: {restaurant.get('rating','정보 없음')}점 "
+        f"(리뷰 {restaurant.get('reviews','없음')}명)<br><br>"
+        "즐거운 식사 되세요! 감사합니다!"
+    )
+    return {"message": formatted, "restaurant": restaurant, "name": name, "url": map_url}
+
+# 1) 인사 처리
+@chat_router.route("greeting", priority=10, category="greeting")
+async def handle_greeting(intent, **ctx):
+    return {"message": "안녕하세요! 무엇을 도와드릴까요?"}
+
+# 2) 감사 인사 처리
+@chat_router.route("thanks", priority=20, category="thanks")
+async def handle_thanks(intent, **ctx):
+    return {"message": "별말씀을요! 또 궁금하신 게 있으면 언제든 말씀해 주세요"}
+
+# 3) 추천 재요청 처리
+#    - 직전 검색에서 남겨 둔 후보가 있으면 네트워크 호출 없이 다음 후보 제공
+#    - 후보가 떨어졌을 때만 최근 추천하지 않은 음식으로 새로 검색
+#    - CandidateStore 는 공유 모드에서 SQLite 쓰기 잠금을 기다릴 수 있어 run_blocking 으로 호출
+@chat_router.route("recommend", priority=30, category="recommend")
+async def handle_recommend(intent, session_id, location, **ctx):
+    candidate = await run_blocking(CandidateStore.next_candidate, session_id)
+    if candidate:
+        new_food, restaurant = candidate
+        intro = f"{new_food} 맛집 중 다른 곳도 추천해드릴게요!"
+    else:
+        recent = await run_blocking(CandidateStore.recent_foods, session_id)
+        new_food = random.choice([f for f in DEFAULT_FOODS if f not in recent] or DEFAULT_FOODS)
+        intro = f"{new_food}도 추천해드릴게요!"
+        candidates = await find_restaurant_candidates(new_food, location)
+        restaurant = await run_blocking(CandidateStore.offer, session_id, new_food, candidates)
+    if restaurant:
+        return restaurant_reply(intro, restaurant)
+    return {"message": f"근처 '{new_food}' 식당을 찾지 못했습니다. 다음에 더 좋은 곳을 알려드릴게요. 감사합니다!"}
+
+# 4) 입력 비어있음 처리
+@chat_router.route("empty", priority=40, when=lambda slots: not slots["text"])
+async def handle_empty(intent, **ctx):
+    return {"message": "기분이나 명령을 입력해 주세요!"}
+
+# 5) 감정 기반 추천 처리
+#    - on_text 가 있으면(SSE 모드) GPT 의 추천 이유를 받는 즉시 조각으로 넘기고, 식당 검색은 그 뒤에 실행
+@chat_router.route("emotion", priority=50, category="emotion")
+async def handle_emotion(intent, session_id, location, on_text=None, **ctx):
+    recent = await run_blocking(CandidateStore.recent_foods, session_id)
+    if on_text is None:
+        emotion, food, reply_text = await run_blocking(
+            classify_emotion_and_reply_with_gpt, intent.slots["text"], recent
+        )
+    else:
+        answer = {}
+        reason_stream = classify_emotion_and_reply_stream(intent.slots["text"], recent, answer)
+        async for chunk in iterate_blocking(blocking_pool, reason_stream):
+            on_text(chunk)
+        emotion, food, reply_text = answer["emotion"], answer["food"], answer["reason"]
+    if not food:
+        food = random.choice(DEFAULT_FOODS)
+        reply_text = f"{food} 추천해드려요!"
+
+    candidates = await find_restaurant_candidates(food, location)
+    restaurant = await run_blocking(CandidateStore.offer, session_id, food, candidates)
+    if restaurant:
+        return restaurant_reply(reply_text, restaurant)
+    reply = f"{reply_text}<br><br>근처 '{food}' 식당을 찾지 못했습니다."
+    reply += " 다음에 더 좋은 곳을 알려드릴게요. 감사합니다!"
+    return {"message": reply}
+
+# 6) 기타 오프토픽 처리
+@chat_router.route("off_topic")
+async def handle_off_topic(intent, **ctx):
+    return {"message": "주제와 맞지 않는 대화입니다. 감정이나 기분에 대해 말씀해주시면 관련된 음식을 추천해 드릴게요."}
+
+def request_location(request: Request) -> str:
+    return unquote(request.cookies.get("user_location", "서울, 경기"))
+
+# 7-2) 채팅 엔드포인트
+#    - stream=1 (또는 Accept: text/event-stream) 이면 SSE 로 응답
+#      · delta : 응답 본문 조각 - 감정 추천은 GPT 추천 이유를 받는 대로 보내고 식당 정보는 검색 뒤에,
+#                그 밖의 의도는 처리 결과를 한 번에
+#      · done  : 최종 응답(식당 정보 포함, message 가 최종 본문) + ttfb_ms(첫 조각까지) / total_ms(전체)
+#      · error : 처리 중 오류 (이 경우 응답은 저장하지 않음)
+#    - 세션 ID 는 X-Session-Id 헤더로 전달 (새 세션을 만든 경우 프런트엔드에서 사용)
+def wants_stream(request: Request, stream: bool) -> bool:
+    return stream or "text/event-stream" in request.headers.get("accept", "")
+
 @app.post("/get_response")
 async def get_response(
     request: Request,
     message: str = Form(...),
-    session_id: Optional[str] = Form(None)
+    session_id: Optional[str] = Form(None),
+    stream: bool = Form(False),
+    user: dict = Depends(current_user)
 ):
-    # 토큰 검증
-    token = request.cookies.get("token")
-    email = verify_token(token)
-    if not email:
-        raise HTTPException(401, "로그인 정보가 없습니다.")
-
-    # user_id 조회
-    conn = get_db(); cur = conn.cursor()
-    cur.execute("SELECT id FROM users WHERE email = ?", (email,))
-    row = cur.fetchone(); conn.close()
-    if not row:
-        raise HTTPException(401, "등록된 사용자가 아닙니다.")
-    user_id = row["id"]
+    user_id = user["id"]
 
-    # 세션 생성
+    # 세션 생성 (기존 세션이면 소유권 확인)
     if not session_id:
-        session_id = create_session(user_id, title=(message[:30] or None))
+        session_id = await run_blocking(create_session, user_id, title=(message[:30] or None))
+    else:
+        await require_session_owner(session_id, user_id)
 
-    text = message.strip()
-    save_chat(session_id, user_id, message, None, None, "user")
+    await run_blocking(save_chat, session_id, user_id, message, None, None, "user")
     created_at = datetime.datetime.utcnow().isoformat() + "Z"
 
-    # 1) 인사 처리
-    if is_greeting(text):
-        reply = "안녕하세요! 무엇을 도와드릴까요?"
-        save_chat(session_id, user_id, reply, None, None, "assistant")
-        return {"message": reply, "createdAt": created_at}
-
-    # 2) 감사 인사 처리
-    if is_thanks(text):
-        reply = "별말씀을요! 또 궁금하신 게 있으면 언제든 말씀해 주세요"
-        save_chat(session_id, user_id, reply, None, None, "assistant")
-        return {"message": reply, "createdAt": created_at}
-
-    # 3) 추천 재요청 처리
-    if is_recommend(text):
-        foods = ["김밥", "떡볶이", "비빔밥", "갈비탕", "파스타", "치킨"]
-        new_food = random.choice(foods)
-        intro = f"{new_food}도 추천해드릴게요!"
-        raw_loc = request.cookies.get("user_location", "서울, 경기")
-        location = unquote(raw_loc)
-        restaurant = find_restaurant_nearby(new_food, location)
-        if restaurant:
-            map_url = f"https://www.google.com/maps/place/?q=place_id:{restaurant['place_id']}"
-            name = restaurant["name"]
-            formatted = (
-                f"{intro}<br><br>"
-                f"추천 식당: <strong>{name}</strong><br>"
-                f"주소: {restaurant['address']}<br>"
-                f"평점: {restaurant.get('rating','정보 없음')}점 "
-                f"(리뷰 {restaurant.get('reviews','없음')}명)<br><br>"
-                "즐거운 식사 되세요! 감사합니다!"
-            )
-            save_chat(session_id, user_id, formatted, map_url, name, "assistant")
-            return {
-                "message": formatted,
-                "restaurant": restaurant,
-                "name": name,
-                "url": map_url,
-                "createdAt": created_at
-            }
-        else:
-            reply = f"근처 '{new_food}' 식당을 찾지 못했습니다. 다음에 더 좋은 곳을 알려드릴게요. 감사합니다!"
-            save_chat(session_id, user_id, reply, None, None, "assistant")
-            return {"message": reply, "createdAt": created_at}
-
-    # 4) 입력 비어있음 처리
-    if not text:
-        reply = "기분이나 명령을 입력해 주세요!"
-        save_chat(session_id, user_id, reply, None, None, "assistant")
-        return {"message": reply, "createdAt": created_at}
-
-    # 5) 감정 기반 추천 처리
-    if is_emotion_related(text):
-        emotion, food, reply_text = classify_emotion_and_reply_with_gpt(text)
-        if not food:
-            food = random.choice(["김밥","떡볶이","비빔밥","갈비탕","파스타","치킨"])
-            reply_text = f"{food} 추천해드려요!"
-
-        raw_loc = request.cookies.get("user_location", "서울, 경기")
-        location = unquote(raw_loc)
-        restaurant = find_restaurant_nearby(food, location)
-        if restaurant:
-            map_url = f"https://www.google.com/maps/place/?q=place_id:{restaurant['place_id']}"
-            name = restaurant["name"]
-            formatted = (
-                f"{reply_text}<br><br>"
-                f"추천 식당: <strong>{name}</strong><br>"
-                f"주소: {restaurant['address']}<br>"
-                f"평점: {restaurant.get('rating','정보 없음')}점 "
-                f"(리뷰 {restaurant.get('reviews','없음')}명)<br><br>"
-                "즐거운 식사 되세요! 감사합니다!"
-            )
-            save_chat(session_id, user_id, formatted, map_url, name, "assistant")
-            return {
-                "message": formatted,
-                "restaurant": restaurant,
-                "name": name,
-                "url": map_url,
-                "createdAt": created_at
-            }
-        else:
-            reply = f"{reply_text}<br><br>근처 '{food}' 식당을 찾지 못했습니다."
-            reply += " 다음에 더 좋은 곳을 알려드릴게요. 감사합니다!"
-            save_chat(session_id, user_id, reply, None, None, "assistant")
-            return {"message": reply, "createdAt": created_at}
-
-    # 6) 기타 오프토픽 처리
-    off_topic = "주제와 맞지 않는 대화입니다. 감정이나 기분에 대해 말씀해주시면 관련된 음식을 추천해 드릴게요."
-    save_chat(session_id, user_id, off_topic, None, None, "assistant")
-    return {"message": off_topic, "createdAt": created_at}
+    async def reply_for_message(on_text=None):
+        intent, reply = await chat_router.dispatch(
+            message, session_id=session_id, user_id=user_id, location=request_location(request),
+            on_text=on_text,
+        )
+        await run_blocking(save_chat, session_id, user_id, reply["message"], reply.get("url"), reply.get("name"), "assistant")
+        return intent, reply
+
+    if not wants_stream(request, stream):
+        intent, reply = await reply_for_message()
+        return {**reply, "createdAt": created_at}
+
+    timer = StreamTimer("get_response")
+
+    async def events():
+        # 처리기는 태스크로 돌리고, on_text 로 넘어온 조각은 큐에서 꺼내는 즉시 전송 (None = 처리 끝)
+        chunks = asyncio.Queue()
+        task = asyncio.create_task(reply_for_message(on_text=chunks.put_nowait))
+        task.add_done_callback(lambda _: chunks.put_nowait(None))
+        streamed = ""
+        try:
+            while True:
+                chunk = await chunks.get()
+                if chunk is None:
+                    break
+                timer.first()
+                streamed += chunk
+                yield sse("delta", {"text": chunk})
+            intent, reply = task.result()
+        except Exception:
+            logger.exception("get_response stream error")
+            yield sse("error", {"detail": "응답 생성 중 오류가 발생했습니다.", **timer.finish(ok=False)})
+            return
+        finally:
+            task.cancel()   # 클라이언트가 끊으면 처리도 멈춤 (응답은 저장하지 않음)
+
+        # 아직 보내지 않은 부분(식당 정보 등) - 앞부분이 달라졌으면 done 의 message 로 대신함
+        rest = reply["message"][len(streamed):] if reply["message"].startswith(streamed) else ""
+        if rest:
+            timer.first()
+            yield sse("delta", {"text": rest})
+        yield sse("done", {**reply, "intent": intent.name, "createdAt": created_at, **timer.finish()})
+
+    return sse_response(events(), headers={"X-Session-Id": session_id})
+
+# IntegratedAI(일반 대화·실시간 검색) 기반 스트리밍 챗
+#    - LLM 토큰을 받는 즉시 delta 로 전달, 스트림이 끝나면 전체 응답을 save_chat 으로 저장
+#    - Groq 스트림은 동기 API 이므로 blocking_pool 스레드에서 돌리고 조각만 넘겨받음
+@app.post("/api/chat/stream")
+async def api_chat_stream(
+    message: str = Form(...),
+    session_id: Optional[str] = Form(None),
+    user: dict = Depends(current_user)
+):
+    timer = StreamTimer("chat_stream")
+    user_id = user["id"]
+
+    if not session_id:
+        session_id = await run_blocking(create_session, user_id, title=(message[:30] or None))
+    else:
+        await require_session_owner(session_id, user_id)
+
+    await run_blocking(save_chat, session_id, user_id, message, None, None, "user")
+    created_at = datetime.datetime.utcnow().isoformat() + "Z"
+
+    async def events():
+        parts = []
+        try:
+            async for chunk in iterate_blocking(blocking_pool, IntegratedAIStream(message, session_id)):
+                timer.first()
+                parts.append(chunk)
+                yield sse("delta", {"text": chunk})
+            answer = "".join(parts).strip()
+            await run_blocking(save_chat, session_id, user_id, answer, None, None, "assistant")
+        except Exception:
+            logger.exception("chat stream error")
+            yield sse("error", {"detail": "응답 생성 중 오류가 발생했습니다.", **timer.finish(ok=False)})
+            return
+        yield sse("done", {"message": answer, "createdAt": created_at, **timer.finish()})
+
+    return sse_response(events(), headers={"X-Session-Id": session_id})
 
 # ────────────────────────────────────────────────
 # 8) 채팅 로그 API
 # ────────────────────────────────────────────────
 
+# 운영 통계 접근 제어 - METRICS_ALLOW 주소(기본: 로컬) 또는 METRICS_TOKEN Bearer 토큰만 허용
+def require_metrics_access(request: Request) -> None:
+    client = request.client.host if request.client else None
+    if not metrics.scrape_allowed(client, request.headers.get("authorization")):
+        raise HTTPException(403, "허용되지 않은 접근입니다.")
+
+# 캐시 통계 API (auth 캐시 적중 수 = 절약한 users 조회 횟수)
+@app.get("/api/cache_stats", dependencies=[Depends(require_metrics_access)])
+async def api_cache_stats():
+    return cache_stats()
+
+# Prometheus 수집용 - 여러 워커면 공유 스냅샷을 합산해서 응답 (METRICS=0 이면 404)
+@app.get("/metrics", response_class=PlainTextResponse, dependencies=[Depends(require_metrics_access)])
+async def prometheus_metrics():
+    if not metrics.METRICS:
+        raise HTTPException(status_code=404, detail="metrics disabled")
+    body = await run_blocking(metrics.render)
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4")
+
+# 준비 상태 확인 (로드밸런서·배포 스크립트용) - 워커마다 따로 응답
+#   - DB 커넥션으로 SELECT 1, lifespan 의 클라이언트 준비가 끝났는지 확인 → 둘 다 되면 200
+#   - 준비에 실패한 클라이언트는 degraded 로 알리지만 첫 사용 때 다시 만들므로 503 은 아님
+def ping_db():
+    with get_db() as conn:
+        conn.execute("SELECT 1").fetchone()
+
+@app.get("/healthz")
+async def healthz():
+    checks = {"worker": os.getpid()}
+    try:
+        await run_blocking(ping_db)
+        checks["db"] = "ok"
+    except Exception as e:
+        checks["db"] = f"error: {e}"
+
+    warmup = getattr(app.state, "warmup", None)
+    checks["warmup"] = "pending" if warmup is not None and not warmup.done() else "done"
+    provider_stats = providers.stats()
+    failed = [n for n in settings.provider_warmup if provider_stats.get(n, {}).get("error")]
+    if failed:
+        checks["failed_providers"] = failed
+
+    ready = checks["db"] == "ok" and checks["warmup"] == "done"
+    checks["status"] = ("degraded" if failed else "ok") if ready else "unavailable"
+    return JSONResponse(status_code=200 if ready else 503, content=checks)
+
 #유저목록 API
 @app.get("/api/users")
 async def api_list_users():
-    conn = get_db()
-    rows = conn.execute("SELECT id, name FROM users").fetchall()
-    conn.close()
-    return [{"id": r["id"], "name": r["name"]} for r in rows]
+    return await run_blocking(read_users)
 
 # ────────────────────────────────────────────────
 # 10) 채팅 로그 수정 API
@@ -476,6 +684,7 @@ class SessionOut(BaseModel):
     created_at: datetime.datetime
     last_message: Optional[str] = Field(None, alias="last_message")
     last_date: Optional[datetime.datetime] = Field(None, alias="last_date")
+    message_count: int = 0
     class Config:
         populate_by_name = True
 
@@ -490,11 +699,29 @@ class ChatLogOut(BaseModel):
     name:str|None
     url:str|None
 
+# 페이지 조회 결과의 커서를 응답 헤더로 내려주고 목록만 반환
+# (응답 본문은 기존과 같은 리스트라 프런트엔드 호환 유지)
+async def paged_items(response: Response, reader, scope, limit, before, after) -> list[dict]:
+    try:
+        page = await run_blocking(reader, scope, limit, before, after)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    if page["before"]:
+        response.headers["X-Cursor-Before"] = page["before"]
+    if page["after"]:
+        response.headers["X-Cursor-After"] = page["after"]
+    return page["items"]
+
+# 세션 소유권 확인 - 인덱스 포인트 조회 한 번 (세션 목록 전체를 읽지 않음)
+async def require_session_owner(session_id: str, user_id: int) -> None:
+    if not await run_blocking(session_owned_by, session_id, user_id):
+        raise HTTPException(403, "권한이 없습니다.")
+
 # 1) 세션 생성
 @app.post("/api/sessions", response_model=SessionOut)
-async def api_create_session(body: SessionCreate, token: Optional[str] = Cookie(None),):
-    user_id   = current_user_id_or_401(token)
-    session_id = create_session(user_id, body.title)
+async def api_create_session(body: SessionCreate, user: dict = Depends(current_user)):
+    user_id   = user["id"]
+    session_id = await run_blocking(create_session, user_id, body.title)
     return {
       "id": session_id,
       "title": body.title,
@@ -502,83 +729,73 @@ async def api_create_session(body: SessionCreate, token: Optional[str] = Cookie(
     }
 
 # 2) 세션 목록 조회
+#    - limit/before/after 중 하나라도 주면 키셋 페이지 조회, 없으면 기존처럼 전체 목록
 @app.get("/api/sessions", response_model=list[SessionOut])
-async def api_read_sessions(token: Optional[str] = Cookie(None)):
-    user_id = current_user_id_or_401(token)
-    return read_sessions(user_id)
+async def api_read_sessions(
+    response: Response,
+    user: dict = Depends(current_user),
+    limit: Optional[int] = Query(None, ge=1, le=200),
+    before: Optional[str] = None,
+    after: Optional[str] = None,
+):
+    user_id = user["id"]
+    if limit is None and not (before or after):
+        return await run_blocking(read_sessions, user_id)
+    return await paged_items(response, read_sessions_page, user_id, limit or 20, before, after)
 
 # 3) 특정 세션의 로그 조회
+#    - 페이지 조회 시 기본은 가장 최근 limit 개, before 커서로 이전 대화를 불러옴
 @app.get("/api/sessions/{session_id}/logs", response_model=list[ChatLogOut])
-async def api_read_session_logs(session_id: str, token: Optional[str] = Cookie(None)):
-    email = verify_token(token)
-    if not email:
-        raise HTTPException(401, "로그인이 필요합니다.")
-    conn = get_db(); cur = conn.cursor()
-    cur.execute("SELECT id FROM users WHERE email = ?", (email,)); row = cur.fetchone()
-    if not row: raise HTTPException(401, "등록된 사용자가 아닙니다.")
-    user_id = row["id"]
+async def api_read_session_logs(
+    session_id: str,
+    response: Response,
+    user: dict = Depends(current_user),
+    limit: Optional[int] = Query(None, ge=1, le=200),
+    before: Optional[str] = None,
+    after: Optional[str] = None,
+):
+    user_id = user["id"]
     # 소유권 확인
-    if session_id not in [s["id"] for s in read_sessions(user_id)]:
-        raise HTTPException(403, "권한이 없습니다.")
-    return read_session_logs(session_id)
+    await require_session_owner(session_id, user_id)
+    if limit is None and not (before or after):
+        return await run_blocking(read_session_logs, session_id)
+    return await paged_items(response, read_session_logs_page, session_id, limit or 50, before, after)
 
 # 4) 세션에 메시지 추가 (유저·어시스턴트 공용)
+#    - get_response 와 같은 chat_router 로 응답 생성
 @app.post("/api/sessions/{session_id}/messages", response_model=ChatLogOut)
-async def api_add_message(session_id: str, body: ChatLogIn, token: Optional[str] = Cookie(None)):
-    # 소유권 검증 생략…
-    user_id = current_user_id_or_401(token)
-    add_log(session_id, user_id, "user", body.message)
-    # AI 응답 생성 (기존 get_response 로직 재사용)
-    # 여기서는 get_response를 직접 호출하기보다 해당 로직을 따르거나 필요한 부분만 가져와야 함
-    # 현재 요청은 모든 다른 기능을 거절하므로 이 API는 사용되지 않을 가능성이 높음
-    # 만약 이 API가 다른 경로로 사용된다면 AI 응답 로직도 수정된 정책을 따라야 함
-    # 지금은 classify_emotion_and_reply_with_gpt를 호출하지만 이는 off_topic_message로 대체될 수 있음
-    
-    # 수정된 정책 적용: 감정 기반이 아니면 off_topic_message 반환
-    text = body.message.strip()
-    ai_resp = ""
-    off_topic_message_alt = "주제와 맞지 않는 대화입니다. 감정이나 기분에 대해 말씀해주시면 관련된 음식을 추천해 드릴게요."
-
-    if is_emotion_related(text): 
-        emotion, food, reply_text = classify_emotion_and_reply_with_gpt(text) 
-        if not food:
-            food = random.choice(["김밥","떡볶이","비빔밥","갈비탕","파스타","치킨"])
-            reply_text = f"{food} 추천해드려요!"
-        restaurant = find_restaurant_nearby(food) 
-        if restaurant:
-            map_url = f"https://www.google.com/maps/place/?q=place_id:{restaurant['place_id']}"
-            name = restaurant.get("name")
-            ai_resp = (
-                f"{reply_text}<br><br>"
-                f"추천 식당: <strong>{restaurant['name']}</strong><br>"
-                f"주소: {restaurant['address']}<br>"
-                f"평점: {restaurant.get('rating','정보 없음')}점 "
-                f"(리뷰 {restaurant.get('reviews','없음')}명)<br>"
-            )
-            add_log(session_id, user_id, "assistant", ai_resp, map_url, name)
-        else:
-            ai_resp = f"{reply_text}<br><br>근처 '{food}' 식당을 찾지 못했습니다."
-            add_log(session_id, user_id, "assistant", ai_resp)
-    else:
-        ai_resp = off_topic_message_alt
-        add_log(session_id, user_id, "assistant", ai_resp)
+async def api_add_message(session_id: str, body: ChatLogIn, request: Request, user: dict = Depends(current_user)):
+    user_id = user["id"]
+    await require_session_owner(session_id, user_id)
+    await run_blocking(add_log, session_id, user_id, "user", body.message)
 
-    return { "id": 0, "role":"assistant", "message": ai_resp, "createdAt": datetime.datetime.utcnow(), "name": name if 'name' in locals() else None, "url": map_url if 'map_url' in locals() else None }
+    intent, reply = await chat_router.dispatch(
+        body.message, session_id=session_id, user_id=user_id, location=request_location(request)
+    )
+    await run_blocking(save_chat, session_id, user_id, reply["message"], reply.get("url"), reply.get("name"), "assistant")
+    return {
+        "id": 0,
+        "role": "assistant",
+        "message": reply["message"],
+        "createdAt": datetime.datetime.utcnow(),
+        "name": reply.get("name"),
+        "url": reply.get("url"),
+    }
 
 
 @app.delete("/api/sessions/{session_id}", response_model=dict)
-async def api_delete_session(session_id: str, token: Optional[str] = Cookie(None)):
-    user_id = current_user_id_or_401(token)
+async def api_delete_session(session_id: str, user: dict = Depends(current_user)):
+    user_id = user["id"]
 
     # 2) 소유권 확인
-    user_sessions = [s["id"] for s in read_sessions(user_id)]
-    if session_id not in user_sessions:
-        raise HTTPException(status_code=403, detail="권한이 없습니다.")
+    await require_session_owner(session_id, user_id)
 
     # 3) 삭제 시도
-    ok = delete_session(session_id)
+    ok = await run_blocking(delete_session, session_id)
     if not ok:
         raise HTTPException(status_code=500, detail="삭제에 실패했습니다.")
+    await run_blocking(CandidateStore.forget, session_id)
+    await run_blocking(History.clear, session_id)
 
     return {"success": True}
 # ────────────────────────────────────────────────
@@ -587,82 +804,39 @@ async def api_delete_session(session_id: str, token: Optional[str] = Cookie(None
 @app.post("/api/add_bookmark")
 async def api_add_bookmark(
     request: Request,
+    user: dict = Depends(current_user),
 ):
-    # 1) JWT에서 이메일 꺼내기
-    token = request.cookies.get("token")
-    email = verify_token(token) 
+    # 1) 요청 본문 읽기 (로그인 사용자는 current_user 의존성이 확인)
     data = await request.json()
     name = data.get("name")
     url =data.get("url")
-    print(name)
-    print(url)
-    if not email:
-        raise HTTPException(401, "로그인 정보가 없습니다.")
-
-    # 2) user_id 조회
-    conn = get_db()
-    cur  = conn.cursor()
-    cur.execute("SELECT id FROM users WHERE email = ?", (email,))
-    row = cur.fetchone()
-    conn.close()
-    if not row:
-        raise HTTPException(401, "등록된 사용자가 아닙니다.")
-    user_id = row["id"]
+    logger.debug("add_bookmark name=%s url=%s", name, url)
+    user_id = user["id"]
 
-    # 3) 즐겨찾기 추가
-    add_bookmark(user_id,name,url)
+    # 2) 즐겨찾기 추가
+    await run_blocking(add_bookmark, user_id, name, url)
 
     return {"success": True, "message": "즐겨찾기 추가 성공"}
 
 @app.get("/api/bookmarks")
 async def api_bookmarks(
-    request: Request,
+    user: dict = Depends(current_user),
 ):
-    # 1) JWT에서 이메일 꺼내기
-    token = request.cookies.get("token")
-    email = verify_token(token) 
-    if not email:
-        raise HTTPException(401, "로그인 정보가 없습니다.")
-
-    # 2) user_id 조회
-    conn = get_db()
-    cur  = conn.cursor()
-    cur.execute("SELECT id FROM users WHERE email = ?", (email,))
-    row = cur.fetchone()
-    conn.close()
-    if not row:
-        raise HTTPException(401, "등록된 사용자가 아닙니다.")
-    user_id = row["id"]
-
-
-    # 3) 즐겨찾기 읽어오기
-    return read_bookmarks(user_id)
+    # 즐겨찾기 읽어오기
+    return await run_blocking(read_bookmarks, user["id"])
 
 @app.post("/api/delete_bookmark")
 async def api_delete_bookmark(
     request: Request,
+    user: dict = Depends(current_user),
 ):
-    # 1) JWT에서 이메일 꺼내기
-    token = request.cookies.get("token")
-    email = verify_token(token) 
+    # 1) 요청 본문 읽기
     data = await request.json()
     bookmark_id =data.get("bookmark_id")
-    if not email:
-        raise HTTPException(401, "로그인 정보가 없습니다.")
-
-    # 2) user_id 조회
-    conn = get_db()
-    cur  = conn.cursor()
-    cur.execute("SELECT id FROM users WHERE email = ?", (email,))
-    row = cur.fetchone()
-    conn.close()
-    if not row:
-        raise HTTPException(401, "등록된 사용자가 아닙니다.")
-    user_id = row["id"]
 
-    # 3) 즐겨찾기 추가
-    print(bookmark_id)
-    delete_bookmark(bookmark_id)
+    # 2) 즐겨찾기 삭제
+    logger.debug("delete_bookmark id=%s", bookmark_id)
+    await run_blocking(delete_bookmark, bookmark_id)
 
     return {"success": True, "message": "즐겨찾기 삭제 성공"}
 
@@ -673,32 +847,17 @@ async def api_delete_bookmark(
 @app.post("/api/update_bookmark")
 async def api_update_bookmark(
     request: Request,
+    user: dict = Depends(current_user),
 ):
-    # 1) JWT에서 이메일 꺼내기
-    token = request.cookies.get("token")
-    email = verify_token(token) 
+    # 1) 요청 본문 읽기
     data = await request.json()
     name = data.get("name")
     url =data.get("url")
     bookmark_id=data.get("id")
-    print(bookmark_id)
-    print(name)
-    print(url)
-    if not email:
-        raise HTTPException(401, "로그인 정보가 없습니다.")
-
-    # 2) user_id 조회
-    conn = get_db()
-    cur  = conn.cursor()
-    cur.execute("SELECT id FROM users WHERE email = ?", (email,))
-    row = cur.fetchone()
-    conn.close()
-    if not row:
-        raise HTTPException(401, "등록된 사용자가 아닙니다.")
-    user_id = row["id"]
+    logger.debug("update_bookmark id=%s name=%s url=%s", bookmark_id, name, url)
 
-    # 3) 즐겨찾기 추가
-    update_bookmark(bookmark_id,name,url)
+    # 2) 즐겨찾기 수정
+    await run_blocking(update_bookmark, bookmark_id, name, url)
 
     return {"success": True, "message": "즐겨찾기 수정 성공"}
 
@@ -730,8 +889,8 @@ async def api_upload_photo(
  """
 
 # ────────────────────────────────────────────────
-# 12) 서버 실행
+# 12) 서버 실행 (개발용 - 운영은 start.sh → server.py)
 # ────────────────────────────────────────────────
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run("app:app", host="0.0.0.0", port=5000, reload=False)
+    uvicorn.run("app:app", host="0.0.0.0", port=5000, reload=False, log_config=None)
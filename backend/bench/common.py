@@ -0,0 +1,106 @@
+# -----------------------------------------------------------------------------------
+# 파일 이름   : bench/common.py
+# 설명        : 벤치마크 공용 유틸 - 지연 요약(p50/p95/p99), 결과 JSON 기록, /metrics 파싱
+# 주요 기능   :
+#   1) summarize        : 지연 목록(초) → count·평균·p50/p95/p99·최대 (ms)
+#   2) run_info         : 결과 JSON 머리말 (시각, git 커밋, 파이썬·CPU 정보)
+#   3) write_result     : JSON 을 파일(--out) 또는 표준 출력으로
+#   4) parse_prometheus : /metrics 텍스트 → (이름, 라벨, 값) 목록
+# 요구 모듈   : json, os, platform, subprocess, time, re
+# -----------------------------------------------------------------------------------
+
+import os
+import re
+import sys
+import json
+import time
+import platform
+import subprocess
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# ────────────────────────────────────────────────────────────────────────────────────
+# 1) 지연 요약
+#    - 백분위는 최근접 순위(nearest-rank) 방식 - 실행 사이 비교용으로 단순하고 재현 가능
+# ────────────────────────────────────────────────────────────────────────────────────
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(-(-q * len(sorted_values) // 100)))   # ceil(q/100 · n)
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(latencies):
+    values = sorted(latencies)
+    if not values:
+        return {"count": 0}
+    ms = lambda s: round(s * 1000, 3)
+    return {
+        "count": len(values),
+        "mean_ms": ms(sum(values) / len(values)),
+        "p50_ms": ms(percentile(values, 50)),
+        "p95_ms": ms(percentile(values, 95)),
+        "p99_ms": ms(percentile(values, 99)),
+        "max_ms": ms(values[-1]),
+    }
+
+
+# ────────────────────────────────────────────────────────────────────────────────────
+# 2) 결과 기록
+# ────────────────────────────────────────────────────────────────────────────────────
+def git_revision():
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+            capture_output=True, text=True, timeout=5,
+        )
+        revision = out.stdout.strip()
+        dirty = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"], cwd=BACKEND_DIR,
+            capture_output=True, text=True, timeout=5,
+        ).stdout.strip()
+        return revision + ("-dirty" if dirty else "") if revision else None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run_info(kind, config):
+    return {
+        "kind": kind,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "git": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "config": config,
+    }
+
+
+def write_result(result, out=None):
+    text = json.dumps(result, ensure_ascii=False, indent=2)
+    if out:
+        with open(out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+        print(f"결과 저장: {out}", file=sys.stderr)
+    else:
+        print(text)
+
+
+# ────────────────────────────────────────────────────────────────────────────────────
+# 3) /metrics 파싱 (metrics.render 형식만 다루는 최소 파서)
+# ────────────────────────────────────────────────────────────────────────────────────
+_SAMPLE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(?:\{(.*)\})? (\S+)$')
+_LABEL = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+
+
+def parse_prometheus(text):
+    samples = []
+    for line in text.splitlines():
+        if not line or line.startswith("#"):
+            continue
+        match = _SAMPLE.match(line)
+        if match:
+            labels = dict(_LABEL.findall(match.group(2) or ""))
+            samples.append((match.group(1), labels, float(match.group(3))))
+    return samples
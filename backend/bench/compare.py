@@ -0,0 +1,90 @@
+# -----------------------------------------------------------------------------------
+# 파일 이름   : bench/compare.py
+# 설명        : 벤치마크 결과 JSON 두 개(기준 / 변경 후)를 항목별로 비교
+# 주요 기능   :
+#   1) 숫자 값만 "a.b.c" 경로로 펼쳐서 같은 경로끼리 비교 (loadtest·micro 결과 모두)
+#   2) 변화율(%)과 좋아짐/나빠짐 표시
+#        - 지연(_ms, _us, _s)·오류·dropped 는 작을수록 좋음
+#        - 처리량(rps, per_s)·적중률(hit_rate)·speedup 은 클수록 좋음
+#   3) --threshold 보다 나빠진 항목이 있으면 종료 코드 1 (CI 에서 회귀 검사용)
+# 사용 예     : cd backend && python -m bench.compare base.json new.json
+#               python -m bench.compare base.json new.json --filter p99 --threshold 10
+# 요구 모듈   : argparse, json
+# -----------------------------------------------------------------------------------
+
+import sys
+import json
+import argparse
+
+SKIP = {"config", "run_info", "cpus", "count", "elapsed_s", "fill_s", "calls"}
+HIGHER_IS_BETTER = ("rps", "per_s", "hit_rate", "speedup", "decided_rate")
+LOWER_IS_BETTER = ("_ms", "_us", "_s", "errors", "dropped", "rate_limited")
+
+
+def flatten(value, prefix=""):
+    if isinstance(value, dict):
+        for key, item in value.items():
+            if key in SKIP:
+                continue
+            yield from flatten(item, f"{prefix}.{key}" if prefix else str(key))
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        yield prefix, float(value)
+
+
+def direction(path):
+    """1 = 클수록 좋음, -1 = 작을수록 좋음, 0 = 판단 안 함"""
+    leaf = path.rsplit(".", 1)[-1]
+    if any(leaf.endswith(s) or s in leaf for s in HIGHER_IS_BETTER):
+        return 1
+    if any(leaf.endswith(s) for s in LOWER_IS_BETTER):
+        return -1
+    return 0
+
+
+def compare(base, new, pattern=None):
+    base_values = dict(flatten(base))
+    rows = []
+    for path, value in flatten(new):
+        if path not in base_values or (pattern and pattern not in path):
+            continue
+        before = base_values[path]
+        change = (value - before) / before * 100 if before else (0.0 if value == before else float("inf"))
+        sign = direction(path)
+        rows.append((path, before, value, change, sign * change if sign else 0.0))
+    return rows
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="벤치마크 결과 비교")
+    p.add_argument("base", help="기준 결과 JSON")
+    p.add_argument("new", help="비교할 결과 JSON")
+    p.add_argument("--filter", help="경로에 이 문자열이 들어간 항목만")
+    p.add_argument("--threshold", type=float, default=None, help="이 % 이상 나빠진 항목이 있으면 종료 코드 1")
+    args = p.parse_args(argv)
+
+    with open(args.base, encoding="utf-8") as f:
+        base = json.load(f)
+    with open(args.new, encoding="utf-8") as f:
+        new = json.load(f)
+    if base.get("kind") != new.get("kind"):
+        print(f"경고: 결과 종류가 다름 ({base.get('kind')} / {new.get('kind')})", file=sys.stderr)
+
+    rows = compare(base, new, args.filter)
+    print(f"기준: {base.get('git')} {base.get('timestamp')}  →  변경: {new.get('git')} {new.get('timestamp')}")
+    width = max([len(r[0]) for r in rows] + [4])
+    print(f"{'항목':<{width - 2}}  {'기준':>12}  {'변경':>12}  {'변화':>9}")
+    regressions = []
+    for path, before, value, change, score in rows:
+        mark = "  " if abs(score) < 1 else ("▲ " if score > 0 else "▼ ")
+        print(f"{path:<{width}}  {before:>12.3f}  {value:>12.3f}  {change:>+8.1f}% {mark}")
+        if args.threshold is not None and -score >= args.threshold:
+            regressions.append(path)
+
+    if regressions:
+        print(f"\n{args.threshold}% 이상 나빠진 항목 {len(regressions)}개: {', '.join(regressions)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,378 @@
+# -----------------------------------------------------------------------------------
+# 파일 이름   : bench/loadtest.py
+# 설명        : 부하 테스트 - 임시 SQLite DB + 스텁 상류 서버로 server.py 를 띄우고 실제와 비슷한 혼합 트래픽 실행
+# 주요 기능   :
+#   1) 격리 실행   : 임시 폴더에 DB·캐시·대화 기록, 상류는 bench/stubs.py (네트워크 불필요)
+#   2) 가상 사용자 : 사용자마다 쿠키를 가진 클라이언트로 로그인 → 시나리오 가중치에 따라 요청 반복
+#                    login / sessions(목록) / chat(/get_response) / assistant(/api/chat/stream - DMM·Groq)
+#                    / bookmarks(추가→목록→수정→삭제)
+#   3) 시나리오    : mixed(기본), chat, assistant, sessions, login-storm - --mix 로 가중치 직접 지정 가능
+#   4) 결과 JSON   : 엔드포인트별 처리량·p50/p95/p99·상태 코드, 서버 측 구간 지연·캐시 적중률·상류 호출 수
+# 사용 예     : cd backend && python -m bench.loadtest --workers 2 --users 32 --duration 30 --out run.json
+#               python -m bench.compare base.json run.json
+# 요구 모듈   : httpx, asyncio, argparse, subprocess, bench.stubs, bench.common
+# -----------------------------------------------------------------------------------
+
+import os
+import sys
+import time
+import signal
+import socket
+import random
+import asyncio
+import argparse
+import tempfile
+import subprocess
+
+import httpx
+
+from bench.stubs import StubServer, ServiceProfile, SERVICES, app_env
+from bench.common import BACKEND_DIR, summarize, run_info, write_result, parse_prometheus
+
+# ────────────────────────────────────────────────────────────────────────────────────
+# 1) 시나리오·요청 내용
+#    - 가중치는 가상 사용자가 다음에 할 동작을 고르는 비율
+#    - 채팅 메시지는 감정(GPT + Places), 재추천(후보 큐), 인사·감사(로컬 응답), 주제 밖을 섞음
+#    - 어시스턴트 질문은 일반 대화만 - 실시간 검색 단서(뉴스, 노래, 추천해줘 ...)가 있으면
+#      googlesearch 가 실제 네트워크를 씀
+# ────────────────────────────────────────────────────────────────────────────────────
+SCENARIOS = {
+    "mixed": {"login": 1, "sessions": 3, "chat": 4, "assistant": 1, "bookmarks": 2},
+    "chat": {"chat": 1},
+    "assistant": {"assistant": 1},
+    "sessions": {"sessions": 1},
+    "login-storm": {"login": 1},
+}
+
+CHAT_MESSAGES = [
+    ("우울해", 3), ("너무 우울하다", 2), ("스트레스 받아", 3), ("피곤해", 2), ("기분 좋아", 2),
+    ("불안해", 1), ("지루해", 1), ("화나", 1), ("속상해", 1), ("설레", 1),
+    ("다른거 추천", 4), ("안녕", 1), ("고마워", 1), ("날씨 어때", 1),
+]
+
+ASSISTANT_MESSAGES = [
+    "파이썬 리스트 컴프리헨션 설명해줘", "좋은 습관을 만드는 방법 알려줘", "운동 루틴 짜는 법 알려줘",
+    "고양이랑 강아지 중에 뭐가 키우기 쉬워", "면접 준비는 어떻게 해야 할까", "책 읽는 습관 만드는 법",
+]
+
+PASSWORD = "bench-password-1"
+
+
+def parse_mix(text):
+    mix = {}
+    for item in text.split(","):
+        name, _, weight = item.partition("=")
+        if name.strip():
+            mix[name.strip()] = float(weight or 1)
+    unknown = set(mix) - {"login", "sessions", "chat", "assistant", "bookmarks"}
+    if unknown:
+        raise SystemExit(f"알 수 없는 동작: {sorted(unknown)}")
+    return mix
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description="AI 챗봇 백엔드 부하 테스트 (스텁 상류 사용)")
+    p.add_argument("--scenario", choices=sorted(SCENARIOS), default="mixed")
+    p.add_argument("--mix", help='가중치 직접 지정 (예: "chat=3,sessions=1")')
+    p.add_argument("--users", type=int, default=32, help="동시 가상 사용자 수")
+    p.add_argument("--duration", type=float, default=30, help="측정 시간(초)")
+    p.add_argument("--warmup", type=float, default=3, help="측정 전 예열 시간(초)")
+    p.add_argument("--think-ms", type=float, default=0, help="요청 사이 대기(ms)")
+    p.add_argument("--sessions-per-user", type=int, default=5)
+    p.add_argument("--stream", action="store_true", help="/get_response 를 SSE 모드로 호출")
+    p.add_argument("--workers", type=int, default=1, help="server.py 의 WEB_CONCURRENCY")
+    p.add_argument("--bcrypt-rounds", type=int, help="BCRYPT_ROUNDS (기본: 앱 기본값)")
+    p.add_argument("--latency-ms", type=float, default=150, help="스텁 LLM 응답 지연")
+    p.add_argument("--jitter-ms", type=float, default=50)
+    p.add_argument("--places-latency-ms", type=float, default=80)
+    p.add_argument("--chunk-ms", type=float, default=0, help="스텁 스트리밍 조각 간격")
+    p.add_argument("--error-rate", type=float, default=0.0, help="스텁 오류율 (0~1, 모든 서비스)")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--env", action="append", default=[], metavar="KEY=VALUE", help="서버에 넘길 환경 변수 (여러 번)")
+    p.add_argument("--name", help="결과에 남길 실행 이름")
+    p.add_argument("--out", help="결과 JSON 파일 (없으면 표준 출력)")
+    return p.parse_args(argv)
+
+
+# ────────────────────────────────────────────────────────────────────────────────────
+# 2) 서버 실행
+#    - 운영과 같은 server.py (uvicorn 워커) 를 임시 폴더 환경으로 실행
+#    - /healthz 가 200 (DB + 클라이언트 준비) 이 될 때까지 대기
+# ────────────────────────────────────────────────────────────────────────────────────
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(args, stub_base, workdir):
+    port = free_port()
+    env = dict(os.environ)
+    env.update(app_env(stub_base))
+    env.update({
+        "HOST": "127.0.0.1",
+        "PORT": str(port),
+        "WEB_CONCURRENCY": str(args.workers),
+        "AICHAT_DB_PATH": os.path.join(workdir, "bench.db"),
+        "CACHE_DB_PATH": os.path.join(workdir, "bench_cache.db"),
+        "HISTORY_DIR": os.path.join(workdir, "history"),
+        "APP_ENV": "bench",
+        "SECRET_KEY": "bench-secret",
+        "LOG_LEVEL": "WARNING",
+        "ACCESS_LOG": "0",
+    })
+    if args.bcrypt_rounds:
+        env["BCRYPT_ROUNDS"] = str(args.bcrypt_rounds)
+    for item in args.env:
+        key, _, value = item.partition("=")
+        env[key] = value
+
+    log = open(os.path.join(workdir, "server.log"), "w")
+    proc = subprocess.Popen(
+        [sys.executable, os.path.join(BACKEND_DIR, "server.py")],
+        env=env, cwd=workdir, stdout=log, stderr=subprocess.STDOUT,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            break
+        try:
+            if httpx.get(base_url + "/healthz", timeout=2).status_code == 200:
+                return proc, base_url
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    stop_server(proc)
+    with open(os.path.join(workdir, "server.log")) as f:
+        sys.stderr.write(f.read()[-4000:])
+    raise SystemExit("서버가 60초 안에 준비되지 않았습니다")
+
+
+def stop_server(proc):
+    if proc.poll() is None:
+        proc.send_signal(signal.SIGTERM)
+        try:
+            proc.wait(60)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+# ────────────────────────────────────────────────────────────────────────────────────
+# 3) 기록
+#    - 예열 중에는 기록하지 않음 (recording=False)
+#    - 5xx·연결 오류뿐 아니라 4xx 도 errors 로 셈 (정상 흐름에서는 나오지 않아야 함)
+# ────────────────────────────────────────────────────────────────────────────────────
+class Recorder:
+    def __init__(self):
+        self.recording = False
+        self.latencies = {}   # 엔드포인트 → [초]
+        self.statuses = {}    # 엔드포인트 → {상태: 개수}
+
+    def add(self, endpoint, seconds, status):
+        if not self.recording:
+            return
+        self.latencies.setdefault(endpoint, []).append(seconds)
+        counts = self.statuses.setdefault(endpoint, {})
+        counts[status] = counts.get(status, 0) + 1
+
+    def report(self, duration):
+        endpoints, total, errors = {}, 0, 0
+        for endpoint, values in sorted(self.latencies.items()):
+            statuses = self.statuses[endpoint]
+            failed = sum(n for s, n in statuses.items() if not s.startswith("2"))
+            endpoints[endpoint] = {
+                **summarize(values),
+                "rps": round(len(values) / duration, 2),
+                "errors": failed,
+                "status": dict(sorted(statuses.items())),
+            }
+            total += len(values)
+            errors += failed
+        return {
+            "requests": total,
+            "errors": errors,
+            "throughput_rps": round(total / duration, 2),
+            "endpoints": endpoints,
+        }
+
+
+# ────────────────────────────────────────────────────────────────────────────────────
+# 4) 가상 사용자
+# ────────────────────────────────────────────────────────────────────────────────────
+class VirtualUser:
+    def __init__(self, index, base_url, recorder, args, rng):
+        self.email = f"bench{index}@bench.local"
+        self.client = httpx.AsyncClient(base_url=base_url, timeout=60)
+        self.recorder = recorder
+        self.args = args
+        self.rng = rng
+        self.sessions = []
+
+    async def request(self, method, path, endpoint=None, **kwargs):
+        endpoint = endpoint or f"{method} {path}"
+        start = time.perf_counter()
+        try:
+            resp = await self.client.request(method, path, **kwargs)
+            status = str(resp.status_code)
+            # SSE 는 200 으로 시작한 뒤 error 이벤트로 실패를 알림
+            if resp.headers.get("content-type", "").startswith("text/event-stream") and "event: error" in resp.text:
+                status = "sse_error"
+        except httpx.HTTPError as e:
+            resp, status = None, type(e).__name__
+        self.recorder.add(endpoint, time.perf_counter() - start, status)
+        return resp
+
+    async def setup(self):
+        """가입 + 세션 생성 (측정하지 않음)"""
+        await self.client.post("/api/signup", json={"name": self.email, "email": self.email, "password": PASSWORD})
+        await self.login()
+        for _ in range(self.args.sessions_per_user):
+            resp = await self.client.post("/api/sessions", json={"title": "bench"})
+            if resp.status_code == 200:
+                self.sessions.append(resp.json()["id"])
+
+    async def login(self):
+        return await self.request("POST", "/api/login", json={"email": self.email, "password": PASSWORD})
+
+    async def list_sessions(self):
+        await self.request("GET", "/api/sessions", params={"limit": 20})
+
+    async def chat(self):
+        messages, weights = zip(*CHAT_MESSAGES)
+        data = {"message": self.rng.choices(messages, weights)[0]}
+        if self.sessions:
+            data["session_id"] = self.rng.choice(self.sessions)
+        if self.args.stream:
+            data["stream"] = "true"
+        await self.request("POST", "/get_response", data=data)
+
+    async def assistant(self):
+        data = {"message": self.rng.choice(ASSISTANT_MESSAGES)}
+        if self.sessions:
+            data["session_id"] = self.rng.choice(self.sessions)
+        await self.request("POST", "/api/chat/stream", data=data)
+
+    async def bookmarks(self):
+        n = self.rng.randrange(1_000_000)
+        await self.request("POST", "/api/add_bookmark", json={"name": f"식당{n}", "url": f"https://example.com/{n}"})
+        resp = await self.request("GET", "/api/bookmarks")
+        items = resp.json() if resp is not None and resp.status_code == 200 else []
+        if items:
+            item = items[-1]
+            await self.request("POST", "/api/update_bookmark",
+                               json={"id": item["id"], "name": f"식당{n}-수정", "url": item.get("url")})
+            await self.request("POST", "/api/delete_bookmark", json={"bookmark_id": item["id"]})
+
+    async def run(self, mix, deadline):
+        actions = {
+            "login": self.login, "sessions": self.list_sessions, "chat": self.chat,
+            "assistant": self.assistant, "bookmarks": self.bookmarks,
+        }
+        names, weights = zip(*mix.items())
+        while time.monotonic() < deadline:
+            await actions[self.rng.choices(names, weights)[0]]()
+            if self.args.think_ms:
+                await asyncio.sleep(self.args.think_ms / 1000)
+
+    async def close(self):
+        await self.client.aclose()
+
+
+async def run_load(args, base_url, mix):
+    recorder = Recorder()
+    users = [VirtualUser(i, base_url, recorder, args, random.Random(args.seed * 100_003 + i)) for i in range(args.users)]
+    try:
+        await asyncio.gather(*(u.setup() for u in users))
+        await asyncio.gather(*(u.run(mix, time.monotonic() + args.warmup) for u in users))
+        recorder.recording = True
+        start = time.monotonic()
+        await asyncio.gather(*(u.run(mix, start + args.duration) for u in users))
+        duration = time.monotonic() - start
+        recorder.recording = False
+        metrics_text = (await users[0].client.get("/metrics")).text
+    finally:
+        await asyncio.gather(*(u.close() for u in users))
+    return recorder.report(duration), duration, metrics_text
+
+
+# ────────────────────────────────────────────────────────────────────────────────────
+# 5) 서버 측 지표 요약 (/metrics - 모든 워커 합산)
+#    - spans    : 구간별 호출 수·평균 지연 (GPT, Places, DMM, DB 쿼리, bcrypt ...)
+#    - caches   : hits/misses 가 있는 통계 그룹의 합산 적중률
+#    - counters : 감정 추천·DMM 의 누적 카운터, 상류 오류·재시도
+# ────────────────────────────────────────────────────────────────────────────────────
+def server_summary(metrics_text):
+    spans, stats, counters = {}, {}, {}
+    for name, labels, value in parse_prometheus(metrics_text):
+        if name in ("aichat_span_seconds_sum", "aichat_span_seconds_count"):
+            spans.setdefault(labels["span"], {})[name.rsplit("_", 1)[1]] = value
+        elif name == "aichat_stat" and not labels["key"].endswith("rate"):
+            group = stats.setdefault(labels["group"], {})
+            group[labels["key"]] = group.get(labels["key"], 0) + value
+        elif name.startswith("aichat_upstream_"):
+            key = name[len("aichat_"):] + "{" + ",".join(f"{k}={v}" for k, v in sorted(labels.items())) + "}"
+            counters[key] = value
+
+    summary = {
+        "spans": {
+            name: {"count": int(s.get("count", 0)),
+                   "mean_ms": round(s.get("sum", 0) / s["count"] * 1000, 3) if s.get("count") else 0.0}
+            for name, s in sorted(spans.items())
+        },
+        "caches": {},
+        "counters": counters,
+    }
+    for group, values in sorted(stats.items()):
+        if "hits" in values and "misses" in values:
+            lookups = values["hits"] + values["misses"]
+            summary["caches"][group] = {
+                "hits": int(values["hits"]), "misses": int(values["misses"]),
+                "hit_rate": round(values["hits"] / lookups, 4) if lookups else 0.0,
+            }
+    emotion = stats.get("emotion_reply", {})
+    served, calls = emotion.get("cache_served", 0), emotion.get("gpt_calls", 0)
+    summary["emotion_reply"] = {
+        "cache_served": int(served), "gpt_calls": int(calls),
+        "hit_rate": round(served / (served + calls), 4) if served + calls else 0.0,
+    }
+    dmm = stats.get("dmm", {})
+    if dmm.get("calls"):
+        summary["dmm"] = {k: int(v) for k, v in dmm.items() if isinstance(v, (int, float))}
+    return summary
+
+
+# ────────────────────────────────────────────────────────────────────────────────────
+# 6) 실행
+# ────────────────────────────────────────────────────────────────────────────────────
+def main(argv=None):
+    args = parse_args(argv)
+    mix = parse_mix(args.mix) if args.mix else SCENARIOS[args.scenario]
+
+    llm = dict(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate, chunk_ms=args.chunk_ms)
+    profiles = {name: ServiceProfile(**llm) for name in ("openai", "groq", "cohere")}
+    profiles["places"] = ServiceProfile(args.places_latency_ms, args.jitter_ms / 2, args.error_rate)
+    stubs = StubServer(profiles, seed=args.seed)
+    stub_base = stubs.start()
+
+    workdir = tempfile.mkdtemp(prefix="aichat-bench-")
+    proc, base_url = start_server(args, stub_base, workdir)
+    try:
+        report, duration, metrics_text = asyncio.run(run_load(args, base_url, mix))
+    finally:
+        stop_server(proc)
+        stubs.stop()
+
+    config = {k: v for k, v in vars(args).items() if k not in ("out",)}
+    config["mix"] = mix
+    config["stubs"] = {name: profiles[name].as_dict() for name in SERVICES}
+    result = run_info("loadtest", config)
+    result.update({"name": args.name or args.scenario, "duration_s": round(duration, 2), **report})
+    result["server"] = server_summary(metrics_text)
+    result["upstream"] = stubs.snapshot()
+    result["workdir"] = workdir
+    write_result(result, args.out)
+
+
+if __name__ == "__main__":
+    main()
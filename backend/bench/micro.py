@@ -0,0 +1,417 @@
+# -----------------------------------------------------------------------------------
+# 파일 이름   : bench/micro.py
+# 설명        : 마이크로 벤치마크 - 부하 테스트로는 보기 어려운 개별 경로를 프로세스 안에서 측정
+# 주요 기능   :
+#   1) matcher    : detect_intents (Aho-Corasick 한 번) vs 감정 키워드 단순 순회, LocalDMM.classify
+#   2) dmm_fanout : TaskRunner.run_ordered 로 태스크 동시 실행 vs 순차 실행 (전체·첫 조각 지연)
+#   3) history    : 세션 JSONL append + recent vs 예전 방식(JSON 전체 읽고 다시 쓰기), 기록 N개 시점
+#   4) db_writers : 여러 스레드가 동시에 save_chat (커넥션 풀 + WAL) - 처리량·p99·오류
+#   5) pagination : 한 세션에 N행(기본 100만) 기록 후 키셋 페이지 vs OFFSET, 주요 쿼리 플랜 검사
+#   6) importtime : import app 시간 (python -X importtime 상위 모듈 포함)
+#   7) logging    : print(flush=True) vs 큐 로거 - 느리게 읽는 파이프에 썼을 때 호출 지연
+#   모든 데이터는 임시 폴더에 생성 (네트워크·실제 DB 사용 안 함)
+# 사용 예     : cd backend && python -m bench.micro --out micro.json
+#               python -m bench.micro matcher history --quick
+# 요구 모듈   : argparse, threading, subprocess, json, bench.common (+ 측정 대상 모듈은 실행 시 import)
+# -----------------------------------------------------------------------------------
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import threading
+import subprocess
+
+from bench.common import BACKEND_DIR, summarize, run_info, write_result
+from bench.stubs import app_env
+
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    def register(fn):
+        BENCHMARKS[name] = fn
+        return fn
+    return register
+
+
+def _timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+def _sample_messages(n, seed=0):
+    from Ai.Logic import EMOTION_KEYWORDS, GREETING_KEYWORDS, RECOMMEND_KEYWORDS
+    rng = random.Random(seed)
+    filler = ["오늘", "진짜", "회사에서", "친구랑", "점심", "그냥", "너무", "좀", "아까", "집에 가는 길에"]
+    pool = EMOTION_KEYWORDS + GREETING_KEYWORDS + RECOMMEND_KEYWORDS
+    messages = []
+    for _ in range(n):
+        words = rng.sample(filler, 3)
+        if rng.random() < 0.7:
+            words.insert(rng.randrange(4), rng.choice(pool))
+        messages.append(" ".join(words))
+    return messages
+
+
+# ────────────────────────────────────────────────────────────────────────────────────
+# 1) matcher
+# ────────────────────────────────────────────────────────────────────────────────────
+@benchmark("matcher")
+def bench_matcher(args):
+    from Ai.Logic import detect_intents, EMOTION_KEYWORDS
+    from Ai import LocalDMM
+    messages = _sample_messages(2000 if args.quick else 20000, args.seed)
+
+    def matcher_pass():
+        for m in messages:
+            detect_intents(m)
+
+    def naive_pass():
+        for m in messages:
+            any(k in m for k in EMOTION_KEYWORDS)
+
+    def dmm_pass():
+        return sum(1 for m in messages if LocalDMM.classify(m).tasks)
+
+    matcher_s, _ = _timed(matcher_pass)
+    naive_s, _ = _timed(naive_pass)
+    dmm_s, decided = _timed(dmm_pass)
+    n = len(messages)
+    return {
+        "messages": n,
+        "detect_intents_us": round(matcher_s / n * 1e6, 2),
+        "naive_emotion_scan_us": round(naive_s / n * 1e6, 2),
+        "local_dmm_classify_us": round(dmm_s / n * 1e6, 2),
+        "local_dmm_decided_rate": round(decided / n, 4),
+    }
+
+
+# ────────────────────────────────────────────────────────────────────────────────────
+# 2) dmm_fanout
+#    - 태스크 하나 = latency 만큼 기다린 뒤 조각 하나 (LLM 호출 흉내)
+# ────────────────────────────────────────────────────────────────────────────────────
+@benchmark("dmm_fanout")
+def bench_dmm_fanout(args):
+    from Ai.TaskRunner import run_ordered
+    latency = args.task_latency_ms / 1000
+
+    def factory(i):
+        def run():
+            time.sleep(latency)
+            yield f"task{i} "
+        return run
+
+    results = {}
+    for count in (1, 2, 3, 4):
+        factories = [factory(i) for i in range(count)]
+        start = time.perf_counter()
+        first = None
+        for _ in run_ordered(factories):
+            first = first or time.perf_counter() - start
+        total = time.perf_counter() - start
+        sequential = count * latency
+        results[f"tasks_{count}"] = {
+            "total_ms": round(total * 1000, 1),
+            "first_chunk_ms": round(first * 1000, 1),
+            "sequential_ms": round(sequential * 1000, 1),
+            "speedup": round(sequential / total, 2),
+        }
+    return {"task_latency_ms": args.task_latency_ms, **results}
+
+
+# ────────────────────────────────────────────────────────────────────────────────────
+# 3) history
+#    - 기록이 N개 쌓인 시점의 마지막 구간(500턴)에서 턴당 지연을 비교
+# ────────────────────────────────────────────────────────────────────────────────────
+@benchmark("history")
+def bench_history(args):
+    from Ai import History
+    n = 2000 if args.quick else args.history_messages
+    tail = min(500, n // 4)
+    text = "가" * 200
+    turn = ({"role": "user", "content": text}, {"role": "assistant", "content": text})
+
+    jsonl_latencies = []
+    for i in range(n // 2):
+        start = time.perf_counter()
+        History.recent("bench", History.HISTORY_WINDOW)
+        History.append("bench", *turn)
+        if i >= n // 2 - tail:
+            jsonl_latencies.append(time.perf_counter() - start)
+
+    # 예전 방식 - 전체 목록을 JSON 파일로 읽고 추가한 뒤 다시 씀
+    #   (앞부분은 한 번에 채워 두고 마지막 구간만 측정 - 결과는 같고 실행 시간은 O(n))
+    path = os.path.join(args.workdir, "ChatLog.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(list(turn) * (n // 2 - tail), f, ensure_ascii=False, indent=4)
+    rewrite_latencies = []
+    for _ in range(tail):
+        start = time.perf_counter()
+        with open(path, encoding="utf-8") as f:
+            messages = json.load(f)
+        messages.extend(turn)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(messages, f, ensure_ascii=False, indent=4)
+        rewrite_latencies.append(time.perf_counter() - start)
+
+    return {
+        "messages": n,
+        "measured_turns": tail,
+        "jsonl_append_recent": summarize(jsonl_latencies),
+        "json_rewrite": summarize(rewrite_latencies),
+    }
+
+
+# ────────────────────────────────────────────────────────────────────────────────────
+# 4) db_writers
+# ────────────────────────────────────────────────────────────────────────────────────
+@benchmark("db_writers")
+def bench_db_writers(args):
+    import users
+    users.init_db()
+    writers = args.writers
+    per_writer = 50 if args.quick else 200
+    sessions = [users.create_session(1, f"writer{i}") for i in range(writers)]
+    latencies, errors = [], []
+    lock = threading.Lock()
+    barrier = threading.Barrier(writers)
+
+    def write(session_id):
+        local = []
+        barrier.wait()
+        for i in range(per_writer):
+            start = time.perf_counter()
+            try:
+                users.save_chat(session_id, 1, f"message {i}", None, None, "user")
+            except Exception as e:
+                with lock:
+                    errors.append(type(e).__name__)
+            local.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=write, args=(s,)) for s in sessions]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    return {
+        "writers": writers,
+        "writes": len(latencies),
+        "writes_per_s": round(len(latencies) / elapsed, 1),
+        "errors": len(errors),
+        "latency": summarize(latencies),
+    }
+
+
+# ────────────────────────────────────────────────────────────────────────────────────
+# 5) pagination
+#    - 한 세션에 rows 개 로그를 넣고 (트리거 포함, 실제 쓰기 경로와 같음)
+#      첫 페이지 / 90% 지점 키셋 페이지 / 같은 위치의 OFFSET 페이지를 비교
+# ────────────────────────────────────────────────────────────────────────────────────
+@benchmark("pagination")
+def bench_pagination(args):
+    import users
+    import migrations
+    users.init_db()
+    rows = 100_000 if args.quick else args.rows
+    session_id = users.create_session(1, "pagination")
+    base = time.mktime((2025, 1, 1, 0, 0, 0, 0, 0, -1))
+
+    fill_start = time.perf_counter()
+    with users.get_db() as conn:
+        batch = 50_000
+        for offset in range(0, rows, batch):
+            conn.executemany(
+                "INSERT INTO chat_logs (session_id, user_id, role, message, created_at) VALUES (?, 1, 'user', ?, ?)",
+                (
+                    (session_id, f"message {i}", time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(base + i)))
+                    for i in range(offset, min(rows, offset + batch))
+                ),
+            )
+            conn.commit()
+        deep = conn.execute(
+            "SELECT created_at, id FROM chat_logs WHERE session_id = ? ORDER BY created_at DESC, id DESC LIMIT 1 OFFSET ?",
+            (session_id, int(rows * 0.9)),
+        ).fetchone()
+        problems = migrations.explain_hot_queries(conn, users.HOT_QUERIES)
+    fill_s = time.perf_counter() - fill_start
+    cursor = users.encode_cursor(deep["created_at"], deep["id"])
+
+    def repeat(fn, times=20):
+        latencies = []
+        for _ in range(times):
+            start = time.perf_counter()
+            fn()
+            latencies.append(time.perf_counter() - start)
+        return summarize(latencies)
+
+    def offset_page():
+        with users.get_db() as conn:
+            conn.execute(
+                "SELECT id, role, message, created_at FROM chat_logs WHERE session_id = ? "
+                "ORDER BY created_at DESC, id DESC LIMIT 50 OFFSET ?",
+                (session_id, int(rows * 0.9)),
+            ).fetchall()
+
+    return {
+        "rows": rows,
+        "fill_s": round(fill_s, 2),
+        "keyset_first_page": repeat(lambda: users.read_session_logs_page(session_id, limit=50)),
+        "keyset_deep_page": repeat(lambda: users.read_session_logs_page(session_id, limit=50, before=cursor)),
+        "offset_deep_page": repeat(offset_page, times=5),
+        "plan_problems": [f"{name}: {detail}" for name, detail in problems],
+    }
+
+
+# ────────────────────────────────────────────────────────────────────────────────────
+# 6) importtime
+#    - 새 프로세스에서 import app (wall 시간 중앙값) + -X importtime 의 누적 시간 상위 모듈
+# ────────────────────────────────────────────────────────────────────────────────────
+def _child_env(args):
+    env = dict(os.environ, **app_env("http://127.0.0.1:9"))
+    env.update({
+        "AICHAT_DB_PATH": os.path.join(args.workdir, "import.db"),
+        "CACHE_DB_PATH": os.path.join(args.workdir, "import_cache.db"),
+        "HISTORY_DIR": os.path.join(args.workdir, "import_history"),
+        "PYTHONPATH": BACKEND_DIR,
+        "LOG_LEVEL": "WARNING",
+    })
+    return env
+
+
+@benchmark("importtime")
+def bench_importtime(args):
+    env = _child_env(args)
+    walls = []
+    for _ in range(3 if args.quick else 5):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "import app"], cwd=BACKEND_DIR, env=env,
+                       check=True, capture_output=True)
+        walls.append(time.perf_counter() - start)
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app"], cwd=BACKEND_DIR, env=env,
+                         check=True, capture_output=True, text=True)
+    modules = []
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if cumulative.strip().isdigit() and depth == 1:   # app 이 직접 import 한 모듈만
+            modules.append((int(cumulative), name.strip()))
+    walls.sort()
+    return {
+        "import_app_s": round(walls[len(walls) // 2], 3),
+        "runs": len(walls),
+        "top_cumulative_ms": {name: round(us / 1000, 1) for us, name in sorted(modules, reverse=True)[:10]},
+    }
+
+
+# ────────────────────────────────────────────────────────────────────────────────────
+# 7) logging
+#    - 자식 프로세스가 5000줄을 쓰고, 부모는 stdout 파이프를 느리게 읽음 (약 200KB/s, 터미널·nohup 흉내)
+#    - 자식은 호출 지연 요약을 stderr 에 JSON 으로 남김
+# ────────────────────────────────────────────────────────────────────────────────────
+def _logging_child(mode, lines):
+    if mode == "queue":
+        import logging
+        from logconfig import configure_logging, logging_stats
+        configure_logging()
+        log = logging.getLogger("users")
+        emit = lambda i: log.info("save_chat session=%s role=user name=%s", "bench", i)
+    else:
+        logging_stats = None
+        emit = lambda i: print("save_chat session", "bench", "role user name", i, flush=True)
+    latencies = []
+    for i in range(lines):
+        start = time.perf_counter()
+        emit(i)
+        latencies.append(time.perf_counter() - start)
+        if i % 50 == 0:
+            time.sleep(0.001)
+    result = {"call": summarize(latencies)}
+    if logging_stats:
+        result["stats"] = logging_stats()
+    sys.stderr.write(json.dumps(result) + "\n")
+
+
+@benchmark("logging")
+def bench_logging(args):
+    lines = 1000 if args.quick else 5000
+    results = {}
+    for mode in ("print", "queue"):
+        env = dict(_child_env(args), LOG_FILE="/dev/stdout", LOG_LEVEL="INFO")
+        proc = subprocess.Popen(
+            [sys.executable, "-m", "bench.micro", "--logging-child", mode, "--lines", str(lines)],
+            cwd=BACKEND_DIR, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        )
+        while proc.stdout.read(1024):
+            time.sleep(0.005)
+        err = proc.stderr.read().decode()
+        proc.wait()
+        results[mode] = json.loads(err.strip().splitlines()[-1])
+    return {"lines": lines, **results}
+
+
+# ────────────────────────────────────────────────────────────────────────────────────
+# 8) 실행
+#    - 측정 대상 모듈이 import 시 환경 변수를 읽으므로, 임시 경로를 먼저 설정한 뒤 실행
+# ────────────────────────────────────────────────────────────────────────────────────
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description="AI 챗봇 백엔드 마이크로 벤치마크")
+    p.add_argument("names", nargs="*", help=f"실행할 항목 (기본: 전체) - {', '.join(BENCHMARKS)}")
+    p.add_argument("--quick", action="store_true", help="작은 데이터로 빠르게")
+    p.add_argument("--rows", type=int, default=1_000_000, help="pagination 로그 행 수")
+    p.add_argument("--writers", type=int, default=50, help="db_writers 동시 스레드 수")
+    p.add_argument("--history-messages", type=int, default=10_000)
+    p.add_argument("--task-latency-ms", type=float, default=200, help="dmm_fanout 태스크 지연")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--out", help="결과 JSON 파일 (없으면 표준 출력)")
+    p.add_argument("--logging-child", choices=("print", "queue"), help=argparse.SUPPRESS)
+    p.add_argument("--lines", type=int, default=5000, help=argparse.SUPPRESS)
+    return p.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.logging_child:
+        return _logging_child(args.logging_child, args.lines)
+
+    names = args.names or list(BENCHMARKS)
+    unknown = [n for n in names if n not in BENCHMARKS]
+    if unknown:
+        raise SystemExit(f"알 수 없는 항목: {unknown} (가능: {list(BENCHMARKS)})")
+
+    args.workdir = tempfile.mkdtemp(prefix="aichat-micro-")
+    os.environ.update(app_env("http://127.0.0.1:9"))
+    os.environ.update({
+        "AICHAT_DB_PATH": os.path.join(args.workdir, "micro.db"),
+        "CACHE_DB_PATH": os.path.join(args.workdir, "micro_cache.db"),
+        "HISTORY_DIR": os.path.join(args.workdir, "history"),
+        "LOG_LEVEL": os.getenv("LOG_LEVEL", "WARNING"),
+        "METRICS": os.getenv("METRICS", "0"),
+    })
+
+    results = {}
+    for name in names:
+        print(f"[{name}] ...", file=sys.stderr)
+        start = time.perf_counter()
+        results[name] = BENCHMARKS[name](args)
+        results[name]["elapsed_s"] = round(time.perf_counter() - start, 2)
+
+    config = {k: v for k, v in vars(args).items() if k not in ("out", "logging_child", "lines", "workdir")}
+    result = run_info("micro", config)
+    result["workdir"] = args.workdir
+    result["benchmarks"] = results
+    write_result(result, args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+# -----------------------------------------------------------------------------------
+# 파일 이름   : bench/stubs.py
+# 설명        : 벤치마크용 상류 서비스 흉내 서버 - OpenAI, Groq, Cohere, Google Places 를 한 포트에서 응답
+# 주요 기능   :
+#   1) ServiceProfile : 서비스별 지연(평균·지터), 오류율, 스트리밍 청크 간격
+#   2) 경로로 서비스 구분
+#        POST /v1/chat/completions        → openai  (OPENAI_BASE_URL = <base>/v1)
+#        POST /openai/v1/chat/completions → groq    (GROQ_BASE_URL = <base>)
+#        POST /v1/chat                    → cohere  (CO_API_URL = <base>, chat_stream 의 JSON 줄 스트림)
+#        GET  /maps/api/place/textsearch/json → places (PLACES_BASE_URL = <base>)
+#   3) 오류율만큼 500/429 응답 (앱의 재시도·서킷·대체 응답 경로를 함께 측정)
+#   4) StubServer.counters : 서비스별 호출·오류 수 (결과 JSON 의 "upstream")
+#   5) app_env(base)       : 앱을 스텁에 붙이는 환경 변수
+# 요구 모듈   : http.server, threading, json, random, time, urllib
+# -----------------------------------------------------------------------------------
+
+import json
+import time
+import random
+import threading
+from urllib.parse import urlparse, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+SERVICES = ("openai", "groq", "cohere", "places")
+
+FOODS = ["김치찌개", "된장찌개", "비빔밥", "칼국수", "떡볶이", "순두부찌개", "냉면", "삼계탕", "잡채", "갈비탕"]
+EMOTIONS = ["우울", "스트레스", "행복", "화남", "긴장", "지루함"]
+
+
+# ────────────────────────────────────────────────────────────────────────────────────
+# 1) 서비스별 설정
+#    - latency_ms ± jitter_ms 를 균등 분포로 (음수는 0)
+#    - error_rate : 0~1, 오류 중 절반은 429 (재시도 대상), 절반은 500
+#    - chunk_ms   : 스트리밍 응답 조각 사이 간격
+# ────────────────────────────────────────────────────────────────────────────────────
+class ServiceProfile:
+    def __init__(self, latency_ms=0.0, jitter_ms=0.0, error_rate=0.0, chunk_ms=0.0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.chunk_ms = chunk_ms
+
+    def as_dict(self):
+        return dict(vars(self))
+
+
+def _openai_completion(content):
+    return {
+        "id": "bench", "object": "chat.completion", "created": 0, "model": "bench",
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": 120, "completion_tokens": 40, "total_tokens": 160},
+    }
+
+
+def _openai_chunk(content):
+    return {
+        "id": "bench", "object": "chat.completion.chunk", "created": 0, "model": "bench",
+        "choices": [{"index": 0, "delta": {"content": content}, "finish_reason": None}],
+    }
+
+
+def _places(query, rng):
+    # 같은 검색어에는 같은 결과 (캐시 적중률이 의미를 갖도록)
+    seed = sum(query.encode())
+    return {"status": "OK", "results": [
+        {
+            "name": f"{query.split()[-1]} 식당{seed % 97}-{i}",
+            "formatted_address": "서울특별시",
+            "geometry": {"location": {"lat": 37.5 + i / 100, "lng": 127.0 + (seed % 10) / 100}},
+            "rating": 3.5 + (seed + i) % 15 / 10,
+            "user_ratings_total": 20 * (i + 1),
+            "place_id": f"bench-{seed}-{i}",
+        }
+        for i in range(5)
+    ]}
+
+
+# ────────────────────────────────────────────────────────────────────────────────────
+# 2) 요청 처리
+# ────────────────────────────────────────────────────────────────────────────────────
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "StubServer"
+
+    def log_message(self, *args):
+        pass
+
+    def _service(self, path):
+        if path.startswith("/openai/v1/chat/completions"):
+            return "groq"
+        if path.startswith("/v1/chat/completions"):
+            return "openai"
+        if path.startswith("/v1/chat"):
+            return "cohere"
+        if path.startswith("/maps/api/place/textsearch"):
+            return "places"
+        return None
+
+    def _send(self, status, body, content_type="application/json"):
+        if not isinstance(body, bytes):
+            body = json.dumps(body, ensure_ascii=False).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _begin(self, service):
+        """지연·오류 적용 - 오류 응답을 보냈으면 True"""
+        profile = self.server.profiles[service]
+        with self.server.lock:
+            self.server.counters[service]["calls"] += 1
+            delay = max(0.0, profile.latency_ms + self.server.rng.uniform(-profile.jitter_ms, profile.jitter_ms))
+            failed = self.server.rng.random() < profile.error_rate
+            if failed:
+                self.server.counters[service]["errors"] += 1
+        time.sleep(delay / 1000)
+        if failed:
+            status = 429 if self.server.rng.random() < 0.5 else 500
+            self._send(status, {"error": {"message": "bench stub error", "type": "server_error"}})
+        return failed
+
+    def _stream(self, chunks, content_type, chunk_ms):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for data in chunks:
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+            self.wfile.flush()
+            if chunk_ms:
+                time.sleep(chunk_ms / 1000)
+        self.wfile.write(b"0\r\n\r\n")
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        service = self._service(url.path)
+        if service != "places":
+            return self._send(404, {"error": "not found"})
+        if self._begin(service):
+            return
+        query = parse_qs(url.query).get("query", [""])[0]
+        self._send(200, _places(query, self.server.rng))
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        request = json.loads(self.rfile.read(length) or b"{}")
+        service = self._service(urlparse(self.path).path)
+        if service is None or service == "places":
+            return self._send(404, {"error": "not found"})
+        if self._begin(service):
+            return
+        profile = self.server.profiles[service]
+
+        if service == "cohere":
+            # DMM - 모든 질의를 일반 대화로 분류
+            text = "general " + request.get("message", "")
+            events = [
+                {"event_type": "stream-start", "generation_id": "bench", "is_finished": False},
+                {"event_type": "text-generation", "text": text, "is_finished": False},
+                {"event_type": "stream-end", "finish_reason": "COMPLETE", "is_finished": True,
+                 "response": {"text": text, "generation_id": "bench", "chat_history": [],
+                              "finish_reason": "COMPLETE", "meta": {}}},
+            ]
+            lines = [json.dumps(e, ensure_ascii=False).encode() + b"\n" for e in events]
+            return self._stream(lines, "application/stream+json", profile.chunk_ms)
+
+        with self.server.lock:
+            content = (
+                f"기분 요약: {self.server.rng.choice(EMOTIONS)}\n"
+                f"추천 음식: {self.server.rng.choice(FOODS)}\n"
+                "추천 이유: 지금 기분에는 따뜻한 음식이 잘 어울려요."
+            )
+        if not request.get("stream"):
+            return self._send(200, _openai_completion(content))
+        pieces = [content[i:i + 8] for i in range(0, len(content), 8)]
+        chunks = [_openai_chunk(p) for p in pieces]
+        if (request.get("stream_options") or {}).get("include_usage"):
+            chunks.append({**_openai_chunk(""), "choices": [], "usage": _openai_completion("")["usage"]})
+        events = [b"data: " + json.dumps(c, ensure_ascii=False).encode() + b"\n\n" for c in chunks]
+        self._stream(events + [b"data: [DONE]\n\n"], "text/event-stream", profile.chunk_ms)
+
+
+# ────────────────────────────────────────────────────────────────────────────────────
+# 3) StubServer
+#    - 127.0.0.1 의 빈 포트에서 스레드 서버 실행 (요청마다 스레드 - 지연이 서로를 막지 않음)
+#    - seed 를 주면 지연·오류·추천 음식 순서가 실행마다 같음
+# ────────────────────────────────────────────────────────────────────────────────────
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, profiles=None, seed=0):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.profiles = {name: ServiceProfile() for name in SERVICES}
+        self.profiles.update(profiles or {})
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.counters = {name: {"calls": 0, "errors": 0} for name in SERVICES}
+        self._thread = None
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self.base_url
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def snapshot(self):
+        with self.lock:
+            return {name: dict(counts) for name, counts in self.counters.items()}
+
+
+def app_env(base_url):
+    """앱(또는 server.py)이 스텁을 상류로 쓰도록 하는 환경 변수"""
+    return {
+        "OPENAI_BASE_URL": base_url + "/v1",
+        "GROQ_BASE_URL": base_url,
+        "CO_API_URL": base_url,
+        "PLACES_BASE_URL": base_url,
+        "OPENAI_API_KEY": "sk-bench",
+        "GROQ_API_KEY": "bench",
+        "CO_API_KEY": "bench",
+        "GOOGLE_MAPS_API_KEY": "bench",
+    }
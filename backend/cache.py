@@ -0,0 +1,291 @@
+# -----------------------------------------------------------------------------------
+# 파일 이름   : cache.py
+# 설명        : 캐시 유틸 모듈 - 메모리 LRU/TTL 캐시와 SQLite 영속 캐시
+# 주요 기능   :
+#   1) TTLCache       : 스레드 안전한 LRU/TTL 캐시, 적중·실패·축출 카운터 제공
+#   2) SQLiteCache    : 재시작 후에도 남는 key → JSON 값 캐시 (TTL·최대 행 수 제한)
+#                       update 로 여러 워커 프로세스가 같은 키를 원자적으로 읽고 고칠 수 있음
+#                       items 로 namespace 의 모든 항목 조회
+#   3) TieredCache    : 메모리 캐시 앞단 + SQLite 캐시 뒷단 2계층 조회
+#                       aget / aset 은 async 코드용 - SQLite 계층은 스레드에서 실행해 이벤트 루프를 막지 않음
+#   4) register_stats : 캐시 외의 통계(적중률·절약 토큰 등) 제공 함수 등록
+#   5) cache_stats    : 등록된 모든 통계를 한 번에 조회
+# 요구 모듈   : threading, asyncio, time, collections, sqlite3, json, os, logging
+# -----------------------------------------------------------------------------------
+
+import threading
+import asyncio
+import time
+import sqlite3
+import json
+import os
+import logging
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+# 이름 → 통계 함수 (cache_stats 조회용)
+_registry: dict = {}
+
+# SQLite 영속 캐시 파일 (모든 SQLiteCache 가 namespace 로 나눠 씀)
+CACHE_DB_PATH = os.getenv("CACHE_DB_PATH") or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "AICHAT_cache.db"
+)
+
+
+def register_stats(name: str, stats_fn) -> None:
+    _registry[name] = stats_fn
+
+
+# ────────────────────────────────────────────────────────────────────────────────────
+# 1) TTLCache
+#    - maxsize 를 넘으면 가장 오래 사용하지 않은 항목부터 제거(LRU)
+#    - 항목마다 만료 시각을 가지며, 만료된 항목은 조회 시 제거하고 miss 로 처리
+#    - set(..., ttl=) 로 항목별 TTL 을 더 짧게 줄 수 있음 (예: JWT 만료 시각)
+# ────────────────────────────────────────────────────────────────────────────────────
+class TTLCache:
+    def __init__(self, name: str, maxsize: int = 1024, ttl: float = 300.0):
+        self.name = name
+        self.maxsize = max(1, maxsize)
+        self.ttl = ttl
+        self._data = OrderedDict()   # key → (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        register_stats(name, self.stats)
+
+    def get(self, key, default=None):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING or entry[0] <= now:
+                if entry is not _MISSING:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value, ttl: float = None) -> None:
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key, default=None):
+        with self._lock:
+            entry = self._data.pop(key, _MISSING)
+        return default if entry is _MISSING else entry[1]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+# ────────────────────────────────────────────────────────────────────────────────────
+# 2) SQLiteCache
+#    - 테이블 cache_entries(namespace, key, value, expires_at) 하나를 여러 캐시가 공유
+#    - 만료 시각은 벽시계(time.time) 기준이라 프로세스 재시작 후에도 유효
+#    - set 이 prune_every 번 호출될 때마다 만료 행 삭제 + max_rows 초과분(오래된 순) 삭제
+#    - update 는 BEGIN IMMEDIATE 로 쓰기 잠금을 먼저 잡아, 프로세스 사이 읽기-수정-쓰기가 섞이지 않음
+# ────────────────────────────────────────────────────────────────────────────────────
+CREATE_CACHE_ENTRIES = """
+CREATE TABLE IF NOT EXISTS cache_entries (
+    namespace  TEXT NOT NULL,
+    key        TEXT NOT NULL,
+    value      TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+) WITHOUT ROWID;
+"""
+
+
+class SQLiteCache:
+    def __init__(self, namespace: str, ttl: float, max_rows: int = 100_000,
+                 path: str = None, prune_every: int = 256):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.max_rows = max_rows
+        self.prune_every = prune_every
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path or CACHE_DB_PATH, check_same_thread=False, timeout=5)
+        self._conn.execute("PRAGMA journal_mode = WAL;")
+        self._conn.execute("PRAGMA synchronous = NORMAL;")
+        self._conn.execute(CREATE_CACHE_ENTRIES)
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_cache_entries_expires ON cache_entries(namespace, expires_at)"
+        )
+        self._conn.commit()
+
+    def get(self, key, default=None):
+        entry = self.get_entry(key)
+        return default if entry is None else entry[0]
+
+    def get_entry(self, key):
+        """(값, 만료 시각 time.time 기준) - 없거나 만료됐으면 None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM cache_entries WHERE namespace = ? AND key = ?",
+                (self.namespace, key),
+            ).fetchone()
+        if row is None or row[1] <= time.time():
+            return None
+        return json.loads(row[0]), row[1]
+
+    def set(self, key, value, ttl: float = None) -> None:
+        expires_at = time.time() + (self.ttl if ttl is None else min(ttl, self.ttl))
+        payload = json.dumps(value, ensure_ascii=False)
+        with self._lock:
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO cache_entries (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                    (self.namespace, key, payload, expires_at),
+                )
+                self._writes += 1
+                if self._writes % self.prune_every == 0:
+                    self._prune()
+                self._conn.commit()
+            except sqlite3.Error as e:
+                # 캐시 쓰기 실패는 요청을 실패시키지 않음
+                self._conn.rollback()
+                logger.warning("SQLiteCache(%s) write failed: %s", self.namespace, e)
+
+    def update(self, key, fn, ttl: float = None):
+        """fn(현재 값 또는 None) → (새 값, 반환값) 을 원자적으로 적용하고 반환값을 돌려줌
+
+        - 새 값이 None 이면 키를 삭제
+        - SQLite 오류 시 기록하지 않고 빈 값 기준 fn 의 반환값을 돌려줌 (요청은 실패시키지 않음)
+        - fn 이 던진 예외는 트랜잭션을 되돌린 뒤 그대로 전달 (쓰기 잠금을 쥔 채 남지 않도록)
+        """
+        expires_at = time.time() + (self.ttl if ttl is None else min(ttl, self.ttl))
+        with self._lock:
+            try:
+                self._conn.execute("BEGIN IMMEDIATE")
+                row = self._conn.execute(
+                    "SELECT value, expires_at FROM cache_entries WHERE namespace = ? AND key = ?",
+                    (self.namespace, key),
+                ).fetchone()
+                current = json.loads(row[0]) if row is not None and row[1] > time.time() else None
+                value, result = fn(current)
+                if value is None:
+                    self._conn.execute(
+                        "DELETE FROM cache_entries WHERE namespace = ? AND key = ?", (self.namespace, key)
+                    )
+                else:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO cache_entries (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                        (self.namespace, key, json.dumps(value, ensure_ascii=False), expires_at),
+                    )
+                    self._writes += 1
+                    if self._writes % self.prune_every == 0:
+                        self._prune()
+                self._conn.commit()
+                return result
+            except sqlite3.Error as e:
+                self._conn.rollback()
+                logger.warning("SQLiteCache(%s) update failed: %s", self.namespace, e)
+            except BaseException:
+                self._conn.rollback()
+                raise
+        return fn(None)[1]
+
+    def pop(self, key) -> None:
+        self.update(key, lambda current: (None, None))
+
+    def items(self) -> list:
+        """만료되지 않은 (key, 값) 전체 목록 - 행 수가 적은 namespace 용 (워커별 스냅샷 등)"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key, value FROM cache_entries WHERE namespace = ? AND expires_at > ?",
+                (self.namespace, time.time()),
+            ).fetchall()
+        return [(key, json.loads(value)) for key, value in rows]
+
+    def _prune(self) -> None:
+        self._conn.execute(
+            "DELETE FROM cache_entries WHERE namespace = ? AND expires_at <= ?",
+            (self.namespace, time.time()),
+        )
+        self._conn.execute(
+            """DELETE FROM cache_entries WHERE namespace = ? AND key IN (
+                   SELECT key FROM cache_entries WHERE namespace = ?
+                   ORDER BY expires_at DESC LIMIT -1 OFFSET ?)""",
+            (self.namespace, self.namespace, self.max_rows),
+        )
+
+
+# ────────────────────────────────────────────────────────────────────────────────────
+# 3) TieredCache
+#    - 조회: 메모리 → (없으면) SQLite → 찾으면 남은 TTL 그대로 메모리로 올림
+#      (짧게 저장한 항목 - 예: Places 결과 없음 - 이 메모리에서 기본 TTL 만큼 늘어나지 않도록)
+#    - 저장: 두 계층 모두 (persistent 가 None 이면 메모리만 사용)
+#    - aget / aset : 메모리 계층은 바로 처리하고, SQLite 계층(잠금·busy_timeout 대기 가능)만 스레드로 보냄
+# ────────────────────────────────────────────────────────────────────────────────────
+class TieredCache:
+    def __init__(self, memory: TTLCache, persistent: SQLiteCache = None):
+        self.memory = memory
+        self.persistent = persistent
+        self.persistent_hits = 0
+
+    def get(self, key, default=None):
+        value = self.memory.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        return self._get_persistent(key, default)
+
+    def set(self, key, value, ttl: float = None) -> None:
+        self.memory.set(key, value, ttl=ttl)
+        if self.persistent is not None:
+            self.persistent.set(key, value, ttl=ttl)
+
+    async def aget(self, key, default=None):
+        value = self.memory.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        if self.persistent is None:
+            return default
+        return await asyncio.to_thread(self._get_persistent, key, default)
+
+    async def aset(self, key, value, ttl: float = None) -> None:
+        self.memory.set(key, value, ttl=ttl)
+        if self.persistent is not None:
+            await asyncio.to_thread(self.persistent.set, key, value, ttl)
+
+    def _get_persistent(self, key, default):
+        if self.persistent is not None:
+            entry = self.persistent.get_entry(key)
+            if entry is not None:
+                value, expires_at = entry
+                self.persistent_hits += 1
+                self.memory.set(key, value, ttl=expires_at - time.time())
+                return value
+        return default
+
+
+def cache_stats() -> dict:
+    """등록된 모든 통계 {이름: stats}"""
+    return {name: stats_fn() for name, stats_fn in _registry.items()}
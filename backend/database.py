@@ -0,0 +1,161 @@
+# -----------------------------------------------------------------------------------
+# 파일 이름   : database.py
+# 설명        : SQLite 커넥션 풀 모듈 - 요청마다 connect/close 하지 않고 커넥션을 재사용
+# 주요 기능   :
+#   1) ConnectionPool : 최대 pool_size 개의 커넥션을 만들어 두고 빌려주고 돌려받음
+#   2) configure      : 커넥션 생성 시 한 번만 PRAGMA·row_factory 설정
+#   3) connection()   : with 문으로 커넥션을 빌리고, 예외 시 rollback 후 반납
+#   4) 스토리지 설정  : WAL·synchronous·cache/mmap·temp_store·busy_timeout 을 환경 변수로 조정
+# 요구 모듈   : sqlite3, queue, threading, contextlib, os, logging
+# -----------------------------------------------------------------------------------
+
+import sqlite3
+import queue
+import threading
+import logging
+import os
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "8"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+
+# ────────────────────────────────────────────────────────────────────────────────────
+# 0) 스토리지 설정
+#    - DB_JOURNAL_MODE    : WAL 이면 읽기와 쓰기가 서로를 막지 않음 (DB 파일에 영구 저장)
+#    - DB_SYNCHRONOUS     : WAL + NORMAL 은 커밋마다 fsync 하지 않고 체크포인트 때만 동기화
+#    - DB_CACHE_SIZE_KB   : 커넥션당 페이지 캐시 크기(KiB)
+#    - DB_MMAP_SIZE       : 메모리 매핑으로 읽을 최대 바이트 수 (0 이면 사용 안 함)
+#    - DB_TEMP_STORE      : 정렬·임시 테이블 저장 위치 (DEFAULT / FILE / MEMORY)
+#    - DB_BUSY_TIMEOUT_MS : 잠금 충돌 시 'database is locked' 대신 기다리는 시간
+# ────────────────────────────────────────────────────────────────────────────────────
+DB_JOURNAL_MODE = os.getenv("DB_JOURNAL_MODE", "WAL").upper()
+DB_SYNCHRONOUS = os.getenv("DB_SYNCHRONOUS", "NORMAL").upper()
+DB_CACHE_SIZE_KB = int(os.getenv("DB_CACHE_SIZE_KB", "16384"))
+DB_MMAP_SIZE = int(os.getenv("DB_MMAP_SIZE", str(128 * 1024 * 1024)))
+DB_TEMP_STORE = os.getenv("DB_TEMP_STORE", "MEMORY").upper()
+DB_BUSY_TIMEOUT_MS = int(os.getenv("DB_BUSY_TIMEOUT_MS", "5000"))
+
+_JOURNAL_MODES = {"DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF"}
+_SYNCHRONOUS_MODES = {"OFF", "NORMAL", "FULL", "EXTRA"}
+_TEMP_STORES = {"DEFAULT", "FILE", "MEMORY"}
+
+for _name, _value, _allowed in (
+    ("DB_JOURNAL_MODE", DB_JOURNAL_MODE, _JOURNAL_MODES),
+    ("DB_SYNCHRONOUS", DB_SYNCHRONOUS, _SYNCHRONOUS_MODES),
+    ("DB_TEMP_STORE", DB_TEMP_STORE, _TEMP_STORES),
+):
+    if _value not in _allowed:
+        raise ValueError(f"{_name}={_value!r} is not one of {sorted(_allowed)}")
+
+
+def apply_startup_pragmas(conn: sqlite3.Connection) -> None:
+    """DB 파일 단위 설정 - 앱 시작 시 한 번 적용 (journal_mode 는 파일에 기록됨)"""
+    mode = conn.execute(f"PRAGMA journal_mode = {DB_JOURNAL_MODE};").fetchone()[0]
+    if mode.upper() != DB_JOURNAL_MODE:
+        logger.warning("journal_mode %s requested but SQLite kept %s", DB_JOURNAL_MODE, mode)
+
+
+def configure(conn: sqlite3.Connection) -> None:
+    """새 커넥션에 한 번만 적용하는 설정"""
+    conn.row_factory = sqlite3.Row
+    conn.execute(f"PRAGMA busy_timeout = {DB_BUSY_TIMEOUT_MS};")
+    conn.execute("PRAGMA foreign_keys = ON;")
+    conn.execute(f"PRAGMA synchronous = {DB_SYNCHRONOUS};")
+    conn.execute(f"PRAGMA cache_size = {-DB_CACHE_SIZE_KB};")
+    conn.execute(f"PRAGMA mmap_size = {DB_MMAP_SIZE};")
+    conn.execute(f"PRAGMA temp_store = {DB_TEMP_STORE};")
+
+
+def connect(path: str, check_same_thread: bool = True) -> sqlite3.Connection:
+    """스토리지 설정이 적용된 단독 커넥션 (init_db·마이그레이션 등 풀 밖에서 사용)"""
+    conn = sqlite3.connect(
+        path,
+        timeout=DB_BUSY_TIMEOUT_MS / 1000,
+        check_same_thread=check_same_thread,
+    )
+    configure(conn)
+    return conn
+
+
+# ────────────────────────────────────────────────────────────────────────────────────
+# 1) ConnectionPool
+#    - 커넥션은 필요할 때 만들고(lazy) 최대 pool_size 개까지만 유지
+#    - check_same_thread=False 로 열어서 uvicorn 워커 스레드 어디서든 사용 가능
+#      (한 시점에는 항상 한 스레드만 커넥션을 빌려 쓴다)
+#    - 풀이 비어 있으면 timeout 초까지 반납을 기다림
+# ────────────────────────────────────────────────────────────────────────────────────
+class ConnectionPool:
+    def __init__(self, path: str, pool_size: int = DB_POOL_SIZE, timeout: float = DB_POOL_TIMEOUT):
+        self.path = path
+        self.pool_size = max(1, pool_size)
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        return connect(self.path, check_same_thread=False)
+
+    def acquire(self) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.pool_size:
+                self._created += 1
+                try:
+                    return self._connect()
+                except Exception:
+                    self._created -= 1
+                    raise
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise sqlite3.OperationalError(
+                f"connection pool exhausted ({self.pool_size} connections busy)"
+            )
+
+    def release(self, conn: sqlite3.Connection) -> None:
+        # 커밋되지 않은 트랜잭션이 남아 있으면 다음 사용자에게 넘기기 전에 정리
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error as e:
+            logger.warning("discarding broken pooled connection: %s", e)
+            self._discard(conn)
+            return
+        self._idle.put(conn)
+
+    def _discard(self, conn: sqlite3.Connection) -> None:
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+        with self._lock:
+            self._created -= 1
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        except BaseException:
+            try:
+                conn.rollback()
+            except sqlite3.Error:
+                pass
+            raise
+        finally:
+            self.release(conn)
+
+    def close_all(self) -> None:
+        """풀에 남아 있는 유휴 커넥션을 모두 닫는다 (앱 종료 시)"""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(conn)
@@ -0,0 +1,114 @@
+# -----------------------------------------------------------------------------------
+# 파일 이름   : intent_router.py
+# 설명        : 채팅 메시지 의도 라우터 - 한 번 분류하고 등록된 처리기로 보내는 엔진
+# 주요 기능   :
+#   1) IntentRouter.route : 의도 이름·우선순위·판정 조건과 함께 처리기 등록 (데코레이터)
+#   2) classify           : 공용 KeywordMatcher 로 메시지를 한 번만 스캔해 의도 + 슬롯 결정
+#   3) dispatch           : 분류 결과에 맞는 처리기를 실행하고 의도별 지연 시간 기록
+#   4) stats              : 의도별 호출 수·오류 수·p50/p95/최대 지연 (cache_stats 에 등록)
+# 요구 모듈   : time, threading, collections, cache
+# -----------------------------------------------------------------------------------
+
+import time
+import threading
+from collections import deque, namedtuple
+
+from cache import register_stats
+
+# name  : 의도 이름 (등록 시 이름)
+# slots : {"text": 정리된 메시지, "matches": {카테고리: 첫 Match}} + 처리기용 추가 값
+Intent = namedtuple("Intent", ["name", "slots"])
+Route = namedtuple("Route", ["name", "priority", "category", "when", "handler"])
+
+LATENCY_WINDOW = 1024   # 의도별로 보관하는 최근 지연 시간 표본 수
+
+
+# ────────────────────────────────────────────────────────────────────────────────────
+# 1) IntentRouter
+#    - 판정 조건은 두 가지
+#      · category : 공용 매처의 카테고리 이름 (스캔 결과에 있으면 해당)
+#      · when     : when(slots) → bool (빈 입력처럼 키워드가 아닌 조건)
+#    - 우선순위가 작은 것부터 검사, 모두 해당하지 않으면 fallback 처리기
+#    - 새 의도는 매처에 카테고리를 추가하거나 when 조건만 쓰면 되므로 스캔 횟수는 항상 1번
+# ────────────────────────────────────────────────────────────────────────────────────
+class IntentRouter:
+    def __init__(self, matcher, name="intent_router"):
+        self.matcher = matcher
+        self._routes = []
+        self._fallback = None
+        self._lock = threading.Lock()
+        self._stats = {}   # 의도 → {"count", "errors", "latencies"}
+        register_stats(name, self.stats)
+
+    def route(self, name, priority=100, category=None, when=None):
+        """처리기 등록 데코레이터 - category 와 when 이 모두 없으면 fallback 으로 등록"""
+        def decorator(handler):
+            if category is None and when is None:
+                self._fallback = Route(name, priority, None, None, handler)
+            else:
+                self._routes.append(Route(name, priority, category, when, handler))
+                self._routes.sort(key=lambda r: r.priority)
+            return handler
+        return decorator
+
+    def classify(self, text):
+        text = (text or "").strip()
+        slots = {"text": text, "matches": self.matcher.first(text) if text else {}}
+        for r in self._routes:
+            if r.category is not None and r.category not in slots["matches"]:
+                continue
+            if r.when is not None and not r.when(slots):
+                continue
+            return Intent(r.name, slots)
+        if self._fallback is None:
+            raise LookupError("no route matched and no fallback registered")
+        return Intent(self._fallback.name, slots)
+
+    def _handler_for(self, name):
+        for r in self._routes:
+            if r.name == name:
+                return r.handler
+        return self._fallback.handler
+
+    async def dispatch(self, text, **context):
+        """분류 후 처리기 실행 → (의도, 처리기 반환값)
+
+        context 는 session_id, user_id, location 처럼 처리기에 넘길 값
+        """
+        intent = self.classify(text)
+        handler = self._handler_for(intent.name)
+        start = time.perf_counter()
+        ok = False
+        try:
+            result = await handler(intent, **context)
+            ok = True
+            return intent, result
+        finally:
+            self._record(intent.name, time.perf_counter() - start, ok)
+
+    # ────────────────────────────────────────────────────────────────────────────
+    # 2) 통계
+    # ────────────────────────────────────────────────────────────────────────────
+    def _record(self, name, seconds, ok):
+        with self._lock:
+            entry = self._stats.setdefault(
+                name, {"count": 0, "errors": 0, "latencies": deque(maxlen=LATENCY_WINDOW)}
+            )
+            entry["count"] += 1
+            if not ok:
+                entry["errors"] += 1
+            entry["latencies"].append(seconds)
+
+    def stats(self) -> dict:
+        with self._lock:
+            snapshot = {k: (v["count"], v["errors"], sorted(v["latencies"])) for k, v in self._stats.items()}
+        result = {}
+        for name, (count, errors, lat) in snapshot.items():
+            result[name] = {
+                "count": count,
+                "errors": errors,
+                "p50_ms": round(lat[len(lat) // 2] * 1000, 2) if lat else 0.0,
+                "p95_ms": round(lat[min(len(lat) - 1, int(len(lat) * 0.95))] * 1000, 2) if lat else 0.0,
+                "max_ms": round(lat[-1] * 1000, 2) if lat else 0.0,
+            }
+        return result
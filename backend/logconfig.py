@@ -0,0 +1,265 @@
+# -----------------------------------------------------------------------------------
+# 파일 이름   : logconfig.py
+# 설명        : 로깅 설정 모듈 - 요청 스레드는 큐에 넣기만 하고, 실제 출력은 별도 스레드(QueueListener)가 담당
+# 주요 기능   :
+#   1) configure_logging : 루트 로거에 QueueHandler 설치, 출력 핸들러는 QueueListener 스레드에서 실행
+#   2) JSON 레코드       : 시각·레벨·로거·메시지·pid + 요청 ID·라우트 (LOG_FORMAT=text 면 한 줄 텍스트)
+#   3) 모듈별 레벨       : LOG_LEVELS="Ai.SearchContent=DEBUG,uvicorn.access=WARNING"
+#   4) 비밀값 가리기     : JWT, Bearer 토큰, OpenAI 키, password/token/secret=값 형태를 *** 로 치환
+#   5) DEBUG 속도 제한   : 로거별 초당 LOG_DEBUG_RATE 개까지만, 넘친 개수는 다음 레코드에 suppressed 로 표시
+#   6) RequestContextMiddleware : 요청마다 X-Request-Id 를 정하고 로그·응답 헤더에 붙임
+#   7) 큐가 가득 차면 기다리지 않고 버림 (dropped 카운터, cache_stats 의 "logging" 항목)
+# 요구 모듈   : logging, queue, contextvars, json, re, time, uuid, os, threading, atexit, cache
+# -----------------------------------------------------------------------------------
+
+import os
+import re
+import json
+import time
+import uuid
+import queue
+import atexit
+import logging
+import threading
+import contextvars
+from logging.handlers import QueueHandler, QueueListener
+
+from cache import register_stats
+
+# ────────────────────────────────────────────────────────────────────────────────────
+# 1) 설정
+#    - LOG_LEVEL      : 루트 레벨 (기본 INFO)
+#    - LOG_LEVELS     : 모듈별 레벨 "이름=레벨,이름=레벨"
+#    - LOG_FORMAT     : json / text
+#    - LOG_FILE       : 출력 파일 (없으면 stderr)
+#    - LOG_QUEUE_SIZE : 큐 최대 길이 (가득 차면 버림 - 요청 스레드는 절대 기다리지 않음)
+#    - LOG_DEBUG_RATE : 로거별 초당 DEBUG 레코드 수 (0 이면 제한 없음)
+# ────────────────────────────────────────────────────────────────────────────────────
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+LOG_FILE = os.getenv("LOG_FILE")
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+LOG_DEBUG_RATE = float(os.getenv("LOG_DEBUG_RATE", "20"))
+
+_counters = {"enqueued": 0, "dropped": 0, "rate_limited": 0}
+_counter_lock = threading.Lock()
+
+
+def _count(name, amount=1):
+    with _counter_lock:
+        _counters[name] += amount
+
+
+# ────────────────────────────────────────────────────────────────────────────────────
+# 2) 요청 컨텍스트
+#    - (request_id, ASGI scope) 를 contextvar 에 두고, 레코드를 큐에 넣을 때(요청 스레드) 복사
+#    - 라우트는 라우팅 후 scope["route"] 의 경로 템플릿, 없으면 실제 경로
+#    - 스레드 풀로 넘긴 작업은 contextvars.copy_context() 로 실행해야 같은 요청 ID 가 붙음
+# ────────────────────────────────────────────────────────────────────────────────────
+_request = contextvars.ContextVar("request", default=None)
+_REQUEST_ID = re.compile(r"^[A-Za-z0-9_.-]{1,64}$")
+
+
+def current_request_id():
+    ctx = _request.get()
+    return ctx[0] if ctx else None
+
+
+def _current_route():
+    ctx = _request.get()
+    if not ctx:
+        return None
+    scope = ctx[1]
+    route = scope.get("route")
+    path = getattr(route, "path", None) or scope.get("path")
+    return f"{scope.get('method', '')} {path}"
+
+
+class RequestContextMiddleware:
+    """순수 ASGI 미들웨어 - 스트리밍 응답도 그대로 통과 (BaseHTTPMiddleware 를 쓰지 않음)"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        incoming = dict(scope.get("headers") or []).get(b"x-request-id", b"").decode("latin-1")
+        request_id = incoming if _REQUEST_ID.match(incoming) else uuid.uuid4().hex[:16]
+        token = _request.set((request_id, scope))
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers") or []) + [
+                    (b"x-request-id", request_id.encode("latin-1"))
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            _request.reset(token)
+
+
+# ────────────────────────────────────────────────────────────────────────────────────
+# 3) 비밀값 가리기
+#    - 정규식 치환은 레코드당 수십 µs 라, 소문자 부분 문자열 검사로 후보 메시지만 골라 치환
+# ────────────────────────────────────────────────────────────────────────────────────
+_TRIGGERS = ("eyj", "sk-", "bearer", "pass", "pw", "token", "secret", "apikey", "api_key", "authoriz")
+_SECRETS = [
+    (re.compile(r"eyJ[A-Za-z0-9_-]+\.[A-Za-z0-9_-]+\.[A-Za-z0-9_-]*"), "***jwt***"),
+    (re.compile(r"(?i)(bearer\s+)[A-Za-z0-9._~+/=-]+"), r"\1***"),
+    (re.compile(r"\bsk-[A-Za-z0-9_-]{8,}"), "sk-***"),
+    (re.compile(r"""(?i)(["']?(?:password|passwd|pw|token|secret|api_?key|authorization)["']?\s*[:=]\s*)(["']?)[^\s"',}]+"""),
+     r"\1\2***"),
+]
+
+
+def redact(text):
+    low = text.lower()
+    for trigger in _TRIGGERS:
+        if trigger in low:
+            break
+    else:
+        return text
+    for pattern, replacement in _SECRETS:
+        text = pattern.sub(replacement, text)
+    return text
+
+
+# ────────────────────────────────────────────────────────────────────────────────────
+# 4) 요청 스레드 쪽 처리
+#    - DebugRateLimit : 로거별 토큰 버킷 (초당 LOG_DEBUG_RATE, 최대 LOG_DEBUG_RATE 개 몰아서 허용)
+#    - _NonBlockingQueueHandler : 메시지 문자열 완성 + 가리기 + 요청 정보 복사 후 put_nowait
+# ────────────────────────────────────────────────────────────────────────────────────
+class DebugRateLimit(logging.Filter):
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+        self._buckets = {}   # 로거 이름 → [남은 토큰, 마지막 시각, 버린 개수]
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno != logging.DEBUG or self.rate <= 0:
+            return True
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.setdefault(record.name, [self.rate, now, 0])
+            bucket[0] = min(self.rate, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+            if bucket[0] < 1:
+                bucket[2] += 1
+                _count("rate_limited")
+                return False
+            bucket[0] -= 1
+            record.suppressed, bucket[2] = bucket[2], 0
+        return True
+
+
+class _NonBlockingQueueHandler(QueueHandler):
+    def prepare(self, record):
+        record = super().prepare(record)   # 메시지·예외 문자열을 완성 (args, exc_info 제거)
+        record.msg = redact(record.msg)
+        record.request_id = current_request_id()
+        record.route = _current_route()
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+            _count("enqueued")
+        except queue.Full:
+            _count("dropped")
+
+
+# ────────────────────────────────────────────────────────────────────────────────────
+# 5) 리스너 스레드 쪽 출력 형식
+# ────────────────────────────────────────────────────────────────────────────────────
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            "pid": record.process,
+        }
+        for key in ("request_id", "route", "suppressed"):
+            value = getattr(record, key, None)
+            if value:
+                entry[key] = value
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s")
+
+    def format(self, record):
+        if not hasattr(record, "request_id"):
+            record.request_id = None
+        return super().format(record)
+
+
+# ────────────────────────────────────────────────────────────────────────────────────
+# 6) configure_logging
+#    - 여러 번 불러도 한 번만 설치 (app import, server.py 양쪽에서 호출)
+#    - uvicorn 로거는 server.py 에서 log_config=None 으로 두면 루트로 전달되어 같은 형식으로 출력
+# ────────────────────────────────────────────────────────────────────────────────────
+_listener = None
+_configure_lock = threading.Lock()
+
+
+def _parse_levels(spec):
+    levels = {}
+    for item in spec.split(","):
+        name, _, level = item.partition("=")
+        if name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def configure_logging():
+    global _listener
+    with _configure_lock:
+        if _listener is not None:
+            return
+
+        output = logging.FileHandler(LOG_FILE, encoding="utf-8") if LOG_FILE else logging.StreamHandler()
+        output.setFormatter(JsonFormatter() if LOG_FORMAT == "json" else TextFormatter())
+
+        log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+        handler = _NonBlockingQueueHandler(log_queue)
+        handler.addFilter(DebugRateLimit(LOG_DEBUG_RATE))
+
+        root = logging.getLogger()
+        for old in list(root.handlers):
+            root.removeHandler(old)
+        root.addHandler(handler)
+        root.setLevel(LOG_LEVEL)
+        for name, level in _parse_levels(LOG_LEVELS).items():
+            logging.getLogger(name).setLevel(level)
+
+        _listener = QueueListener(log_queue, output, respect_handler_level=True)
+        _listener.start()
+        atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """남은 레코드를 모두 출력하고 리스너 스레드 종료"""
+    global _listener
+    with _configure_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
+def logging_stats():
+    with _counter_lock:
+        counters = dict(_counters)
+    return {**counters, "format": LOG_FORMAT, "level": LOG_LEVEL}
+
+
+register_stats("logging", logging_stats)
@@ -0,0 +1,292 @@
+# -----------------------------------------------------------------------------------
+# 파일 이름   : metrics.py
+# 설명        : 요청·구간(span) 지연 시간과 오류 카운터를 모아 Prometheus 텍스트 형식으로 내보내는 모듈
+# 주요 기능   :
+#   1) MetricsMiddleware : 라우트(경로 템플릿)·메서드·상태 코드별 요청 지연 히스토그램 (스트리밍은 끝날 때까지)
+#   2) span              : with span("gpt.emotion_reply") / @span("users.read_user") 로 구간 지연·예외 수 기록
+#   3) inc               : 이름·라벨별 카운터 (상류 호출 오류 등)
+#   4) render            : /metrics 응답 본문 - 히스토그램·카운터 + cache_stats 의 숫자 값(캐시 적중 등)을 게이지로
+#   5) 여러 워커         : 워커마다 주기적으로 스냅샷을 공유 SQLite 에 기록, /metrics 는 모든 워커 값을 합산
+#   6) METRICS=0 이면 미들웨어·span 이 아무 일도 하지 않고 /metrics 는 404
+#   7) scrape_allowed    : /metrics·/api/cache_stats 접근 제어 (허용 주소 목록 또는 Bearer 토큰)
+# 요구 모듈   : time, threading, bisect, functools, asyncio, os, hmac, ipaddress, cache
+# -----------------------------------------------------------------------------------
+
+import os
+import time
+import bisect
+import asyncio
+import functools
+import threading
+import hmac
+import ipaddress
+
+from cache import SQLiteCache, cache_stats
+
+# ────────────────────────────────────────────────────────────────────────────────────
+# 1) 설정
+#    - METRICS                : 1 이면 기록 (0 이면 기록·노출 모두 끔)
+#    - METRICS_BUCKETS        : 히스토그램 경계(초, 쉼표 구분)
+#    - METRICS_SHARED         : 워커 스냅샷을 공유 저장소로 합산 (기본: WEB_CONCURRENCY 가 2 이상이면 1)
+#    - METRICS_FLUSH_INTERVAL : 스냅샷 기록 주기(초) - /metrics 를 받은 워커는 자기 값을 즉시 기록
+#    - METRICS_STALE          : 이 시간(초) 동안 스냅샷을 갱신하지 않은 워커(종료됨)는 합산에서 제외
+#    - METRICS_ALLOW          : 토큰 없이 수집할 수 있는 클라이언트 주소/대역 (쉼표 구분, 기본: 로컬만)
+#    - METRICS_TOKEN          : 설정하면 "Authorization: Bearer <토큰>" 요청은 주소와 관계없이 허용
+# ────────────────────────────────────────────────────────────────────────────────────
+METRICS = os.getenv("METRICS", "1") == "1"
+METRICS_BUCKETS = tuple(sorted(
+    float(b) for b in os.getenv("METRICS_BUCKETS", "0.005,0.01,0.025,0.05,0.1,0.25,0.5,1,2.5,5,10,30").split(",")
+))
+METRICS_SHARED = os.getenv(
+    "METRICS_SHARED", "1" if int(os.getenv("WEB_CONCURRENCY") or 1) > 1 else "0"
+) == "1"
+METRICS_FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", "5"))
+METRICS_STALE = float(os.getenv("METRICS_STALE", "600"))
+METRICS_ALLOW = tuple(
+    ipaddress.ip_network(n.strip(), strict=False)
+    for n in os.getenv("METRICS_ALLOW", "127.0.0.1,::1").split(",") if n.strip()
+)
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+PREFIX = "aichat_"
+
+_lock = threading.Lock()
+_histograms = {}   # (이름, 라벨 튜플) → [경계별 개수..., +Inf 개수, 합계, 개수]
+_counters = {}     # (이름, 라벨 튜플) → 값
+
+
+# ────────────────────────────────────────────────────────────────────────────────────
+# 2) 기록 함수
+#    - 라벨은 정렬된 (키, 값) 튜플로 저장 (같은 라벨 조합이면 같은 시계열)
+#    - 버킷은 누적이 아닌 구간별 개수로 저장하고 render 에서 누적
+# ────────────────────────────────────────────────────────────────────────────────────
+def observe(name, seconds, **labels):
+    if METRICS:
+        _observe((name, tuple(sorted(labels.items()))), seconds)
+
+
+def _observe(key, seconds):
+    index = bisect.bisect_left(METRICS_BUCKETS, seconds)
+    with _lock:
+        entry = _histograms.get(key)
+        if entry is None:
+            entry = _histograms[key] = [0] * (len(METRICS_BUCKETS) + 1) + [0.0, 0]
+        entry[index] += 1
+        entry[-2] += seconds
+        entry[-1] += 1
+
+
+def inc(name, amount=1, **labels):
+    if METRICS:
+        _inc((name, tuple(sorted(labels.items()))), amount)
+
+
+def _inc(key, amount=1):
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+
+class span:
+    """구간 지연(span_seconds)과 빠져나간 예외 수(span_errors_total) 기록
+
+    with span("places.search"): ...   또는   @span("users.read_user") (동기·async 함수 모두)
+    """
+
+    __slots__ = ("name", "_seconds_key", "_errors_key", "_start")
+
+    def __init__(self, name):
+        self.name = name
+        self._seconds_key = ("span_seconds", (("span", name),))
+        self._errors_key = ("span_errors_total", (("span", name),))
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if METRICS:
+            self._record(self._start, exc_type)
+        return False
+
+    def _record(self, start, exc_type):
+        _observe(self._seconds_key, time.perf_counter() - start)
+        if exc_type is not None:
+            _inc(self._errors_key)
+
+    def __call__(self, func):
+        # 데코레이터 - 호출마다 span 객체를 만들지 않고 이 객체의 키를 재사용
+        if not METRICS:
+            return func
+        record = self._record
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    result = await func(*args, **kwargs)
+                except BaseException as e:
+                    record(start, type(e))
+                    raise
+                record(start, None)
+                return result
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            except BaseException as e:
+                record(start, type(e))
+                raise
+            record(start, None)
+            return result
+        return wrapper
+
+
+# ────────────────────────────────────────────────────────────────────────────────────
+# 3) MetricsMiddleware
+#    - 순수 ASGI 미들웨어 (스트리밍 응답은 마지막 청크를 보낸 뒤까지 측정)
+#    - 라우트 라벨은 FastAPI 가 라우팅 후 scope["route"] 에 둔 경로 템플릿
+#      (/api/sessions/{session_id}/logs) - 매칭되지 않은 경로는 "unmatched" 하나로 묶어 시계열 폭증 방지
+# ────────────────────────────────────────────────────────────────────────────────────
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if not METRICS or scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        start = time.perf_counter()
+        status = [500]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            observe(
+                "request_seconds", time.perf_counter() - start,
+                method=scope.get("method", ""), route=route, status=str(status[0]),
+            )
+
+
+# ────────────────────────────────────────────────────────────────────────────────────
+# 4) 워커 스냅샷 (여러 워커 합산)
+#    - 각 워커가 {카운터, 히스토그램, 통계} 를 pid 키로 SQLiteCache("metrics") 에 기록
+#    - 카운터·히스토그램은 워커 합계로, cache_stats 게이지는 worker 라벨을 붙여 그대로 노출
+# ────────────────────────────────────────────────────────────────────────────────────
+_shared = SQLiteCache("metrics", ttl=METRICS_STALE, max_rows=1024) if METRICS and METRICS_SHARED else None
+
+
+def _flatten(prefix, value, out):
+    if isinstance(value, bool):
+        return
+    if isinstance(value, (int, float)):
+        out.append([prefix[0], ".".join(prefix[1:]), value])
+    elif isinstance(value, dict):
+        for k, v in value.items():
+            _flatten(prefix + [str(k)], v, out)
+
+
+def snapshot():
+    """이 워커의 현재 값 (JSON 으로 저장 가능한 형태)"""
+    with _lock:
+        counters = [[name, list(labels), value] for (name, labels), value in _counters.items()]
+        histograms = [[name, list(labels), list(entry)] for (name, labels), entry in _histograms.items()]
+    stats = []
+    for group, values in cache_stats().items():
+        _flatten([group], values, stats)
+    return {"pid": os.getpid(), "counters": counters, "histograms": histograms, "stats": stats}
+
+
+def flush():
+    if _shared is not None:
+        _shared.set(str(os.getpid()), snapshot())
+
+
+async def run_flusher():
+    """lifespan 에서 태스크로 실행 - METRICS_FLUSH_INTERVAL 마다 스냅샷 기록"""
+    while True:
+        await asyncio.sleep(METRICS_FLUSH_INTERVAL)
+        await asyncio.to_thread(flush)
+
+
+def _collect():
+    if _shared is None:
+        return [snapshot()]
+    flush()
+    return [value for _, value in _shared.items()]
+
+
+# ────────────────────────────────────────────────────────────────────────────────────
+# 5) Prometheus 텍스트 형식
+# ────────────────────────────────────────────────────────────────────────────────────
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _labels(pairs):
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def render():
+    counters, histograms, gauges = {}, {}, []
+    for snap in _collect():
+        for name, labels, value in snap["counters"]:
+            key = (name, tuple(map(tuple, labels)))
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, entry in snap["histograms"]:
+            key = (name, tuple(map(tuple, labels)))
+            total = histograms.get(key)
+            histograms[key] = entry if total is None else [a + b for a, b in zip(total, entry)]
+        gauges.extend((group, key, value, snap["pid"]) for group, key, value in snap["stats"])
+
+    lines = []
+    for metric in sorted({name for name, _ in histograms}):
+        lines.append(f"# TYPE {PREFIX}{metric} histogram")
+        for (name, labels), entry in sorted(histograms.items()):
+            if name != metric:
+                continue
+            cumulative = 0
+            for bound, count in zip(METRICS_BUCKETS + (float("inf"),), entry):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{PREFIX}{name}_bucket{_labels(labels + (('le', le),))} {cumulative}")
+            lines.append(f"{PREFIX}{name}_sum{_labels(labels)} {entry[-2]:.6f}")
+            lines.append(f"{PREFIX}{name}_count{_labels(labels)} {entry[-1]}")
+
+    for metric in sorted({name for name, _ in counters}):
+        lines.append(f"# TYPE {PREFIX}{metric} counter")
+        for (name, labels), value in sorted(counters.items()):
+            if name == metric:
+                lines.append(f"{PREFIX}{name}{_labels(labels)} {value}")
+
+    if gauges:
+        lines.append(f"# TYPE {PREFIX}stat gauge")
+        for group, key, value, pid in sorted(gauges, key=lambda g: (g[0], g[1], g[3])):
+            lines.append(f"{PREFIX}stat{_labels((('group', group), ('key', key), ('worker', pid)))} {value}")
+    return "\n".join(lines) + "\n"
+
+
+# ────────────────────────────────────────────────────────────────────────────────────
+# 6) 수집 접근 제어
+#    - 라우트별 트래픽·캐시 항목 수·상류 오류율이 드러나므로 공개 포트에서는 막음
+#    - 클라이언트 주소는 uvicorn 이 FORWARDED_ALLOW_IPS 의 프록시가 보낸 X-Forwarded-For 로 바꾼 값
+# ────────────────────────────────────────────────────────────────────────────────────
+def scrape_allowed(client_host, authorization=None):
+    if METRICS_TOKEN and authorization:
+        scheme, _, token = authorization.partition(" ")
+        if scheme.lower() == "bearer" and hmac.compare_digest(token.strip(), METRICS_TOKEN):
+            return True
+    try:
+        address = ipaddress.ip_address(client_host or "")
+    except ValueError:
+        return False
+    return any(address in network for network in METRICS_ALLOW)
@@ -0,0 +1,250 @@
+# -----------------------------------------------------------------------------------
+# 파일 이름   : migrations.py
+# 설명        : AICHAT_database.db 스키마 버전 관리 모듈
+# 주요 기능   :
+#   1) schema_version 테이블로 적용된 마이그레이션 버전 기록
+#   2) MIGRATIONS 목록의 단계를 순서대로, 한 번씩만 적용 (각 단계는 재실행해도 안전)
+#   3) explain_hot_queries : 주요 조회 쿼리의 EXPLAIN QUERY PLAN 을 검사해
+#                            인덱스 대신 전체 스캔/임시 정렬을 하는 쿼리를 찾아냄
+#   4) backfill_session_summaries : chat_sessions 의 마지막 메시지·개수 컬럼 재계산
+#   5) 스크립트 직접 실행 시 마이그레이션 적용 후 쿼리 플랜 회귀 검사
+#      (--backfill 옵션을 주면 세션 요약 컬럼도 다시 채움)
+# 요구 모듈   : sqlite3, logging, sys
+# -----------------------------------------------------------------------------------
+
+import sqlite3
+import logging
+import sys
+
+logger = logging.getLogger(__name__)
+
+CREATE_SCHEMA_VERSION = """
+CREATE TABLE IF NOT EXISTS schema_version (
+    version     INTEGER PRIMARY KEY,
+    description TEXT NOT NULL,
+    applied_at  DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+"""
+
+# ────────────────────────────────────────────────────────────────────────────────────
+# 1) 스키마 정의 (버전 1 - 최초 테이블)
+# ────────────────────────────────────────────────────────────────────────────────────
+CREATE_USERS = """
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    email TEXT UNIQUE NOT NULL,
+    hashed_password TEXT NOT NULL
+);
+"""
+
+CREATE_CHAT_LOGS = """
+CREATE TABLE IF NOT EXISTS chat_logs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id   TEXT NOT NULL,
+    user_id INTEGER NOT NULL,
+    role TEXT NOT NULL,
+    message TEXT NOT NULL,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY(session_id) REFERENCES chat_sessions(id) ON DELETE CASCADE
+);"""
+
+
+CREATE_PHOTOS ="""
+CREATE TABLE IF NOT EXISTS photos (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    file_path TEXT NOT NULL,
+    original_name TEXT,
+    uploaded_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY(user_id) REFERENCES users(id)
+);
+"""
+
+CREATE_SESSIONS = """
+CREATE TABLE IF NOT EXISTS chat_sessions (
+  id           TEXT PRIMARY KEY,
+  user_id      INTEGER NOT NULL,
+  title        TEXT,
+  created_at   DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+"""
+
+# 버전 2 - 즐겨찾기 테이블 (운영 DB 에는 수동으로 만들어져 있던 테이블)
+CREATE_BOOKMARK = """
+CREATE TABLE IF NOT EXISTS bookmark (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    name TEXT,
+    url TEXT,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY(user_id) REFERENCES users(id)
+);
+"""
+
+
+def _add_column(conn: sqlite3.Connection, table: str, column: str, decl: str) -> None:
+    """컬럼이 없을 때만 ALTER TABLE ADD COLUMN"""
+    existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+    if column not in existing:
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+
+
+def _v1_initial_schema(conn):
+    for ddl in (CREATE_USERS, CREATE_SESSIONS, CREATE_CHAT_LOGS, CREATE_PHOTOS):
+        conn.execute(ddl)
+
+
+def _v2_bookmark_and_place_columns(conn):
+    conn.execute(CREATE_BOOKMARK)
+    _add_column(conn, "chat_logs", "url", "TEXT")
+    _add_column(conn, "chat_logs", "name", "TEXT")
+
+
+def _v3_hot_query_indexes(conn):
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_chat_logs_session_created ON chat_logs(session_id, created_at)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_chat_sessions_user_created ON chat_sessions(user_id, created_at)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_bookmark_user_created ON bookmark(user_id, created_at)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_photos_user_uploaded ON photos(user_id, uploaded_at)")
+
+
+# 버전 4 - 세션 목록용 요약 컬럼
+#   chat_logs 에 행이 추가/삭제될 때 트리거가 chat_sessions 의
+#   last_message / last_date / message_count 를 함께 갱신한다.
+#   (save_chat·add_log 등 어떤 쓰기 경로든 자동으로 반영됨)
+CREATE_LOG_INSERT_TRIGGER = """
+CREATE TRIGGER IF NOT EXISTS trg_chat_logs_summary_insert
+AFTER INSERT ON chat_logs
+BEGIN
+    UPDATE chat_sessions
+       SET last_message  = NEW.message,
+           last_date     = NEW.created_at,
+           message_count = message_count + 1
+     WHERE id = NEW.session_id;
+END;
+"""
+
+CREATE_LOG_DELETE_TRIGGER = """
+CREATE TRIGGER IF NOT EXISTS trg_chat_logs_summary_delete
+AFTER DELETE ON chat_logs
+BEGIN
+    UPDATE chat_sessions
+       SET message_count = message_count - 1,
+           last_message  = (SELECT message FROM chat_logs WHERE session_id = OLD.session_id
+                            ORDER BY created_at DESC, id DESC LIMIT 1),
+           last_date     = (SELECT created_at FROM chat_logs WHERE session_id = OLD.session_id
+                            ORDER BY created_at DESC, id DESC LIMIT 1)
+     WHERE id = OLD.session_id;
+END;
+"""
+
+BACKFILL_SESSION_SUMMARIES = """
+UPDATE chat_sessions
+   SET message_count = (SELECT COUNT(*) FROM chat_logs WHERE session_id = chat_sessions.id),
+       last_message  = (SELECT message FROM chat_logs WHERE session_id = chat_sessions.id
+                        ORDER BY created_at DESC, id DESC LIMIT 1),
+       last_date     = (SELECT created_at FROM chat_logs WHERE session_id = chat_sessions.id
+                        ORDER BY created_at DESC, id DESC LIMIT 1)
+"""
+
+
+def backfill_session_summaries(conn: sqlite3.Connection) -> int:
+    """기존 세션의 요약 컬럼을 chat_logs 기준으로 다시 계산 (갱신된 세션 수 반환)"""
+    return conn.execute(BACKFILL_SESSION_SUMMARIES).rowcount
+
+
+def _v4_session_summary_columns(conn):
+    _add_column(conn, "chat_sessions", "last_message", "TEXT")
+    _add_column(conn, "chat_sessions", "last_date", "DATETIME")
+    _add_column(conn, "chat_sessions", "message_count", "INTEGER NOT NULL DEFAULT 0")
+    conn.execute(CREATE_LOG_INSERT_TRIGGER)
+    conn.execute(CREATE_LOG_DELETE_TRIGGER)
+    backfill_session_summaries(conn)
+
+
+# 버전 5 - 키셋 페이지네이션 (created_at, id) 정렬용 인덱스
+#   chat_sessions.id 는 TEXT 라 rowid 가 아니므로 인덱스에 id 를 직접 포함시킨다.
+#   (chat_logs.id 는 rowid 라 기존 (session_id, created_at) 인덱스로 충분)
+def _v5_session_keyset_index(conn):
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_chat_sessions_user_created_id ON chat_sessions(user_id, created_at, id)")
+    conn.execute("DROP INDEX IF EXISTS idx_chat_sessions_user_created")
+
+
+# ────────────────────────────────────────────────────────────────────────────────────
+# 2) 마이그레이션 목록
+#    - (버전, 설명, 적용 함수) 순서대로 추가만 한다. 이미 배포된 단계는 수정하지 않는다.
+#    - 각 단계는 IF NOT EXISTS / 컬럼 존재 확인으로 재실행해도 안전하게 작성
+# ────────────────────────────────────────────────────────────────────────────────────
+MIGRATIONS = [
+    (1, "initial schema", _v1_initial_schema),
+    (2, "bookmark table, chat_logs.url/name", _v2_bookmark_and_place_columns),
+    (3, "indexes for session/log/bookmark listings", _v3_hot_query_indexes),
+    (4, "denormalized last_message/last_date/message_count on chat_sessions", _v4_session_summary_columns),
+    (5, "keyset index chat_sessions(user_id, created_at, id)", _v5_session_keyset_index),
+]
+
+
+def current_version(conn: sqlite3.Connection) -> int:
+    conn.execute(CREATE_SCHEMA_VERSION)
+    row = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+    return row[0] or 0
+
+
+def migrate(conn: sqlite3.Connection) -> int:
+    """적용되지 않은 마이그레이션을 순서대로 실행하고 최종 버전을 반환"""
+    version = current_version(conn)
+    conn.commit()
+    for target, description, step in MIGRATIONS:
+        if target <= version:
+            continue
+        # 여러 워커가 동시에 시작해도 한 곳에서만 적용되도록 쓰기 잠금 후 다시 확인
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if current_version(conn) >= target:
+                conn.rollback()
+                continue
+            step(conn)
+            conn.execute(
+                "INSERT INTO schema_version (version, description) VALUES (?, ?)",
+                (target, description),
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            logger.error("migration %d (%s) failed", target, description)
+            raise
+        logger.info("Applied migration %d: %s", target, description)
+        version = target
+    return version
+
+
+# ────────────────────────────────────────────────────────────────────────────────────
+# 3) 쿼리 플랜 회귀 검사
+#    - 'SCAN <table>' (전체 스캔) 또는 'USE TEMP B-TREE' (인덱스 없이 정렬) 가
+#      나오면 해당 쿼리와 플랜 내용을 반환
+# ────────────────────────────────────────────────────────────────────────────────────
+def explain_hot_queries(conn: sqlite3.Connection, queries: dict) -> list[tuple[str, str]]:
+    problems = []
+    for name, (sql, params) in queries.items():
+        for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params):
+            detail = row[-1]
+            if detail.startswith("SCAN") or "TEMP B-TREE" in detail:
+                problems.append((name, detail))
+    return problems
+
+
+if __name__ == "__main__":
+    import users
+
+    logging.basicConfig(level=logging.INFO)
+    users.init_db()
+    with users.get_db() as conn:
+        print("schema version:", current_version(conn))
+        if "--backfill" in sys.argv[1:]:
+            updated = backfill_session_summaries(conn)
+            conn.commit()
+            print("backfilled sessions:", updated)
+        problems = explain_hot_queries(conn, users.HOT_QUERIES)
+    for name, detail in problems:
+        print(f"[plan regression] {name}: {detail}")
+    sys.exit(1 if problems else 0)
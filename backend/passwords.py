@@ -0,0 +1,85 @@
+# -----------------------------------------------------------------------------------
+# 파일 이름   : passwords.py
+# 설명        : bcrypt 비밀번호 해싱 모듈 - 이벤트 루프 밖 전용 스레드 풀에서 실행
+# 주요 기능   :
+#   1) hash_password / check_password : 전용 풀에서 bcrypt 실행 후 결과만 await
+#   2) 세마포어 기반 입장 제한 - 대기 작업이 많으면 PasswordHasherBusy 로 빠르게 거절
+#   3) needs_rehash : 저장된 해시의 cost 가 BCRYPT_ROUNDS 와 다른지 확인
+# 요구 모듈   : bcrypt, asyncio, concurrent.futures, os, metrics
+# -----------------------------------------------------------------------------------
+
+import os
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+
+from metrics import span
+
+# ────────────────────────────────────────────────────────────────────────────────────
+# 1) 설정
+#    - BCRYPT_ROUNDS        : 새로 만드는 해시의 cost (바꾸면 로그인 시 자동 재해시)
+#    - BCRYPT_WORKERS       : 해싱 전용 스레드 수 (bcrypt 는 GIL 을 놓고 CPU 를 씀)
+#                             기본값은 코어를 워커 프로세스 수(WEB_CONCURRENCY)로 나눈 몫
+#    - BCRYPT_MAX_PENDING   : 실행 + 대기 중인 해싱 작업의 최대 개수
+#    - BCRYPT_ADMIT_TIMEOUT : 입장 대기 최대 시간(초), 넘으면 PasswordHasherBusy
+# ────────────────────────────────────────────────────────────────────────────────────
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "1"))
+BCRYPT_WORKERS = int(os.getenv(
+    "BCRYPT_WORKERS", str(max(1, min(4, ((os.cpu_count() or 2) - 1) // max(1, WEB_CONCURRENCY))))
+))
+BCRYPT_MAX_PENDING = int(os.getenv("BCRYPT_MAX_PENDING", str(BCRYPT_WORKERS * 8)))
+BCRYPT_ADMIT_TIMEOUT = float(os.getenv("BCRYPT_ADMIT_TIMEOUT", "5"))
+
+_pool = ThreadPoolExecutor(max_workers=BCRYPT_WORKERS, thread_name_prefix="bcrypt")
+_admission = asyncio.Semaphore(BCRYPT_MAX_PENDING)
+
+
+class PasswordHasherBusy(Exception):
+    """해싱 대기열이 가득 차서 요청을 받지 못함"""
+
+
+@span("bcrypt.hash")
+def _hash(pw: str) -> str:
+    return bcrypt.hashpw(pw.encode(), bcrypt.gensalt(rounds=BCRYPT_ROUNDS)).decode()
+
+
+@span("bcrypt.check")
+def _check(pw: str, hashed: str) -> bool:
+    return bcrypt.checkpw(pw.encode(), hashed.encode())
+
+
+async def _run(func, *args):
+    try:
+        await asyncio.wait_for(_admission.acquire(), BCRYPT_ADMIT_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise PasswordHasherBusy()
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_pool, func, *args)
+    finally:
+        _admission.release()
+
+
+# ────────────────────────────────────────────────────────────────────────────────────
+# 2) 공개 함수
+# ────────────────────────────────────────────────────────────────────────────────────
+async def hash_password(pw: str) -> str:
+    return await _run(_hash, pw)
+
+
+async def check_password(pw: str, hashed: str) -> bool:
+    return await _run(_check, pw, hashed)
+
+
+def needs_rehash(hashed: str) -> bool:
+    """'$2b$12$...' 형식에서 cost 를 읽어 현재 설정과 다르면 True"""
+    try:
+        return int(hashed.split("$")[2]) != BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return True
+
+
+def shutdown() -> None:
+    _pool.shutdown(wait=True)
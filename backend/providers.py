@@ -0,0 +1,127 @@
+# -----------------------------------------------------------------------------------
+# 파일 이름   : providers.py
+# 설명        : LLM 클라이언트 지연 생성 레지스트리 - SDK import 와 클라이언트 생성을 첫 사용 시점으로 미룸
+# 주요 기능   :
+#   1) provider : 이름별 클라이언트 생성 함수 등록 (데코레이터)
+#   2) get      : 첫 호출 때 한 번만 생성 (동시에 여러 요청이 와도 생성은 한 번), 이후 같은 객체 반환
+#   3) warm_up  : 앱 시작(lifespan) 시 여러 클라이언트를 백그라운드 스레드에서 동시에 준비 - 실패해도 첫 사용 때 다시 시도
+#   4) stats    : 생성 여부·생성 시간·오류 (cache_stats 의 "providers" 항목)
+# 요구 모듈   : openai, groq, cohere (각각 해당 클라이언트를 처음 쓸 때만 import), asyncio, threading, time, logging, settings, cache
+# -----------------------------------------------------------------------------------
+
+import time
+import asyncio
+import logging
+import importlib
+import threading
+
+from settings import settings   # .env 를 먼저 로드 (cache 등 다른 모듈의 환경 변수 상수보다 앞서)
+from cache import register_stats
+
+logger = logging.getLogger(__name__)
+
+# ────────────────────────────────────────────────────────────────────────────────────
+# 1) 레지스트리
+#    - 클라이언트마다 Lock 하나 → 서로 다른 클라이언트는 동시에 생성, 같은 클라이언트는 한 번만
+#    - 단, SDK import 는 _import_lock 으로 한 번에 하나씩
+#      (openai/groq/cohere 가 공유하는 pydantic.v1 등을 여러 스레드가 동시에 import 하면
+#       초기화가 덜 된 모듈을 보게 되어 ImportError 가 남)
+# ────────────────────────────────────────────────────────────────────────────────────
+_factories = {}
+_modules = {}
+_import_lock = threading.Lock()
+_instances = {}
+_build_ms = {}
+_errors = {}
+_locks = {}
+_guard = threading.Lock()
+
+
+def provider(name, modules=()):
+    """provider("openai", modules=("openai",)) 로 생성 함수와 미리 import 할 SDK 모듈 등록"""
+    def decorator(factory):
+        _factories[name] = factory
+        _modules[name] = modules
+        _locks[name] = threading.Lock()
+        return factory
+    return decorator
+
+
+def get(name):
+    client = _instances.get(name)
+    if client is not None:
+        return client
+    if name not in _factories:
+        raise KeyError(f"unknown provider: {name}")
+    with _locks[name]:
+        client = _instances.get(name)
+        if client is None:
+            start = time.perf_counter()
+            try:
+                with _import_lock:
+                    for module in _modules[name]:
+                        importlib.import_module(module)
+                client = _factories[name]()
+            except Exception as e:
+                with _guard:
+                    _errors[name] = str(e)
+                raise
+            with _guard:
+                _instances[name] = client
+                _build_ms[name] = round((time.perf_counter() - start) * 1000, 2)
+                _errors.pop(name, None)
+    return client
+
+
+async def warm_up(names=None):
+    """등록된(또는 지정한) 클라이언트를 동시에 생성 - 오류는 기록만 하고 시작은 막지 않음"""
+    names = [n for n in (names if names is not None else _factories) if n in _factories]
+
+    async def build(name):
+        try:
+            await asyncio.to_thread(get, name)
+        except Exception as e:
+            logger.warning("%s 클라이언트 미리 생성 실패 (첫 사용 시 다시 시도): %s", name, e)
+
+    await asyncio.gather(*(build(n) for n in names))
+
+
+def stats():
+    with _guard:
+        return {
+            name: {
+                "built": name in _instances,
+                "build_ms": _build_ms.get(name),
+                "error": _errors.get(name),
+            }
+            for name in _factories
+        }
+
+
+register_stats("providers", stats)
+
+
+# ────────────────────────────────────────────────────────────────────────────────────
+# 2) 등록된 클라이언트
+#    - openai : 감정 분석·음식 추천 (Logic)
+#    - groq   : 일반 대화·실시간 검색 (Chatbot / RealtimeSearchEngine)
+#    - cohere : DMM 태스크 분류 (Model)
+# ────────────────────────────────────────────────────────────────────────────────────
+@provider("openai", modules=("openai",))
+def _openai():
+    from openai import OpenAI
+    return OpenAI(api_key=settings.openai_api_key, base_url=settings.openai_base_url)
+
+
+@provider("groq", modules=("groq",))
+def _groq():
+    from groq import Groq
+    return Groq(api_key=settings.groq_api_key, base_url=settings.groq_base_url)
+
+
+@provider("cohere", modules=("cohere",))
+def _cohere():
+    import cohere
+    if settings.cohere_base_url:
+        return cohere.Client(api_key=settings.cohere_api_key, base_url=settings.cohere_base_url)
+    return cohere.Client(api_key=settings.cohere_api_key)
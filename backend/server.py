@@ -0,0 +1,76 @@
+# -----------------------------------------------------------------------------------
+# 파일 이름   : server.py
+# 설명        : 운영 서버 실행기 - 여러 uvicorn 워커 프로세스로 app:app 실행 (start.sh 에서 사용)
+# 주요 기능   :
+#   1) 워커 수   : WEB_CONCURRENCY (기본: CPU 코어 수) - 워커 프로세스마다 이벤트 루프 하나
+#   2) 이벤트 루프·HTTP 파서 : uvloop / httptools 가 설치돼 있으면 사용, 없으면 asyncio / h11
+#   3) 정상 종료 : SIGTERM → 새 연결을 받지 않고 진행 중인 요청(스트리밍 포함)이 끝나길
+#                 GRACEFUL_TIMEOUT 초까지 기다린 뒤 lifespan 종료 처리(풀 정리) 실행
+#   4) 워커가 비정상 종료하면 uvicorn 감독 프로세스가 새로 띄움
+#   5) 로그는 logconfig 의 큐 기반 JSON 로거로 통일 (uvicorn 자체 로그 설정은 쓰지 않음, ACCESS_LOG=0 이면 접근 로그 끔)
+# 요구 모듈   : uvicorn, uvloop(선택), httptools(선택), os, importlib, logging, logconfig
+# -----------------------------------------------------------------------------------
+
+import os
+import logging
+import importlib.util
+
+import uvicorn
+
+import settings  # noqa: F401  .env 를 먼저 로드 (LOG_* 설정 포함) - import 부수 효과만 사용
+from logconfig import configure_logging
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# ────────────────────────────────────────────────────────────────────────────────────
+# 1) 설정
+#    - HOST / PORT          : 바인드 주소 (기존 app.py 실행과 같은 0.0.0.0:5000)
+#    - WEB_CONCURRENCY      : 워커 프로세스 수 (각 워커가 app 을 따로 import - DB·캐시 파일은 공유)
+#    - GRACEFUL_TIMEOUT     : 종료 시 진행 중인 요청을 기다리는 최대 시간(초)
+#    - KEEPALIVE_TIMEOUT    : 유휴 keep-alive 연결 유지 시간(초)
+#    - FORWARDED_ALLOW_IPS  : X-Forwarded-* 헤더를 믿을 프록시 주소 (nginx 가 같은 서버면 127.0.0.1)
+# ────────────────────────────────────────────────────────────────────────────────────
+HOST = os.getenv("HOST", "0.0.0.0")
+PORT = int(os.getenv("PORT", "5000"))
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY") or os.cpu_count() or 1)
+GRACEFUL_TIMEOUT = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+KEEPALIVE_TIMEOUT = int(os.getenv("KEEPALIVE_TIMEOUT", "5"))
+FORWARDED_ALLOW_IPS = os.getenv("FORWARDED_ALLOW_IPS", "127.0.0.1")
+ACCESS_LOG = os.getenv("ACCESS_LOG", "1") == "1"
+
+LOOP = "uvloop" if importlib.util.find_spec("uvloop") else "asyncio"
+HTTP = "httptools" if importlib.util.find_spec("httptools") else "h11"
+
+
+# ────────────────────────────────────────────────────────────────────────────────────
+# 2) 실행
+#    - 워커 수는 환경 변수로 워커에게도 전달 (CandidateStore 가 2 이상이면 공유 저장소 사용)
+#    - templates 등 상대 경로를 쓰므로 backend 폴더에서 실행
+# ────────────────────────────────────────────────────────────────────────────────────
+def main():
+    os.chdir(BASE_DIR)
+    os.environ["WEB_CONCURRENCY"] = str(WEB_CONCURRENCY)
+    os.environ.setdefault("APP_ENV", "production")
+    configure_logging()
+    logging.getLogger("server").info(
+        "starting %d workers on %s:%d (loop=%s, http=%s)", WEB_CONCURRENCY, HOST, PORT, LOOP, HTTP
+    )
+    uvicorn.run(
+        "app:app",
+        app_dir=BASE_DIR,
+        host=HOST,
+        port=PORT,
+        workers=WEB_CONCURRENCY,
+        loop=LOOP,
+        http=HTTP,
+        timeout_graceful_shutdown=GRACEFUL_TIMEOUT,
+        timeout_keep_alive=KEEPALIVE_TIMEOUT,
+        proxy_headers=True,
+        forwarded_allow_ips=FORWARDED_ALLOW_IPS,
+        log_config=None,
+        access_log=ACCESS_LOG,
+    )
+
+
+if __name__ == "__main__":
+    main()
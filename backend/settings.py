@@ -0,0 +1,69 @@
+# -----------------------------------------------------------------------------------
+# 파일 이름   : settings.py
+# 설명        : 공용 설정 모듈 - .env 를 한 번만 읽고 API 키·외부 서비스 주소를 settings 객체 하나로 제공
+# 주요 기능   :
+#   1) load_env : backend/.env (+ 실행 위치의 .env) 를 프로세스 환경 변수로 한 번만 로드
+#   2) Settings : 앱 환경, JWT 키, OpenAI/Groq/Cohere/Places 키와 기본 URL, 챗봇 이름
+#                 (모듈별 튜닝 값은 지금처럼 각 모듈의 os.getenv 상수로 둠 - 이 모듈을 먼저 import)
+# 요구 모듈   : python-dotenv, os
+# -----------------------------------------------------------------------------------
+
+import os
+
+from dotenv import load_dotenv
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# ────────────────────────────────────────────────────────────────────────────────────
+# 1) .env 로드
+#    - 예전에는 app / Logic / SearchContent 가 load_dotenv, Model / Chatbot / RealtimeSearchEngine 이
+#      dotenv_values(".env") 를 각자 호출 (총 여섯 번, 뒤의 셋은 실행 위치 기준)
+#    - 이미 설정된 환경 변수는 덮어쓰지 않음
+# ────────────────────────────────────────────────────────────────────────────────────
+def load_env():
+    load_dotenv(os.path.join(BASE_DIR, ".env"))
+    if os.path.abspath(".env") != os.path.join(BASE_DIR, ".env"):
+        load_dotenv(os.path.abspath(".env"))
+
+
+load_env()
+
+
+def _env(*names, default=None):
+    """여러 이름 중 먼저 설정된 값 (예: .env 의 GroqAPIKey 와 SDK 표준 이름 GROQ_API_KEY)"""
+    for name in names:
+        value = os.getenv(name)
+        if value:
+            return value
+    return default
+
+
+# ────────────────────────────────────────────────────────────────────────────────────
+# 2) Settings
+#    - *_base_url 이 None 이면 각 SDK 의 기본 주소 사용 (로컬 스텁·프록시로 바꿀 때만 지정)
+#    - PROVIDER_WARMUP : 앱 시작 시 미리 만들어 둘 LLM 클라이언트 (쉼표 구분, 빈 값이면 첫 사용 시 생성)
+# ────────────────────────────────────────────────────────────────────────────────────
+class Settings:
+    def __init__(self):
+        self.app_env = os.getenv("APP_ENV", "development")
+        self.secret_key = os.getenv("SECRET_KEY", "capstone-secret")
+        self.maps_api_key = os.getenv("Maps_API_KEY")
+
+        self.openai_api_key = _env("OPENAI_API_KEY")
+        self.openai_base_url = _env("OPENAI_BASE_URL")
+        self.groq_api_key = _env("GroqAPIKey", "GROQ_API_KEY")
+        self.groq_base_url = _env("GROQ_BASE_URL")
+        self.cohere_api_key = _env("CohereAPIKey", "CO_API_KEY")
+        self.cohere_base_url = _env("CO_API_URL")
+        self.google_maps_api_key = _env("GOOGLE_MAPS_API_KEY")
+        self.places_base_url = _env("PLACES_BASE_URL", default="https://maps.googleapis.com").rstrip("/")
+
+        self.username = os.getenv("Username")
+        self.assistantname = os.getenv("Assistantname")
+
+        self.provider_warmup = [
+            name.strip() for name in os.getenv("PROVIDER_WARMUP", "openai,groq,cohere").split(",") if name.strip()
+        ]
+
+
+settings = Settings()
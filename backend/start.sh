@@ -1,3 +1,6 @@
+# 운영 서버 시작 - 워커 여러 개(server.py), PID 는 server.pid 에 기록
+cd "$(dirname "$0")"
 source venv/bin/activate
-nohup env APP_ENV=production python3 app.py  &
+nohup env APP_ENV=production python3 server.py >> nohup.out 2>&1 &
+echo $! > server.pid
 disown
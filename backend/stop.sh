@@ -1 +1,26 @@
-pkill -f app.py
+# 운영 서버 정상 종료 - SIGTERM 후 진행 중인 요청이 끝나길 기다림 (GRACEFUL_TIMEOUT + 10초 넘으면 강제 종료)
+# server.pid 가 없으면(예전 start.sh 가 pid 파일 없이 띄운 python3 app.py 등) 명령줄로 서버 프로세스를 찾음
+cd "$(dirname "$0")"
+if [ -f server.pid ]; then
+    PIDS=$(cat server.pid)
+else
+    # 실행 파일이 python 이나 uvicorn 인 프로세스만 (명령줄에 문자열이 들어간 셸 등은 제외)
+    PIDS=$(pgrep -f '^([^ ]*/)?(python3?(\.[0-9]+)? ((app|server)\.py|-m uvicorn app:app)|uvicorn app:app)( |$)')
+    [ -n "$PIDS" ] || { echo "실행 중인 서버가 없습니다"; exit 0; }
+    echo "server.pid 가 없어 명령줄로 찾은 프로세스를 종료합니다: $(echo $PIDS)"
+fi
+
+alive() {
+    for pid in $PIDS; do
+        kill -0 "$pid" 2>/dev/null && return 0
+    done
+    return 1
+}
+
+kill -TERM $PIDS 2>/dev/null
+for _ in $(seq 1 $(( ${GRACEFUL_TIMEOUT:-30} + 10 ))); do
+    alive || break
+    sleep 1
+done
+alive && kill -KILL $PIDS 2>/dev/null
+rm -f server.pid
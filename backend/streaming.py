@@ -0,0 +1,151 @@
+# -----------------------------------------------------------------------------------
+# 파일 이름   : streaming.py
+# 설명        : 스트리밍 응답 유틸 - 동기 LLM 스트림을 이벤트 루프로 넘겨 SSE 로 전송
+# 주요 기능   :
+#   1) iterate_blocking : 동기 제너레이터를 스레드 풀에서 돌리며 조각이 나오는 즉시 async 로 전달
+#   2) sse / sse_response : text/event-stream 이벤트 문자열과 StreamingResponse 생성
+#   3) StreamTimer      : 첫 조각까지 시간(TTFB)과 전체 시간을 따로 측정, 엔드포인트별 통계 기록
+# 요구 모듈   : asyncio, threading, time, json, collections, contextvars, fastapi, cache
+# -----------------------------------------------------------------------------------
+
+import json
+import time
+import asyncio
+import threading
+import contextvars
+from collections import deque
+
+from fastapi.responses import StreamingResponse
+
+from cache import register_stats
+
+_DONE = object()
+
+
+# ────────────────────────────────────────────────────────────────────────────────────
+# 1) iterate_blocking
+#    - 생산 스레드: 제너레이터를 돌며 조각마다 call_soon_threadsafe 로 asyncio.Queue 에 넣음
+#    - 소비 측(async for)이 중간에 끝나면(클라이언트 연결 끊김 등) stop 을 세워
+#      생산 스레드가 다음 조각에서 멈추고 제너레이터를 닫음
+# ────────────────────────────────────────────────────────────────────────────────────
+async def iterate_blocking(executor, gen):
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    stop = threading.Event()
+
+    def put(item, error=None):
+        try:
+            loop.call_soon_threadsafe(queue.put_nowait, (item, error))
+        except RuntimeError:
+            stop.set()   # 이벤트 루프가 이미 닫힘
+
+    def produce():
+        try:
+            for item in gen:
+                if stop.is_set():
+                    break
+                put(item)
+        except BaseException as e:
+            put(_DONE, e)
+            return
+        finally:
+            if hasattr(gen, "close"):
+                gen.close()
+        put(_DONE)
+
+    # 로그의 요청 ID 가 생산 스레드에도 붙도록 현재 컨텍스트에서 실행
+    loop.run_in_executor(executor, contextvars.copy_context().run, produce)
+    try:
+        while True:
+            item, error = await queue.get()
+            if item is _DONE:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        stop.set()
+
+
+# ────────────────────────────────────────────────────────────────────────────────────
+# 2) SSE
+#    - 이벤트: delta(조각) → done(최종 메시지·시간) / error
+# ────────────────────────────────────────────────────────────────────────────────────
+def sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+
+def sse_response(events, headers=None):
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",   # nginx 프록시 버퍼링 끄기
+            **(headers or {}),
+        },
+    )
+
+
+# ────────────────────────────────────────────────────────────────────────────────────
+# 3) StreamTimer
+#    - 요청 처리 시작 시 만들고, 첫 조각을 보낼 때 first(), 끝날 때 finish()
+#    - 엔드포인트별 최근 STREAM_WINDOW 개의 TTFB/전체 시간으로 p50/p95 계산
+#      (cache_stats 의 "stream" 항목)
+# ────────────────────────────────────────────────────────────────────────────────────
+STREAM_WINDOW = 1024
+_stats_lock = threading.Lock()
+_stats = {}   # 엔드포인트 → {"count", "errors", "ttfb", "total"}
+
+
+class StreamTimer:
+    def __init__(self, endpoint):
+        self.endpoint = endpoint
+        self.start = time.perf_counter()
+        self.first_at = None
+
+    def first(self):
+        if self.first_at is None:
+            self.first_at = time.perf_counter()
+
+    @property
+    def ttfb_ms(self):
+        end = self.first_at if self.first_at is not None else time.perf_counter()
+        return round((end - self.start) * 1000, 2)
+
+    def finish(self, ok=True):
+        total_ms = round((time.perf_counter() - self.start) * 1000, 2)
+        with _stats_lock:
+            entry = _stats.setdefault(self.endpoint, {
+                "count": 0, "errors": 0,
+                "ttfb": deque(maxlen=STREAM_WINDOW), "total": deque(maxlen=STREAM_WINDOW),
+            })
+            entry["count"] += 1
+            if not ok:
+                entry["errors"] += 1
+            entry["ttfb"].append(self.ttfb_ms)
+            entry["total"].append(total_ms)
+        return {"ttfb_ms": self.ttfb_ms, "total_ms": total_ms}
+
+
+def _percentile(samples, q):
+    return samples[min(len(samples) - 1, int(len(samples) * q))] if samples else 0.0
+
+
+def stream_stats():
+    with _stats_lock:
+        snapshot = {k: (v["count"], v["errors"], sorted(v["ttfb"]), sorted(v["total"])) for k, v in _stats.items()}
+    return {
+        endpoint: {
+            "count": count,
+            "errors": errors,
+            "ttfb_p50_ms": _percentile(ttfb, 0.5),
+            "ttfb_p95_ms": _percentile(ttfb, 0.95),
+            "total_p50_ms": _percentile(total, 0.5),
+            "total_p95_ms": _percentile(total, 0.95),
+        }
+        for endpoint, (count, errors, ttfb, total) in snapshot.items()
+    }
+
+
+register_stats("stream", stream_stats)
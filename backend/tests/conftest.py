@@ -0,0 +1,21 @@
+# -----------------------------------------------------------------------------------
+# 파일 이름   : tests/conftest.py
+# 설명        : 테스트 공용 설정 - backend 를 import 경로에 추가하고 DB·캐시·기록 경로를 임시 폴더로
+#               (users·cache 등은 import 시점에 경로를 읽으므로 테스트 모듈보다 먼저 설정)
+# 사용 예     : cd backend && python -m pytest -q
+# 요구 모듈   : os, sys, tempfile, pytest
+# -----------------------------------------------------------------------------------
+
+import os
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+_WORKDIR = tempfile.mkdtemp(prefix="aichat-tests-")
+os.environ.setdefault("AICHAT_DB_PATH", os.path.join(_WORKDIR, "test.db"))
+os.environ.setdefault("CACHE_DB_PATH", os.path.join(_WORKDIR, "test_cache.db"))
+os.environ.setdefault("HISTORY_DIR", os.path.join(_WORKDIR, "history"))
+os.environ.setdefault("METRICS", "0")
@@ -0,0 +1,53 @@
+# -----------------------------------------------------------------------------------
+# 파일 이름   : tests/test_concurrent_writers.py
+# 설명        : 커넥션 풀 동시 쓰기 테스트 - 여러 스레드가 동시에 save_chat 해도
+#               'database is locked' 없이 모든 행이 기록되는지
+# 요구 모듈   : pytest, threading, logging, users
+# -----------------------------------------------------------------------------------
+
+import logging
+import threading
+
+import users
+
+WRITERS = 50
+WRITES_PER_WRITER = 40
+
+
+def test_concurrent_save_chat_loses_no_rows(caplog):
+    users.init_db()
+    sessions = [users.create_session(1, f"writer{i}") for i in range(WRITERS)]
+    barrier = threading.Barrier(WRITERS)
+    failures = []
+    lock = threading.Lock()
+
+    def write(session_id):
+        barrier.wait()
+        for i in range(WRITES_PER_WRITER):
+            try:
+                ok = users.save_chat(session_id, 1, f"message {i}", None, None, "user")
+            except Exception as e:
+                ok = repr(e)
+            if ok is not True:
+                with lock:
+                    failures.append(ok)
+
+    with caplog.at_level(logging.ERROR, logger="users"):
+        threads = [threading.Thread(target=write, args=(s,)) for s in sessions]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+    assert failures == []
+    assert not [r for r in caplog.records if "locked" in r.getMessage()]
+    with users.get_db() as conn:
+        counts = dict(conn.execute(
+            "SELECT session_id, COUNT(*) FROM chat_logs WHERE session_id IN (%s) GROUP BY session_id"
+            % ",".join("?" * WRITERS), sessions,
+        ).fetchall())
+        summaries = dict(conn.execute(
+            "SELECT id, message_count FROM chat_sessions WHERE id IN (%s)" % ",".join("?" * WRITERS), sessions,
+        ).fetchall())
+    assert counts == {s: WRITES_PER_WRITER for s in sessions}
+    assert summaries == counts
@@ -0,0 +1,37 @@
+# -----------------------------------------------------------------------------------
+# 파일 이름   : tests/test_query_plans.py
+# 설명        : 쿼리 플랜 회귀 테스트 - 최신 스키마에서 users.HOT_QUERIES 가 전체 스캔·임시 정렬 없이 실행되는지
+#               (인덱스를 지우거나 바꾸는 마이그레이션이 들어오면 여기서 실패)
+# 요구 모듈   : pytest, database, migrations, users
+# -----------------------------------------------------------------------------------
+
+import pytest
+
+import users
+import database
+import migrations
+
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = database.connect(str(tmp_path / "plans.db"))
+    migrations.migrate(conn)
+    yield conn
+    conn.close()
+
+
+def _plan(conn, name):
+    sql, params = users.HOT_QUERIES[name]
+    return [row[-1] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+
+
+@pytest.mark.parametrize("name", sorted(users.HOT_QUERIES))
+def test_hot_query_uses_index(conn, name):
+    plan = _plan(conn, name)
+    assert not [d for d in plan if d.startswith("SCAN") or "TEMP B-TREE" in d], plan
+
+
+def test_explain_hot_queries_reports_dropped_index(conn):
+    conn.execute("DROP INDEX idx_chat_sessions_user_created_id")
+    problems = dict(migrations.explain_hot_queries(conn, users.HOT_QUERIES))
+    assert "read_sessions_page" in problems
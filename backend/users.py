@@ -2,8 +2,8 @@
 # 파일 이름   : users.py
 # 설명        : SQLite DB 초기화 및 사용자 채팅·사진 메타 관리 유틸 모듈
 # 주요 기능   :
-#   1) init_db          : 데이터베이스 테이블 초기화
-#   2) get_db           : DB 커넥션 생성 및 외래키 활성화
+#   1) init_db          : 스토리지 설정 적용 및 스키마 마이그레이션(migrations.py)
+#   2) get_db           : 커넥션 풀에서 커넥션을 빌려주는 컨텍스트 매니저
 #   3) save_chat        : 채팅 로그 저장
 #   4) save_photo_meta  : 사진 메타데이터 저장
 #   5) read_chat        : 사용자 채팅 기록 조회
@@ -11,252 +11,351 @@
 #   7) add_bookmark     : 즐겨찾기 추가
 #   8) read_bookmarks   : 즐겨찾기 목록 가져오기
 #   9) delete_bookmarks : 즐겨찾기 한개 삭제
-# 요구 모듈   : sqlite3, os, logging
+#  10) read_user        : 이메일로 사용자(id, name, email) 조회
+#  11) read_sessions_page / read_session_logs_page : (created_at, id) 키셋 페이지 조회
+#  12) session_owned_by : 세션 소유권 확인 (인덱스 포인트 조회)
+#  13) update_password_hash : 비밀번호 해시 교체 (bcrypt cost 변경 시 재해시)
+#  14) 쿼리 함수마다 metrics.span("db.<함수명>") 으로 지연 시간 기록 (/metrics)
+#  15) create_user / read_credentials / read_users : 회원가입·로그인·사용자 목록
+#      (라우트는 모든 헬퍼를 run_blocking 으로 호출 - 풀 대기가 이벤트 루프를 막지 않도록)
+# 요구 모듈   : sqlite3, os, logging, database, migrations, metrics
 # -----------------------------------------------------------------------------------
 
 import sqlite3
 import os
 import logging
 import uuid
+import json
+import base64
 from datetime import datetime
+from contextlib import contextmanager
 
+from database import ConnectionPool, connect, apply_startup_pragmas
+from metrics import span
+from migrations import migrate
+
+logger = logging.getLogger(__name__)
 
 script_directory = os.path.dirname(os.path.abspath(__file__))
 database_name = "AICHAT_database.db"
 
-database_path = os.path.join(script_directory, database_name)
-connection = sqlite3.connect(database_path)
-cursor = connection.cursor()
+# AICHAT_DB_PATH 로 다른 위치의 DB 파일을 지정할 수 있음 (테스트·벤치마크용)
+database_path = os.getenv("AICHAT_DB_PATH") or os.path.join(script_directory, database_name)
 
+# 모든 헬퍼·라우트가 공유하는 커넥션 풀 (크기: DB_POOL_SIZE 환경 변수)
+pool = ConnectionPool(database_path)
 
-CREATE_USERS = """
-CREATE TABLE IF NOT EXISTS users (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    name TEXT NOT NULL,
-    email TEXT UNIQUE NOT NULL,
-    hashed_password TEXT NOT NULL
-);
-"""
+# 요청마다 실행되는 조회 쿼리 - 인덱스를 타는지 migrations.explain_hot_queries 로 검사
+SQL_READ_USER = "SELECT id, name, email FROM users WHERE email = ?"
 
-CREATE_CHAT_LOGS = """
-CREATE TABLE IF NOT EXISTS chat_logs (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    session_id   TEXT NOT NULL,
-    user_id INTEGER NOT NULL,
-    role TEXT NOT NULL,
-    message TEXT NOT NULL,
-    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-    FOREIGN KEY(session_id) REFERENCES chat_sessions(id) ON DELETE CASCADE
-);"""
-
-
-CREATE_PHOTOS ="""
-CREATE TABLE IF NOT EXISTS photos (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    user_id INTEGER NOT NULL,
-    file_path TEXT NOT NULL,
-    original_name TEXT,
-    uploaded_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-    FOREIGN KEY(user_id) REFERENCES users(id)
-);
+# last_message / last_date / message_count 는 chat_logs 트리거가 갱신 (migrations 버전 4)
+SQL_READ_SESSIONS = """
+    SELECT
+        id,
+        COALESCE(title, '') AS title,
+        created_at,
+        last_message,
+        last_date,
+        message_count
+    FROM chat_sessions
+    WHERE user_id = ?
+    ORDER BY created_at DESC
 """
 
-CREATE_SESSIONS = """
-CREATE TABLE IF NOT EXISTS chat_sessions (
-  id           TEXT PRIMARY KEY,    
-  user_id      INTEGER NOT NULL,          
-  title        TEXT,
-  created_at   DATETIME DEFAULT CURRENT_TIMESTAMP
-);
+SQL_READ_SESSION_LOGS = (
+    "SELECT id, role, message,created_at AS createdAt,url,name "
+    "FROM chat_logs WHERE session_id=? ORDER BY created_at"
+)
+
+SQL_READ_BOOKMARKS = "SELECT * FROM bookmark WHERE user_id=? ORDER BY created_at"
+
+SQL_SESSION_OWNED_BY = "SELECT 1 FROM chat_sessions WHERE id = ? AND user_id = ?"
+
+# 키셋 페이지 조회 - {cond} 에는 커서 조건, {order} 에는 정렬 방향이 들어감
+SQL_SESSIONS_PAGE = """
+    SELECT
+        id,
+        COALESCE(title, '') AS title,
+        created_at,
+        last_message,
+        last_date,
+        message_count
+    FROM chat_sessions
+    WHERE user_id = ? {cond}
+    ORDER BY created_at {order}, id {order}
+    LIMIT ?
 """
 
+SQL_SESSION_LOGS_PAGE = (
+    "SELECT id, role, message,created_at AS createdAt,url,name "
+    "FROM chat_logs WHERE session_id=? {cond} "
+    "ORDER BY created_at {order}, id {order} LIMIT ?"
+)
+
+HOT_QUERIES = {
+    "read_user": (SQL_READ_USER, ("user@example.com",)),
+    "read_sessions": (SQL_READ_SESSIONS, (1,)),
+    "read_session_logs": (SQL_READ_SESSION_LOGS, ("session",)),
+    "read_bookmarks": (SQL_READ_BOOKMARKS, (1,)),
+    "session_owned_by": (SQL_SESSION_OWNED_BY, ("session", 1)),
+    "read_sessions_page": (
+        SQL_SESSIONS_PAGE.format(cond="AND (created_at, id) < (?, ?)", order="DESC"),
+        (1, "2025-01-01 00:00:00", "session", 20),
+    ),
+    "read_session_logs_page": (
+        SQL_SESSION_LOGS_PAGE.format(cond="AND (created_at, id) < (?, ?)", order="DESC"),
+        ("session", "2025-01-01 00:00:00", 1, 50),
+    ),
+}
+
+PAGE_LIMIT_MAX = 200
+
+
 # 3) 초기화 함수: 앱 시작 시 한 번만 호출
 def init_db():
-    """테이블이 없으면 생성하고 외래키 제약을 활성화"""
-    conn = sqlite3.connect(database_path)
-    conn.execute("PRAGMA foreign_keys = ON;")
-    for ddl in (CREATE_USERS, CREATE_SESSIONS, CREATE_CHAT_LOGS, CREATE_PHOTOS):
+    """스토리지 설정(WAL 등)을 적용하고 스키마를 최신 버전으로 마이그레이션"""
+    conn = connect(database_path)
+    try:
+        apply_startup_pragmas(conn)
+        version = migrate(conn)
+    finally:
+        conn.close()
+    logger.info("Initialized database (schema version %d).", version)
+
+
+@contextmanager
+def get_db():
+    """풀에서 커넥션을 빌려 with 블록 동안 사용 (PRAGMA·row_factory 설정 완료 상태)"""
+    with pool.connection() as conn:
+        yield conn
+
+@span("db.read_user")
+def read_user(email: str):
+    """이메일로 사용자 조회 → {"id", "name", "email"} (없으면 None)"""
+    with get_db() as conn:
+        row = conn.execute(SQL_READ_USER, (email,)).fetchone()
+    return dict(row) if row else None
+
+@span("db.read_credentials")
+def read_credentials(email: str):
+    """로그인 확인용 {"id", "name", "hashed_password"} (없으면 None)"""
+    with get_db() as conn:
+        row = conn.execute("SELECT id, name, hashed_password FROM users WHERE email = ?", (email,)).fetchone()
+    return dict(row) if row else None
+
+@span("db.create_user")
+def create_user(name: str, email: str, hashed: str) -> int:
+    """사용자 추가 후 새 id 반환 (sqlite3.Error 는 롤백 후 그대로 전달)"""
+    with get_db() as conn:
         try:
-            conn.execute(ddl)
-        except sqlite3.OperationalError as e:
-            # 이미 만들어진 테이블만 무시
-            if "already exists" in str(e):
-                continue
-            # 다른 에러면 그대로 올려서 보게끔
-            logging.error("init_db DDL error: %s", e)
+            cur = conn.execute(
+                "INSERT INTO users (name, email, hashed_password) VALUES (?, ?, ?)",
+                (name, email, hashed)
+            )
+            conn.commit()
+            return cur.lastrowid
+        except sqlite3.Error:
+            conn.rollback()
             raise
-    conn.commit()
-    logging.info("Initialized database and created tables.")
 
+@span("db.read_users")
+def read_users() -> list[dict]:
+    with get_db() as conn:
+        rows = conn.execute("SELECT id, name FROM users").fetchall()
+    return [{"id": r["id"], "name": r["name"]} for r in rows]
 
-def get_db():
-    conn = sqlite3.connect(database_path)
-    conn.row_factory = sqlite3.Row
-    conn.execute("PRAGMA foreign_keys = ON;")
-    return conn
+@span("db.update_password_hash")
+def update_password_hash(user_id: int, hashed: str) -> None:
+    with get_db() as conn:
+        conn.execute("UPDATE users SET hashed_password = ? WHERE id = ?", (hashed, user_id))
+        conn.commit()
 
+@span("db.save_chat")
 def save_chat(session_id: str, user_id: int, message: str,url:str,name:str,role: str = "user"):
-    conn = get_db()
-    print(f"name: {name}")
-    try:
-        conn.execute(
-            "INSERT INTO chat_logs (session_id, user_id, message,url,name, role) VALUES (?, ?, ?,?,?, ?)",
-            (session_id, user_id, message,url,name,role)
-        )
-        conn.commit()
-        return True
-    except sqlite3.IntegrityError:
-        conn.rollback()
-        return False  # 외래키 위반 등
-    except sqlite3.Error as e:
-        conn.rollback()
-        print("save_chat error:", e)
-        return False
-    finally:
-        conn.close()
+    logger.debug("save_chat session=%s role=%s name=%s", session_id, role, name)
+    with get_db() as conn:
+        try:
+            conn.execute(
+                "INSERT INTO chat_logs (session_id, user_id, message,url,name, role) VALUES (?, ?, ?,?,?, ?)",
+                (session_id, user_id, message,url,name,role)
+            )
+            conn.commit()
+            return True
+        except sqlite3.IntegrityError:
+            conn.rollback()
+            return False  # 외래키 위반 등
+        except sqlite3.Error as e:
+            conn.rollback()
+            logger.error("save_chat error: %s", e)
+            return False
 
+@span("db.read_chat")
 def read_chat(session_id: str):
-    conn = get_db()
-    cur  = conn.cursor()
-    cur.execute("SELECT id, user_id, role, message, created_at AS timestamp " "FROM chat_logs WHERE session_id=? ORDER BY created_at", (session_id,))
-    rows = [dict(r) for r in cur.fetchall()]
-    conn.close()
-    return rows
+    with get_db() as conn:
+        cur = conn.execute("SELECT id, user_id, role, message, created_at AS timestamp " "FROM chat_logs WHERE session_id=? ORDER BY created_at", (session_id,))
+        return [dict(r) for r in cur.fetchall()]
 
+@span("db.save_photo_meta")
 def save_photo_meta(user_id, file_path, original_name):
-    conn = get_db()
-
-    try:
-        conn.execute("INSERT INTO photos (user_id, file_path, original_name) VALUES (?, ?, ?)", (user_id, file_path, original_name))
-        conn.commit()
-    except sqlite3.IntegrityError as e:
-        conn.rollback()
-    finally:
-        conn.close()
+    with get_db() as conn:
+        try:
+            conn.execute("INSERT INTO photos (user_id, file_path, original_name) VALUES (?, ?, ?)", (user_id, file_path, original_name))
+            conn.commit()
+        except sqlite3.IntegrityError as e:
+            conn.rollback()
 
+@span("db.read_photos")
 def read_photos(user_id):
-    conn = get_db()
-    cur  = conn.cursor()
-    cur.execute("SELECT * FROM photos WHERE user_id = ? ORDER BY uploaded_at", (user_id,))
-    rows = [dict(r) for r in cur.fetchall()]
-    conn.close()
-    return rows
+    with get_db() as conn:
+        cur = conn.execute("SELECT * FROM photos WHERE user_id = ? ORDER BY uploaded_at", (user_id,))
+        return [dict(r) for r in cur.fetchall()]
 
+@span("db.create_session")
 def create_session(user_id: int, title: str = None) -> str:
     session_id = str(uuid.uuid4())
-    conn = get_db()
-    conn.execute(
-        "INSERT INTO chat_sessions (id, user_id, title) VALUES (?, ?, ?)",
-        (session_id, user_id, title)
-    )
-    conn.commit()
-    conn.close()
+    with get_db() as conn:
+        conn.execute(
+            "INSERT INTO chat_sessions (id, user_id, title) VALUES (?, ?, ?)",
+            (session_id, user_id, title)
+        )
+        conn.commit()
     return session_id
 
+@span("db.read_sessions")
 def read_sessions(user_id: int) -> list[dict]:
-    conn = get_db()
-    rows = conn.execute("""
-        SELECT
-            s.id,
-            COALESCE(s.title, '') AS title,
-            s.created_at,
-            (
-                SELECT message
-                FROM chat_logs
-                WHERE session_id = s.id
-                ORDER BY created_at DESC
-                LIMIT 1
-            ) AS last_message,
-            (
-                SELECT created_at
-                FROM chat_logs
-                WHERE session_id = s.id
-                ORDER BY created_at DESC
-                LIMIT 1
-            ) AS last_date
-        FROM chat_sessions AS s
-        WHERE s.user_id = ?
-        ORDER BY s.created_at DESC;
-    """, (user_id,)).fetchall()
-    conn.close()
+    with get_db() as conn:
+        rows = conn.execute(SQL_READ_SESSIONS, (user_id,)).fetchall()
     return [dict(r) for r in rows]
 
+@span("db.session_owned_by")
+def session_owned_by(session_id: str, user_id: int) -> bool:
+    """session_id 가 user_id 의 세션인지 확인 (세션 목록 전체를 읽지 않음)"""
+    with get_db() as conn:
+        return conn.execute(SQL_SESSION_OWNED_BY, (session_id, user_id)).fetchone() is not None
+
+@span("db.read_session_logs")
 def read_session_logs(session_id: str) -> list[dict]:
-    conn = get_db()
-    rows = conn.execute(
-      "SELECT id, role, message,created_at AS createdAt,url,name FROM chat_logs WHERE session_id=? ORDER BY created_at",
-      (session_id,)
-    ).fetchall()
-    conn.close()
+    with get_db() as conn:
+        rows = conn.execute(SQL_READ_SESSION_LOGS, (session_id,)).fetchall()
     return [dict(r) for r in rows]
 
-def add_log(session_id: str, user_id: int, role: str, text: str) -> bool:
-    conn = get_db()
+# ────────────────────────────────────────────────────────────────────────────────────
+# 키셋(커서) 페이지네이션
+#   - 커서는 (created_at, id) 를 JSON → base64url 로 감싼 불투명 문자열
+#   - before=커서 : 커서보다 오래된 행, after=커서 : 커서보다 새로운 행
+#   - 반환값 {"items": [...], "before": 더 오래된 페이지 커서, "after": 더 새로운 페이지 커서}
+#     (더 가져올 행이 없으면 해당 커서는 None)
+# ────────────────────────────────────────────────────────────────────────────────────
+def encode_cursor(created_at, row_id) -> str:
+    raw = json.dumps([created_at, row_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(token: str) -> tuple:
     try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        created_at, row_id = json.loads(raw)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"invalid cursor: {token!r}") from e
+    return created_at, row_id
+
+def _keyset_page(sql: str, scope: tuple, limit: int, before, after,
+                 newest_first: bool, created_key: str = "created_at") -> dict:
+    if before and after:
+        raise ValueError("before 와 after 는 함께 사용할 수 없습니다.")
+    limit = max(1, min(int(limit), PAGE_LIMIT_MAX))
+
+    # 기본/before 는 최신순으로, after 는 오래된 순으로 읽은 뒤 화면 순서로 맞춘다
+    if after:
+        cond, order, args = "AND (created_at, id) > (?, ?)", "ASC", decode_cursor(after)
+    elif before:
+        cond, order, args = "AND (created_at, id) < (?, ?)", "DESC", decode_cursor(before)
+    else:
+        cond, order, args = "", "DESC", ()
+
+    with get_db() as conn:
+        rows = conn.execute(sql.format(cond=cond, order=order), (*scope, *args, limit + 1)).fetchall()
+    items = [dict(r) for r in rows[:limit]]
+    has_more = len(rows) > limit
+
+    if order == "DESC":
+        has_older, has_newer = has_more, bool(before)
+        items.reverse()   # 오래된 → 새로운 순
+    else:
+        has_older, has_newer = True, has_more
+
+    oldest, newest = (items[0], items[-1]) if items else (None, None)
+    return {
+        "items": items[::-1] if newest_first else items,
+        "before": encode_cursor(oldest[created_key], oldest["id"]) if has_older and oldest else None,
+        "after": encode_cursor(newest[created_key], newest["id"]) if has_newer and newest else None,
+    }
+
+@span("db.read_sessions_page")
+def read_sessions_page(user_id: int, limit: int = 20, before: str = None, after: str = None) -> dict:
+    """세션 목록 한 페이지 (최신순)"""
+    return _keyset_page(SQL_SESSIONS_PAGE, (user_id,), limit, before, after, newest_first=True)
+
+@span("db.read_session_logs_page")
+def read_session_logs_page(session_id: str, limit: int = 50, before: str = None, after: str = None) -> dict:
+    """세션 로그 한 페이지 (대화 순서대로, 기본은 가장 최근 limit 개)"""
+    return _keyset_page(SQL_SESSION_LOGS_PAGE, (session_id,), limit, before, after,
+                        newest_first=False, created_key="createdAt")
+
+@span("db.add_log")
+def add_log(session_id: str, user_id: int, role: str, text: str) -> bool:
+    with get_db() as conn:
         conn.execute(
             "INSERT INTO chat_logs (session_id, user_id, role, message) VALUES (?, ?, ?, ?)",
             (session_id, user_id, role, text)
         )
         conn.commit()
         return True
-    finally:
-        conn.close()
 
 
+@span("db.add_bookmark")
 def add_bookmark(user_id: int,name:str,url:str) -> bool:
-    conn = get_db()
-    try:
+    with get_db() as conn:
         conn.execute(
             "INSERT INTO bookmark ( user_id,name,url,created_at) VALUES (?, ?, ?,datetime('now','localtime'))",
             (user_id,name,url)
         )
         conn.commit()
         return True
-    finally:
-        conn.close()
 
 
+@span("db.read_bookmarks")
 def read_bookmarks(user_id):
-    conn = get_db()
-    cur  = conn.cursor()
-    cur.execute("SELECT * FROM bookmark WHERE user_id=? ORDER BY created_at", (user_id,))
-    rows = [dict(r) for r in cur.fetchall()]
-    conn.close()
-    return rows
+    with get_db() as conn:
+        cur = conn.execute(SQL_READ_BOOKMARKS, (user_id,))
+        return [dict(r) for r in cur.fetchall()]
 
+@span("db.delete_bookmark")
 def delete_bookmark(bookmark_id:int) -> bool:
-    conn = get_db()
-    try:
+    with get_db() as conn:
         conn.execute(
             "DELETE FROM bookmark WHERE id=?",
             (bookmark_id,)
         )
         conn.commit()
         return True
-    finally:
-        conn.close()
 
+@span("db.update_bookmark")
 def update_bookmark(bookmark_id:int,name:str,url:str) -> bool:
-    conn = get_db()
-    try:
+    with get_db() as conn:
         conn.execute(
             "UPDATE bookmark SET name=?,url=? WHERE id=?",
             (name,url,bookmark_id,)
         )
         conn.commit()
         return True
-    finally:
-        conn.close()
         
+@span("db.delete_session")
 def delete_session(session_id: str) -> bool:
-    conn = get_db()
-    try:
-        cur = conn.execute("DELETE FROM chat_sessions WHERE id = ?", (session_id,))
-        conn.commit()
-        return cur.rowcount > 0
-    except sqlite3.Error as e:
-        logging.error("delete_session error: %s", e)
-        return False
-    finally:
-        conn.close()
-        return True
\ No newline at end of file
+    with get_db() as conn:
+        try:
+            conn.execute("DELETE FROM chat_sessions WHERE id = ?", (session_id,))
+            conn.commit()
+        except sqlite3.Error as e:
+            conn.rollback()
+            logger.error("delete_session error: %s", e)
+        return True